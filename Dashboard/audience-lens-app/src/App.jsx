@@ -16,6 +16,20 @@ const COLORS = {
   chartColors: ['#3b82f6', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981']
 };
 
+// Страница отзывов хранится по колонкам, тональность и критерии — номера в словарях index.json
+function decodeReviewsPage(page, index) {
+  return page.review_id.map((reviewId, i) => ({
+    review_id: reviewId,
+    // строка страницы — отзыв x модель; в старых страницах колонки model нет
+    model: page.model ? index.models[page.model[i]] : '',
+    sentiment: index.sentiments[page.sentiment[i]],
+    text: page.text[i],
+    criteria: index.criteria
+      .map((name, j) => ({ критерий: name, оценка: page.scores[i][j], обоснование: page.justifications[i][j] || '' }))
+      .filter(crit => crit.оценка !== null)
+  }));
+}
+
 function App() {
   const [activeTab, setActiveTab] = useState('overview');
   const [loading, setLoading] = useState(true);
@@ -23,10 +37,16 @@ function App() {
   const [rawData, setRawData] = useState({
     audience: null,
     product: null,
-    reviews: null,
-    results: null
+    summary: null,
+    reviewsIndex: null
   });
 
+  // Текущая страница отзывов (грузится отдельно, по одной)
+  const [reviewsProduct, setReviewsProduct] = useState(null);
+  const [reviewsPage, setReviewsPage] = useState(1);
+  const [reviewsData, setReviewsData] = useState([]);
+  const [reviewsLoading, setReviewsLoading] = useState(false);
+
   // Загрузка всех файлов
   useEffect(() => {
     loadAllData();
@@ -39,25 +59,28 @@ function App() {
 
       console.log('🔄 Загрузка файлов...');
 
-      const [audienceRes, productRes, reviewsRes, resultsRes] = await Promise.all([
+      const [audienceRes, productRes, summaryRes, indexRes] = await Promise.all([
         fetch('/audience_analysis_results.json'),
         fetch('/product.json'),
-        fetch('/reviews.json'),
-        fetch('/results.json')
+        fetch('/dashboard_summary.json'),
+        fetch('/reviews/index.json')
       ]);
 
       const audience = audienceRes.ok ? await audienceRes.json() : null;
       const product = productRes.ok ? await productRes.json() : null;
-      const reviews = reviewsRes.ok ? await reviewsRes.json() : null;
-      const results = resultsRes.ok ? await resultsRes.json() : null;
+      // Агрегаты считает update_dashboard.py — в браузере по оценкам не проходим
+      const summary = summaryRes.ok ? await summaryRes.json() : null;
+      // Оглавление страниц отзывов; сами страницы грузятся при просмотре
+      const reviewsIndex = indexRes.ok ? await indexRes.json() : null;
 
-      console.log('📊 Загруженные данные:', { audience, product, reviews, results });
+      console.log('📊 Загруженные данные:', { audience, product, summary, reviewsIndex });
 
       if (!audience) {
         throw new Error('Не найден файл audience_analysis_results.json');
       }
 
-      setRawData({ audience, product, reviews, results });
+      setRawData({ audience, product, summary, reviewsIndex });
+      setReviewsProduct(current => current || Object.keys(reviewsIndex?.products || {})[0] || null);
       setLoading(false);
 
     } catch (err) {
@@ -84,82 +107,56 @@ function App() {
     };
   }, [rawData.audience]);
 
-  // Обработка results.json для отзывов с оценками
-  const reviewsData = useMemo(() => {
-    if (!rawData.results) return [];
-
-    return rawData.results.map(result => {
-      // Определяем тональность
-      let sentiment = 'нейтральный';
-      if (result.result?.тональность) {
-        sentiment = result.result.тональность;
-      } else if (result.overall_sentiment) {
-        sentiment = result.overall_sentiment === 'positive' ? 'положительный' :
-                   result.overall_sentiment === 'negative' ? 'отрицательный' : 'нейтральный';
+  // Загрузка одной страницы отзывов: reviews/<товар>/page-0001.json
+  useEffect(() => {
+    if (activeTab !== 'reviews' || !reviewsProduct) return;
+
+    let cancelled = false;
+    const loadPage = async () => {
+      setReviewsLoading(true);
+      try {
+        const name = `page-${String(reviewsPage).padStart(4, '0')}.json`;
+        // Каталог товара — имя из index.json (product_id, закодированный для файловой системы)
+        const dir = rawData.reviewsIndex?.products?.[reviewsProduct]?.dir ?? reviewsProduct;
+        const res = await fetch(`/reviews/${encodeURIComponent(dir)}/${name}`);
+        const page = res.ok ? await res.json() : null;
+        if (!cancelled) setReviewsData(page ? decodeReviewsPage(page, rawData.reviewsIndex) : []);
+      } catch (err) {
+        console.error('❌ Ошибка загрузки страницы отзывов:', err);
+        if (!cancelled) setReviewsData([]);
+      } finally {
+        if (!cancelled) setReviewsLoading(false);
       }
+    };
+    loadPage();
 
-      // Извлекаем критерии
-      let criteria = [];
-      if (result.result?.критерии) {
-        criteria = result.result.критерии;
-      } else if (result.criteria_scores) {
-        criteria = Object.entries(result.criteria_scores).map(([key, value]) => ({
-          критерий: key,
-          оценка: value,
-          обоснование: result.key_points?.[0] || 'Анализ качества'
-        }));
-      }
+    return () => { cancelled = true; };
+  }, [activeTab, reviewsProduct, reviewsPage, rawData.reviewsIndex]);
 
-      return {
-        review_id: result.review_id || result.id,
-        product_id: result.product_id,
-        text: result.review_text || '',
-        sentiment: sentiment,
-        criteria: criteria
-      };
-    });
-  }, [rawData.results]);
-
-  // Анализ тональности
-  const sentimentData = useMemo(() => {
-    if (!reviewsData.length) return [];
+  const reviewsPages = rawData.reviewsIndex?.products?.[reviewsProduct]?.pages || 0;
 
-    const counts = { 'положительный': 0, 'нейтральный': 0, 'отрицательный': 0 };
-    reviewsData.forEach(review => {
-      counts[review.sentiment]++;
-    });
+  // Анализ тональности (из dashboard_summary.json)
+  const sentimentData = useMemo(() => {
+    const counts = rawData.summary?.sentiment;
+    if (!counts) return [];
 
     return [
       { name: 'Положительные', value: counts['положительный'], color: COLORS.positive },
       { name: 'Нейтральные', value: counts['нейтральный'], color: COLORS.neutral },
       { name: 'Отрицательные', value: counts['отрицательный'], color: COLORS.danger }
     ];
-  }, [reviewsData]);
+  }, [rawData.summary]);
 
-  // Средние оценки по критериям
+  // Средние оценки по критериям (из dashboard_summary.json)
   const criteriaAverages = useMemo(() => {
-    if (!reviewsData.length) return [];
-
-    const criteriaSums = {};
-    const criteriaCounts = {};
-
-    reviewsData.forEach(review => {
-      review.criteria.forEach(crit => {
-        const name = crit.критерий;
-        if (!criteriaSums[name]) {
-          criteriaSums[name] = 0;
-          criteriaCounts[name] = 0;
-        }
-        criteriaSums[name] += crit.оценка;
-        criteriaCounts[name]++;
-      });
-    });
-
-    return Object.keys(criteriaSums).map(name => ({
-      критерий: name,
-      средняя: parseFloat((criteriaSums[name] / criteriaCounts[name]).toFixed(1))
+    if (!rawData.summary?.criteria) return [];
+
+    return rawData.summary.criteria.map(item => ({
+      критерий: item.критерий,
+      средняя: parseFloat(item.средняя.toFixed(1)),
+      распределение: item.распределение
     }));
-  }, [reviewsData]);
+  }, [rawData.summary]);
 
   // Данные для радар-чарта
   const radarData = useMemo(() => {
@@ -546,6 +543,47 @@ function App() {
             </div>
           )}
 
+          {/* Выбор товара и страницы */}
+          {reviewsProduct && (
+            <div style={{
+              display: 'flex',
+              alignItems: 'center',
+              gap: '1rem',
+              flexWrap: 'wrap',
+              background: 'rgba(255, 255, 255, 0.95)',
+              borderRadius: '1rem',
+              padding: '1rem 1.5rem',
+              marginBottom: '1.5rem'
+            }}>
+              <select
+                value={reviewsProduct}
+                onChange={(e) => { setReviewsProduct(e.target.value); setReviewsPage(1); }}
+                style={{ padding: '0.5rem', borderRadius: '0.5rem', border: '1px solid #e2e8f0', maxWidth: '400px' }}
+              >
+                {Object.entries(rawData.reviewsIndex.products).map(([id, info]) => (
+                  <option key={id} value={id}>{info.name} ({info.reviews})</option>
+                ))}
+              </select>
+              <button
+                onClick={() => setReviewsPage(page => Math.max(1, page - 1))}
+                disabled={reviewsPage <= 1}
+                style={{ padding: '0.5rem 1rem', borderRadius: '0.5rem', border: 'none', cursor: 'pointer' }}
+              >
+                ←
+              </button>
+              <span style={{ color: COLORS.neutral }}>
+                Страница {reviewsPage} из {reviewsPages}{reviewsLoading ? ' ⏳' : ''}
+              </span>
+              <button
+                onClick={() => setReviewsPage(page => Math.min(reviewsPages, page + 1))}
+                disabled={reviewsPage >= reviewsPages}
+                style={{ padding: '0.5rem 1rem', borderRadius: '0.5rem', border: 'none', cursor: 'pointer' }}
+              >
+                →
+              </button>
+            </div>
+          )}
+
           <div style={{ display: 'grid', gap: '1.5rem' }}>
             {reviewsData.map((review) => {
               const sentimentColor = 
@@ -555,7 +593,7 @@ function App() {
 
               return (
                 <div
-                  key={review.review_id}
+                  key={`${review.review_id}|${review.model}`}
                   style={{
                     background: 'rgba(255, 255, 255, 0.95)',
                     backdropFilter: 'blur(10px)',
@@ -568,6 +606,11 @@ function App() {
                   <div style={{ display: 'flex', justifyContent: 'space-between', marginBottom: '1rem' }}>
                     <h4 style={{ margin: 0, fontSize: '1.1rem', fontWeight: '600', color: COLORS.primary }}>
                       Отзыв #{review.review_id}
+                      {review.model && (
+                        <span style={{ marginLeft: '0.75rem', fontSize: '0.85rem', fontWeight: '400', color: COLORS.neutral }}>
+                          {review.model}
+                        </span>
+                      )}
                     </h4>
                     <div style={{
                       background: sentimentColor,
@@ -0,0 +1,175 @@
+"""
+Пул прогретых браузерных контекстов Playwright
+Браузер запускается один раз, страницы переиспользуются между URL
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+
+logger = logging.getLogger(__name__)
+
+
+class PooledPage:
+    """Слот пула: контекст + страница + счетчик переходов"""
+
+    def __init__(self, context: BrowserContext, page: Page):
+        self.context = context
+        self.page = page
+        self.navigations = 0
+
+
+class BrowserPool:
+    """
+    Пул из N контекстов (по одной странице в каждом) поверх одного браузера.
+    Контекст пересоздается после max_navigations переходов, чтобы память не росла.
+    """
+
+    def __init__(
+        self,
+        browser_type: str = "chromium",
+        size: int = 4,
+        max_navigations: int = 20,
+        launch_options: Optional[Dict[str, Any]] = None,
+        context_options: Optional[Dict[str, Any]] = None,
+        init_script: Optional[str] = None,
+        context_setup: Optional[Callable[[BrowserContext], Awaitable[None]]] = None,
+        default_timeout: int = 30000,
+        navigation_timeout: int = 60000,
+    ):
+        """
+        Args:
+            browser_type: 'chromium' или 'firefox'
+            size: количество страниц, работающих параллельно
+            max_navigations: после скольких переходов контекст пересоздается
+            context_setup: корутина, применяемая к каждому новому контексту
+                (например, page_filters.block_heavy_resources)
+        """
+        self.browser_type = browser_type
+        self.size = size
+        self.max_navigations = max_navigations
+        self.launch_options = launch_options or {"headless": True}
+        self.context_options = context_options or {}
+        self.init_script = init_script
+        self.context_setup = context_setup
+        self.default_timeout = default_timeout
+        self.navigation_timeout = navigation_timeout
+
+        self.playwright = None
+        self.browser: Optional[Browser] = None
+        self._slots: List[PooledPage] = []
+        # В очереди свободные слоты; None — слот, который не удалось пересоздать
+        # (создается заново при следующем acquire)
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        """Запуск браузера и создание всех слотов"""
+        logger.info(f"Запуск пула браузера ({self.browser_type}, страниц: {self.size})...")
+
+        self.playwright = await async_playwright().start()
+        launcher = getattr(self.playwright, self.browser_type)
+        self.browser = await launcher.launch(**self.launch_options)
+
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            slot = await self._new_slot()
+            self._slots.append(slot)
+            self._idle.put_nowait(slot)
+
+        logger.info("Пул браузера готов")
+
+    async def close(self):
+        """Закрытие всех контекстов и браузера"""
+        for slot in self._slots:
+            try:
+                await slot.context.close()
+            except Exception:
+                pass
+        self._slots = []
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+        logger.info("Пул браузера закрыт")
+
+    async def _new_slot(self) -> PooledPage:
+        """Новый контекст с одной страницей"""
+        context = await self.browser.new_context(**self.context_options)
+        if self.init_script:
+            await context.add_init_script(self.init_script)
+        if self.context_setup:
+            await self.context_setup(context)
+
+        page = await context.new_page()
+        page.set_default_timeout(self.default_timeout)
+        page.set_default_navigation_timeout(self.navigation_timeout)
+        return PooledPage(context, page)
+
+    async def _recycle(self, slot: PooledPage) -> PooledPage:
+        """Пересоздание контекста, отработавшего свой лимит переходов"""
+        logger.info(f"♻️ Пересоздание контекста после {slot.navigations} переходов")
+        try:
+            await slot.context.close()
+        except Exception as e:
+            logger.debug(f"Ошибка закрытия контекста: {e}")
+
+        try:
+            fresh = await self._new_slot()
+        except Exception:
+            # старый контекст уже закрыт — в пуле его больше нет
+            self._slots.remove(slot)
+            raise
+        self._slots[self._slots.index(slot)] = fresh
+        return fresh
+
+    async def acquire(self) -> PooledPage:
+        """Взять свободную страницу (ждет, если все заняты)"""
+        slot = await self._idle.get()
+        if slot is None:
+            try:
+                slot = await self._new_slot()
+            except Exception:
+                self._idle.put_nowait(None)
+                raise
+            self._slots.append(slot)
+        return slot
+
+    async def release(self, slot: PooledPage, broken: bool = False):
+        """
+        Вернуть страницу в пул. Переход засчитывается здесь;
+        сломанный или отработавший лимит слот пересоздается.
+        """
+        slot.navigations += 1
+        if broken or slot.navigations >= self.max_navigations:
+            try:
+                slot = await self._recycle(slot)
+            except Exception as e:
+                # место в пуле не теряется: слот пересоздастся при следующем acquire
+                logger.warning(f"⚠️ Не удалось пересоздать контекст: {e}")
+                self._idle.put_nowait(None)
+                raise
+        self._idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def page(self):
+        """async with pool.page() as page: ..."""
+        slot = await self.acquire()
+        broken = False
+        try:
+            yield slot.page
+        except Exception:
+            broken = True
+            raise
+        finally:
+            await self.release(slot, broken=broken)
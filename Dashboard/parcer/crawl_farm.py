@@ -0,0 +1,319 @@
+"""
+Ферма парсинга: N процессов с headless-браузерами и общей очередью URL в SQLite
+Каждый воркер забирает URL из очереди, парсит через parser_engine и пишет результат
+в ту же базу. Скорость (страниц/мин) считается по каждому воркеру.
+
+Для чистого Linux-сервера достаточно браузеров Playwright:
+    python -m playwright install --with-deps chromium firefox
+
+Пример:
+    python crawl_farm.py add urls.txt
+    python crawl_farm.py run --workers 8 --backend playwright-chromium
+    python crawl_farm.py stats
+    python crawl_farm.py export --output-dir .
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB = "crawl_farm.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending / running / done / failed
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS urls_status ON urls(status);
+
+CREATE TABLE IF NOT EXISTS results (
+    url TEXT PRIMARY KEY,
+    product TEXT NOT NULL,
+    reviews TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    finished_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    backend TEXT,
+    pid INTEGER,
+    pages INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    started_at REAL,
+    updated_at REAL
+);
+"""
+
+
+def connect(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Соединение с базой фермы (WAL: читатели не блокируют писателей)"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def add_urls(conn: sqlite3.Connection, urls: List[str]) -> int:
+    """Добавление URL в очередь (повторы игнорируются). Возвращает число новых"""
+    before = conn.total_changes
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT OR IGNORE INTO urls(url, updated_at) VALUES (?, ?)",
+        [(url, time.time()) for url in urls],
+    )
+    conn.execute("COMMIT")
+    return conn.total_changes - before
+
+
+def reset_stale(conn: sqlite3.Connection, max_attempts: int) -> None:
+    """URL, оставшиеся в running после падения прошлого запуска, снова в очередь"""
+    conn.execute(
+        "UPDATE urls SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END "
+        "WHERE status = 'running'",
+        (max_attempts,),
+    )
+
+
+def claim_url(conn: sqlite3.Connection, worker: str) -> Optional[str]:
+    """Атомарно забрать следующий URL из очереди"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT url FROM urls WHERE status = 'pending' LIMIT 1").fetchone()
+        if row:
+            conn.execute(
+                "UPDATE urls SET status = 'running', worker = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE url = ?",
+                (worker, time.time(), row[0]),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row[0] if row else None
+
+
+def store_result(conn: sqlite3.Connection, worker: str, url: str, result: Dict[str, Any], seconds: float):
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO results(url, product, reviews, worker, seconds, finished_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (url, json.dumps(result["product"], ensure_ascii=False),
+             json.dumps(result["reviews"], ensure_ascii=False), worker, seconds, now),
+        )
+        conn.execute("UPDATE urls SET status = 'done', error = NULL, updated_at = ? WHERE url = ?", (now, url))
+        conn.execute("UPDATE workers SET pages = pages + 1, updated_at = ? WHERE worker = ?", (now, worker))
+        conn.execute("COMMIT")
+    except Exception:
+        # иначе store_failure не сможет открыть транзакцию на этом соединении
+        conn.execute("ROLLBACK")
+        raise
+
+
+def store_failure(conn: sqlite3.Connection, worker: str, url: str, error: str, max_attempts: int):
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "UPDATE urls SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = ?, updated_at = ? WHERE url = ?",
+            (max_attempts, error[:500], now, url),
+        )
+        conn.execute("UPDATE workers SET failures = failures + 1, updated_at = ? WHERE worker = ?", (now, worker))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+# === Воркер ===
+
+async def _worker_loop(db_path: str, worker: str, backend: str, tabs: int, max_attempts: int):
+    from drivers import make_driver
+    from parser_engine import ParserEngine
+
+    # Соединение используется из потоков asyncio.to_thread, по одному вызову за раз (db_lock):
+    # ожидание блокировки SQLite (busy_timeout) не останавливает event loop с вкладками
+    conn = connect(db_path, check_same_thread=False)
+    conn.execute(
+        "INSERT OR REPLACE INTO workers(worker, backend, pid, pages, failures, started_at, updated_at) "
+        "VALUES (?, ?, ?, 0, 0, ?, ?)",
+        (worker, backend, os.getpid(), time.time(), time.time()),
+    )
+    db_lock = asyncio.Lock()
+
+    async def db(fn, *args):
+        async with db_lock:
+            return await asyncio.to_thread(fn, conn, *args)
+
+    engine = ParserEngine(make_driver(backend, concurrency=tabs, headless=True))
+    await engine.start()
+
+    async def tab_loop():
+        # Каждая вкладка воркера забирает URL независимо
+        while True:
+            url = await db(claim_url, worker)
+            if url is None:
+                return
+            started = time.monotonic()
+            try:
+                result = await engine.parse_url(url)
+                await db(store_result, worker, url, result, time.monotonic() - started)
+            except Exception as e:
+                logger.error(f"❌ {url}: {e}")
+                engine.stats.failures += 1
+                await db(store_failure, worker, url, str(e), max_attempts)
+
+    try:
+        await asyncio.gather(*(tab_loop() for _ in range(tabs)))
+    finally:
+        await engine.close()
+        conn.close()
+    logger.info(f"🏁 {worker}: очередь пуста, {engine.stats.summary()}")
+
+
+def run_worker(db_path: str, worker: str, backend: str, tabs: int, max_attempts: int):
+    """Точка входа процесса-воркера"""
+    asyncio.run(_worker_loop(db_path, worker, backend, tabs, max_attempts))
+
+
+# === Статистика и экспорт ===
+
+def worker_stats(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Скорость по каждому воркеру: страниц/мин от старта до последнего результата"""
+    rows = conn.execute(
+        "SELECT worker, backend, pages, failures, started_at, updated_at FROM workers ORDER BY worker"
+    ).fetchall()
+    stats = []
+    for worker, backend, pages, failures, started_at, updated_at in rows:
+        minutes = max((updated_at or started_at) - started_at, 1e-6) / 60
+        stats.append({
+            "worker": worker,
+            "backend": backend,
+            "pages": pages,
+            "failures": failures,
+            "pages_per_min": round(pages / minutes, 2) if pages else 0,
+        })
+    return stats
+
+
+def queue_stats(conn: sqlite3.Connection) -> Dict[str, int]:
+    return dict(conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status").fetchall())
+
+
+def print_stats(conn: sqlite3.Connection):
+    print(f"\n📋 Очередь: {queue_stats(conn)}")
+    total = 0.0
+    for s in worker_stats(conn):
+        total += s["pages_per_min"]
+        print(f"  {s['worker']:<12} {s['backend']:<22} страниц: {s['pages']:<6} "
+              f"ошибок: {s['failures']:<4} {s['pages_per_min']:>8} стр/мин")
+    print(f"  {'итого':<12} {'':<22} {'':<30} {round(total, 2):>8} стр/мин")
+
+
+def export_results(conn: sqlite3.Connection, output_dir: str = "."):
+    """Выгрузка результатов в product.json / reviews.json"""
+    from parser_engine import save_results
+
+    results = [
+        {"product": json.loads(product), "reviews": json.loads(reviews)}
+        for product, reviews in conn.execute("SELECT product, reviews FROM results ORDER BY finished_at")
+    ]
+    save_results(results, output_dir)
+
+
+def run_farm(db_path: str, workers: int, backend: str, tabs: int, max_attempts: int,
+             report_every: float = 30):
+    conn = connect(db_path)
+    reset_stale(conn, max_attempts)
+    logger.info(f"🚜 Запуск {workers} воркеров ({backend}, вкладок на воркер: {tabs}), очередь: {queue_stats(conn)}")
+
+    # spawn, а не fork: браузерные драйверы и asyncio не переживают fork
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(
+            target=run_worker,
+            args=(db_path, f"worker-{i + 1}", backend, tabs, max_attempts),
+            name=f"worker-{i + 1}",
+        )
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        while any(p.is_alive() for p in processes):
+            for p in processes:
+                p.join(timeout=report_every / len(processes))
+            print_stats(conn)
+    except KeyboardInterrupt:
+        logger.warning("⏹️ Остановка воркеров...")
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.join()
+        reset_stale(conn, max_attempts)
+
+    print_stats(conn)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Параллельный парсинг маркетплейсов headless-браузерами")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite база с очередью и результатами")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="Добавить URL в очередь")
+    add.add_argument("file", help="Файл со списком URL (по одному на строку)")
+
+    run = sub.add_parser("run", help="Запустить воркеры")
+    run.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Количество процессов")
+    run.add_argument("--backend", default="playwright-chromium",
+                     help="playwright-chromium, playwright-firefox, selenium-chrome, selenium-chrome-uc, selenium-firefox")
+    run.add_argument("--tabs", type=int, default=2, help="Параллельных страниц на воркер")
+    run.add_argument("--max-attempts", type=int, default=3, help="Попыток на URL")
+    run.add_argument("--report-every", type=float, default=30, help="Период вывода статистики, сек")
+
+    sub.add_parser("stats", help="Статистика очереди и воркеров")
+
+    export = sub.add_parser("export", help="Выгрузить product.json и reviews.json")
+    export.add_argument("--output-dir", default=".")
+
+    args = parser.parse_args()
+
+    if args.command == "add":
+        with open(args.file, "r", encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        conn = connect(args.db)
+        print(f"✅ Добавлено URL: {add_urls(conn, urls)} из {len(urls)}")
+    elif args.command == "run":
+        run_farm(args.db, args.workers, args.backend, args.tabs, args.max_attempts, args.report_every)
+    elif args.command == "stats":
+        print_stats(connect(args.db))
+    elif args.command == "export":
+        export_results(connect(args.db), args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
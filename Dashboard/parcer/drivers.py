@@ -0,0 +1,322 @@
+"""
+Браузерные драйверы для parser_engine
+Playwright (Chromium / Firefox) и Selenium (Chrome / undetected-chromedriver / Firefox)
+дают одинаковый интерфейс страницы, поэтому экстракторы и планировщик общие.
+Библиотеки бэкендов импортируются лениво: установлен должен быть только используемый.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from parser_engine import Driver, PageHandle
+
+logger = logging.getLogger(__name__)
+
+CHROME_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+FIREFOX_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:121.0) Gecko/20100101 Firefox/121.0"
+
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3, 4, 5] });
+"""
+
+# Тексты всех элементов по списку селекторов — за один вызов в браузер
+TEXTS_JS = """(args) => {
+    const [selectors, limit] = args;
+    for (const selector of selectors) {
+        let nodes;
+        try { nodes = document.querySelectorAll(selector); } catch (e) { continue; }
+        const texts = [];
+        for (const node of nodes) {
+            const text = (node.innerText || node.textContent || '').trim();
+            if (text) texts.push(text);
+            if (texts.length >= limit) break;
+        }
+        if (texts.length) return texts;
+    }
+    return [];
+}"""
+
+
+# === Playwright ===
+
+class PlaywrightPage(PageHandle):
+    """Страница Playwright из пула"""
+
+    def __init__(self, page):
+        self.page = page
+        self.capture = None
+
+    async def open(self, url: str, site, is_known=None) -> None:
+        from page_filters import goto_and_wait
+        from review_capture import ReviewCapture
+
+        await self.release()
+        self.capture = ReviewCapture(site.key, site.product_key(url), is_known=is_known)
+        self.capture.attach(self.page)
+        await goto_and_wait(self.page, url, site.ready_selectors)
+
+    async def release(self) -> None:
+        if self.capture:
+            self.capture.detach()
+            self.capture = None
+
+    async def all_texts(self, selectors: List[str], limit: int = 50) -> List[str]:
+        return await self.page.evaluate(TEXTS_JS, [selectors, limit])
+
+    async def title(self) -> str:
+        return await self.page.title()
+
+    async def scroll_to_reviews(self, tab_selectors: List[str], review_selectors: List[str]) -> None:
+        from page_filters import wait_for_any
+
+        for selector in tab_selectors:
+            button = await self.page.query_selector(selector)
+            if button:
+                try:
+                    await button.click()
+                    break
+                except Exception:
+                    continue
+        await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight / 2)")
+        await wait_for_any(self.page, review_selectors, timeout=5000)
+
+    async def api_reviews(self, timeout: float = 10) -> Optional[List[Dict[str, Any]]]:
+        if not self.capture:
+            return None
+        if not self.capture.reviews and not self.capture.reached_known:
+            # Прокрутка к блоку отзывов и запускает XHR
+            await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight / 2)")
+            if not await self.capture.wait(timeout):
+                logger.warning("⚠️ API отзывов не ответил, читаем DOM")
+                return None
+        return self.capture.result()
+
+
+class PlaywrightDriver(Driver):
+    """Playwright поверх BrowserPool: N прогретых страниц, блокировка тяжелых ресурсов"""
+
+    def __init__(self, browser_type: str = "chromium", concurrency: int = 4,
+                 max_navigations: int = 20, headless: bool = True):
+        self.browser_type = browser_type
+        self.concurrency = concurrency
+        self.max_navigations = max_navigations
+        self.headless = headless
+        self.pool = None
+
+    async def start(self) -> None:
+        from browser_pool import BrowserPool
+        from page_filters import block_heavy_resources
+
+        if self.browser_type == "firefox":
+            launch_options = {"headless": self.headless}
+            context_options = {
+                "viewport": {"width": 1920, "height": 1080},
+                "user_agent": FIREFOX_USER_AGENT,
+                "locale": "ru-RU",
+            }
+        else:
+            launch_options = {
+                "headless": self.headless,
+                "args": [
+                    "--disable-blink-features=AutomationControlled",
+                    "--disable-dev-shm-usage",
+                    "--no-sandbox",
+                ],
+            }
+            context_options = {
+                "viewport": {"width": 1920, "height": 1080},
+                "user_agent": CHROME_USER_AGENT,
+                "java_script_enabled": True,
+                "ignore_https_errors": True,
+            }
+
+        self.pool = BrowserPool(
+            browser_type=self.browser_type,
+            size=self.concurrency,
+            max_navigations=self.max_navigations,
+            launch_options=launch_options,
+            context_options=context_options,
+            init_script=STEALTH_SCRIPT,
+            context_setup=block_heavy_resources,
+        )
+        await self.pool.start()
+
+    async def close(self) -> None:
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
+    @asynccontextmanager
+    async def page(self):
+        async with self.pool.page() as page:
+            handle = PlaywrightPage(page)
+            try:
+                yield handle
+            finally:
+                await handle.release()
+
+
+# === Selenium ===
+
+def _build_chrome(headless: bool):
+    """Стандартный Selenium + webdriver-manager"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    options = Options()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument(f'--user-agent={CHROME_USER_AGENT}')
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': STEALTH_SCRIPT})
+    return driver
+
+
+def _build_chrome_uc(headless: bool):
+    """undetected-chromedriver — для сайтов с защитой"""
+    import undetected_chromedriver as uc
+
+    options = uc.ChromeOptions()
+    if headless:
+        options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument('--log-level=3')
+    return uc.Chrome(options=options, version_main=None)
+
+
+def _build_firefox(headless: bool):
+    """Selenium + geckodriver"""
+    from selenium import webdriver
+    from selenium.webdriver.firefox.options import Options
+    from selenium.webdriver.firefox.service import Service
+    from webdriver_manager.firefox import GeckoDriverManager
+
+    options = Options()
+    if headless:
+        options.add_argument('--headless')
+    options.set_preference('dom.webdriver.enabled', False)
+    options.set_preference('useAutomationExtension', False)
+    return webdriver.Firefox(service=Service(GeckoDriverManager().install()), options=options)
+
+
+SELENIUM_BUILDERS = {
+    "chrome": _build_chrome,
+    "chrome-uc": _build_chrome_uc,
+    "firefox": _build_firefox,
+}
+
+
+class SeleniumPage(PageHandle):
+    """
+    Обертка над WebDriver. Selenium синхронный, поэтому каждый вызов уходит
+    в поток; один WebDriver одновременно используется только одной задачей.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    async def _call(self, func, *args):
+        return await asyncio.to_thread(func, *args)
+
+    async def open(self, url: str, site, is_known=None) -> None:
+        from selenium_waits import wait_for_any
+
+        await self._call(self.driver.get, url)
+        await self._call(wait_for_any, self.driver, site.ready_selectors)
+
+    async def all_texts(self, selectors: List[str], limit: int = 50) -> List[str]:
+        script = f"return ({TEXTS_JS})(arguments[0]);"
+        return await self._call(self.driver.execute_script, script, [selectors, limit]) or []
+
+    async def title(self) -> str:
+        return await self._call(lambda: self.driver.title)
+
+    async def scroll_to_reviews(self, tab_selectors: List[str], review_selectors: List[str]) -> None:
+        from selenium_waits import scroll_until_stable
+
+        def scroll():
+            for selector in tab_selectors:
+                clicked = self.driver.execute_script(
+                    "const el = document.querySelector(arguments[0]); if (el) { el.click(); return true; } return false;",
+                    selector,
+                )
+                if clicked:
+                    break
+            return scroll_until_stable(self.driver, ", ".join(review_selectors))
+
+        count = await self._call(scroll)
+        logger.info(f"📜 Прокрутка завершена, карточек отзывов: {count}")
+
+    async def api_reviews(self, timeout: float = 10) -> Optional[List[Dict[str, Any]]]:
+        # Selenium не видит тела XHR-ответов — только DOM
+        return None
+
+
+class SeleniumDriver(Driver):
+    """Пул из concurrency экземпляров WebDriver"""
+
+    def __init__(self, browser: str = "chrome", concurrency: int = 1, headless: bool = True):
+        if browser not in SELENIUM_BUILDERS:
+            raise ValueError(f"Неизвестный браузер Selenium: {browser}")
+        self.browser = browser
+        self.concurrency = concurrency
+        self.headless = headless
+        self._drivers: List[Any] = []
+        self._idle: Optional[asyncio.Queue] = None
+
+    async def start(self) -> None:
+        logger.info(f"🚗 Запуск Selenium ({self.browser}, экземпляров: {self.concurrency})...")
+        build = SELENIUM_BUILDERS[self.browser]
+        self._idle = asyncio.Queue()
+        for _ in range(self.concurrency):
+            driver = await asyncio.to_thread(build, self.headless)
+            self._drivers.append(driver)
+            self._idle.put_nowait(driver)
+
+    async def close(self) -> None:
+        for driver in self._drivers:
+            try:
+                await asyncio.to_thread(driver.quit)
+            except Exception as e:
+                logger.debug(f"Ошибка закрытия драйвера: {e}")
+        self._drivers = []
+        logger.info("🔒 Selenium закрыт")
+
+    @asynccontextmanager
+    async def page(self):
+        driver = await self._idle.get()
+        try:
+            yield SeleniumPage(driver)
+        finally:
+            self._idle.put_nowait(driver)
+
+
+def make_driver(backend: str, concurrency: int = 1, headless: bool = True) -> Driver:
+    """
+    Драйвер по имени: 'playwright-chromium', 'playwright-firefox',
+    'selenium-chrome', 'selenium-chrome-uc', 'selenium-firefox'
+    """
+    if backend.startswith("playwright-"):
+        return PlaywrightDriver(backend.split("-", 1)[1], concurrency=concurrency, headless=headless)
+    if backend.startswith("selenium-"):
+        return SeleniumDriver(backend.split("-", 1)[1], concurrency=concurrency, headless=headless)
+    raise ValueError(f"Неизвестный драйвер: {backend}")
@@ -0,0 +1,206 @@
+"""
+Извлечение данных товара для конкретных маркетплейсов
+Экстракторы не зависят от браузера: работают через PageHandle из parser_engine
+"""
+
+import re
+import logging
+from typing import Any, Dict, List, Optional
+
+import repo_root  # noqa: F401
+from review_ids import product_id_from_url, review_id
+
+logger = logging.getLogger(__name__)
+
+# Служебные фразы, которые попадают в текст карточки отзыва вместе с самим отзывом
+_REVIEW_NOISE = [
+    re.compile(r'^\d+,?\d*\s*оценк[аи]?\s*'),
+    re.compile(r'Смотреть все фото и видео\s*'),
+    re.compile(r'Закреплён\s*'),
+    re.compile(r'Плюсы товара\s*'),
+    re.compile(r'^\d+\s+(января|февраля|марта|апреля|мая|июня|июля|августа|сентября|октября|ноября|декабря)\s*'),
+]
+
+
+def extract_number(text: str) -> Optional[int]:
+    """Извлечение числа из текста"""
+    if not text:
+        return None
+    cleaned = re.sub(r'[^\d]', '', text)
+    return int(cleaned) if cleaned.isdigit() else None
+
+
+def clean_review_text(text: str) -> str:
+    """Удаление служебных фраз из текста отзыва"""
+    text = text.strip()
+    for pattern in _REVIEW_NOISE:
+        text = pattern.sub('', text)
+    return text.strip()
+
+
+class SiteExtractor:
+    """Базовый экстрактор: наборы селекторов + общий порядок извлечения"""
+
+    key = ""
+    domains: List[str] = []
+    ready_selectors: List[str] = ["h1"]
+    name_selectors: List[str] = ["h1"]
+    price_selectors: List[str] = []
+    description_selectors: List[str] = []
+    characteristics_selectors: List[str] = []
+    review_selectors: List[str] = []
+    review_tab_selectors: List[str] = []
+
+    def matches(self, url: str) -> bool:
+        return any(domain in url for domain in self.domains)
+
+    def product_key(self, url: str) -> str:
+        """ID товара в product.json / reviews.json: "<маркетплейс>_<артикул>" """
+        return product_id_from_url(url)
+
+    async def extract(self, handle, url: str, max_reviews: int = 10) -> Dict[str, Any]:
+        """Полное извлечение товара и отзывов со страницы, уже открытой в handle"""
+        product_key = self.product_key(url)
+
+        name = await self._name(handle)
+        price = await self._price(handle)
+        description = await handle.first_text(self.description_selectors, min_len=20) or ""
+        characteristics = await handle.first_text(self.characteristics_selectors) or ""
+
+        # Отзывы: сначала перехваченный API, DOM — запасной вариант
+        reviews = await handle.api_reviews()
+        if reviews is not None:
+            logger.info(f"📡 Отзывы из API: {len(reviews)}")
+        else:
+            reviews = await self._dom_reviews(handle, product_key, max_reviews)
+
+        if name:
+            logger.info(f"✅ Название: {name[:60]}...")
+        else:
+            logger.warning("⚠️ Название не найдено")
+
+        return {
+            "product": {
+                "id": product_key,
+                "name": name or "Товар без названия",
+                "url": url,
+                "price": price,
+                "currency": "RUB",
+                "description": description[:500],
+                "characteristics": characteristics[:500],
+            },
+            "reviews": reviews,
+        }
+
+    async def _name(self, handle) -> Optional[str]:
+        name = await handle.first_text(self.name_selectors, min_len=4)
+        if name:
+            return name
+
+        # Запасной вариант — заголовок вкладки
+        title = await handle.title()
+        if title and "Wildberries" not in title and "OZON" not in title:
+            name = title.split(" / ")[0].split(" | ")[0].strip()
+            if len(name) > 5:
+                return name
+        return None
+
+    async def _price(self, handle) -> Optional[int]:
+        selectors = self.price_selectors + ["[class*='price']", "[class*='Price']"]
+        for text in await handle.all_texts(selectors, limit=50):
+            price = extract_number(re.split(r'[^\d\s]', text.strip())[0]) or extract_number(text)
+            if price and 100 < price < 1000000:
+                logger.info(f"💰 Цена: {price} ₽")
+                return price
+        logger.warning("⚠️ Цена не найдена")
+        return None
+
+    async def _dom_reviews(self, handle, product_key: str, max_reviews: int) -> List[Dict[str, Any]]:
+        """Отзывы из DOM: один запрос за всеми текстами, затем очистка и дедупликация"""
+        await handle.scroll_to_reviews(self.review_tab_selectors, self.review_selectors)
+
+        reviews = []
+        seen_texts = set()
+        for text in await handle.all_texts(self.review_selectors, limit=max_reviews * 3):
+            text = clean_review_text(text)
+            if len(text) > 30 and text not in seen_texts:
+                seen_texts.add(text)
+                reviews.append({
+                    "id": review_id(product_key, text),
+                    "product_id": product_key,
+                    "text": text[:1000],
+                })
+            if len(reviews) >= max_reviews:
+                break
+        return reviews
+
+
+class WildberriesExtractor(SiteExtractor):
+    key = "wb"
+    domains = ["wildberries", "wb.ru"]
+    ready_selectors = ["h1", ".product-page__title", ".price-block__final-price"]
+    name_selectors = [
+        "h1[class*='product-page__title']",
+        "h1",
+        ".product-page__header h1",
+    ]
+    price_selectors = [
+        "ins.price-block__final-price",
+        ".price-block__final-price",
+        "[class*='price-block__final']",
+        "[class*='final-price']",
+    ]
+    description_selectors = [
+        ".product-page__description-text",
+        "[class*='description']",
+        ".collapsable__content p",
+    ]
+    characteristics_selectors = [
+        ".product-params__table",
+        "[class*='params']",
+    ]
+    review_selectors = [
+        ".comments__item",
+        ".feedback__item",
+    ]
+    review_tab_selectors = [
+        "a[href*='#comments']",
+        "[data-link*='comments']",
+    ]
+
+
+class OzonExtractor(SiteExtractor):
+    key = "ozon"
+    domains = ["ozon"]
+    ready_selectors = ["[data-widget='webProductHeading'] h1", "[data-widget='webPrice']", "h1"]
+    name_selectors = ["[data-widget='webProductHeading'] h1", "h1"]
+    price_selectors = [
+        "[data-widget='webPrice'] span",
+        "[data-widget='price']",
+        "[class*='Price_price']",
+    ]
+    description_selectors = [
+        "[data-widget='webDescription']",
+        "[class*='ProductDescription']",
+        ".product-description",
+    ]
+    characteristics_selectors = [
+        "[data-widget='webCharacteristics']",
+        "[class*='Characteristics']",
+    ]
+    review_selectors = [
+        "[data-widget='webReviews'] [data-review-uuid]",
+        "[data-widget='webListReviews'] > div",
+        "[class*='ReviewCard']",
+    ]
+
+
+EXTRACTORS: List[SiteExtractor] = [WildberriesExtractor(), OzonExtractor()]
+
+
+def extractor_for(url: str, extractors: Optional[List[SiteExtractor]] = None) -> SiteExtractor:
+    """Выбор экстрактора по URL"""
+    for extractor in extractors or EXTRACTORS:
+        if extractor.matches(url):
+            return extractor
+    raise ValueError("Неподдерживаемый маркетплейс. Используйте WB или Ozon URL")
@@ -0,0 +1,103 @@
+"""
+Облегченная загрузка страниц в Playwright
+Блокировка тяжелых ресурсов/трекеров и ожидание нужных селекторов вместо фиксированных пауз
+"""
+
+import logging
+from typing import Iterable, Optional, Union
+from urllib.parse import urlparse
+from playwright.async_api import BrowserContext, Page, Route
+
+logger = logging.getLogger(__name__)
+
+# Типы ресурсов, которые не нужны для извлечения текста
+BLOCKED_RESOURCE_TYPES = frozenset({
+    "image",
+    "media",
+    "font",
+    "texttrack",
+    "manifest",
+})
+
+# Аналитика и реклама (совпадение по домену и его поддоменам)
+TRACKER_DOMAINS = frozenset({
+    "mc.yandex.ru",
+    "an.yandex.ru",
+    "yandexadexchange.net",
+    "top-fwz1.mail.ru",
+    "ad.mail.ru",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "criteo.com",
+    "criteo.net",
+    "adfox.ru",
+    "adriver.ru",
+    "mediatoday.ru",
+    "vk.com",
+    "tiktok.com",
+    "facebook.net",
+    "sentry.io",
+})
+
+
+def is_tracker(url: str, domains: Iterable[str] = TRACKER_DOMAINS) -> bool:
+    """Относится ли URL к домену трекера (включая поддомены)"""
+    host = urlparse(url).hostname or ""
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+async def block_heavy_resources(
+    target: Union[BrowserContext, Page],
+    resource_types: Iterable[str] = BLOCKED_RESOURCE_TYPES,
+    tracker_domains: Iterable[str] = TRACKER_DOMAINS,
+):
+    """
+    Перехват запросов: картинки, шрифты, медиа и трекеры отклоняются,
+    остальное (документ, скрипты, XHR) загружается как обычно.
+    Можно вешать как на контекст, так и на отдельную страницу.
+    """
+    blocked_types = frozenset(resource_types)
+    blocked_domains = frozenset(tracker_domains)
+
+    async def handle(route: Route):
+        request = route.request
+        if request.resource_type in blocked_types or is_tracker(request.url, blocked_domains):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await target.route("**/*", handle)
+    logger.debug("Блокировка тяжелых ресурсов включена")
+
+
+async def wait_for_any(page: Page, selectors: Iterable[str], timeout: int = 15000,
+                       state: str = "attached") -> Optional[str]:
+    """
+    Ожидание первого появившегося селектора из списка (одним запросом через CSS-список).
+    Возвращает совпавший селектор или None по таймауту.
+    """
+    selectors = list(selectors)
+    try:
+        await page.wait_for_selector(", ".join(selectors), timeout=timeout, state=state)
+    except Exception:
+        logger.debug(f"Не дождались ни одного селектора: {selectors}")
+        return None
+
+    for selector in selectors:
+        if await page.query_selector(selector):
+            return selector
+    return selectors[0]
+
+
+async def goto_and_wait(page: Page, url: str, ready_selectors: Iterable[str],
+                        timeout: int = 60000, ready_timeout: int = 15000) -> Optional[str]:
+    """
+    Переход на страницу без ожидания networkidle: ждем только DOM и
+    появление селектора карточки товара.
+    """
+    await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+    matched = await wait_for_any(page, ready_selectors, timeout=ready_timeout)
+    if not matched:
+        logger.warning("⚠️ Карточка товара не отрисовалась за отведенное время")
+    return matched
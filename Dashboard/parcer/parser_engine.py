@@ -0,0 +1,325 @@
+"""
+Единый движок парсинга маркетплейсов
+Драйвер (Playwright / Selenium) отвечает за браузер, экстрактор (WB / Ozon) — за разбор страницы,
+а планировщик ParserEngine — за параллельность, кэш и статистику для всех бэкендов сразу
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import repo_root  # noqa: F401
+from extractors import SiteExtractor, extractor_for
+from review_ids import review_id
+from review_state import ReviewState, merge_reviews
+
+logger = logging.getLogger(__name__)
+
+MOCK_REVIEW_TEMPLATES = [
+    "Отличный товар! Качество превосходное, доставка быстрая. Рекомендую!",
+    "Хорошая покупка. Соответствует описанию, цена приемлемая.",
+    "Доволен покупкой. За эти деньги отличный вариант.",
+    "Неплохо, но есть небольшие недостатки. В целом нормально.",
+    "Качество среднее. Ожидал большего за такую цену.",
+    "Отличное соотношение цены и качества. Буду заказывать еще!",
+]
+
+
+class PageHandle:
+    """Интерфейс страницы, который драйвер отдает экстрактору"""
+
+    async def open(self, url: str, site: SiteExtractor,
+                   is_known: Optional[Callable[[Dict[str, Any]], bool]] = None) -> None:
+        """
+        Переход на URL и ожидание отрисовки карточки.
+        is_known — признак уже скачанного отзыва: такие отзывы пропускаются, а сбор
+        останавливается на странице ответа API, где новых нет
+        """
+        raise NotImplementedError
+
+    async def all_texts(self, selectors: List[str], limit: int = 50) -> List[str]:
+        """Тексты элементов первого сработавшего селектора (одним вызовом в браузер)"""
+        raise NotImplementedError
+
+    async def title(self) -> str:
+        raise NotImplementedError
+
+    async def scroll_to_reviews(self, tab_selectors: List[str], review_selectors: List[str]) -> None:
+        """Открыть вкладку отзывов и дождаться их появления в DOM"""
+        raise NotImplementedError
+
+    async def api_reviews(self, timeout: float = 10) -> Optional[List[Dict[str, Any]]]:
+        """
+        Отзывы, перехваченные из API маркетплейса. None — API недоступен (драйвер
+        этого не умеет или ответа не было), пустой список — новых отзывов нет
+        """
+        return None
+
+    async def first_text(self, selectors: List[str], min_len: int = 1) -> Optional[str]:
+        """Первый текст длиной не меньше min_len по списку селекторов"""
+        for selector in selectors:
+            for text in await self.all_texts([selector], limit=5):
+                if len(text) >= min_len:
+                    return text
+        return None
+
+
+class Driver:
+    """Интерфейс браузерного бэкенда: запуск, остановка и выдача страниц"""
+
+    concurrency: int = 1
+
+    async def start(self) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        raise NotImplementedError
+
+    @asynccontextmanager
+    async def page(self):
+        """async with driver.page() as handle: ... — свободная страница"""
+        raise NotImplementedError
+        yield
+
+
+class EngineStats:
+    """Счетчики и тайминги движка"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.pages = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.reviews = 0
+        self.page_seconds: List[float] = []
+
+    def record(self, seconds: float, reviews: int):
+        self.pages += 1
+        self.reviews += reviews
+        self.page_seconds.append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "pages": self.pages,
+            "failures": self.failures,
+            "cache_hits": self.cache_hits,
+            "reviews": self.reviews,
+            "avg_page_sec": round(sum(self.page_seconds) / len(self.page_seconds), 2) if self.page_seconds else 0,
+            "pages_per_min": round(self.pages / elapsed * 60, 2) if elapsed > 0 else 0,
+            "elapsed_sec": round(elapsed, 2),
+        }
+
+
+class ParserEngine:
+    """
+    Планировщик: раздает URL свободным страницам драйвера (не больше driver.concurrency
+    одновременно), кэширует результаты по URL и собирает статистику.
+    """
+
+    def __init__(
+        self,
+        driver: Driver,
+        extractors: Optional[List[SiteExtractor]] = None,
+        max_reviews: int = 10,
+        cache_dir: Optional[str] = None,
+        cache_ttl: float = 24 * 3600,
+        mock_reviews: bool = False,
+        state_file: Optional[str] = None,
+    ):
+        """
+        Args:
+            driver: браузерный бэкенд (см. drivers.py)
+            extractors: экстракторы сайтов, по умолчанию WB и Ozon
+            max_reviews: сколько отзывов брать из DOM (API отдает все)
+            cache_dir: папка кэша результатов; None — без кэша
+            cache_ttl: сколько секунд результат в кэше считается свежим
+            mock_reviews: подставлять тестовые отзывы, если не найдено ни одного
+            state_file: файл отметок уровня (review_state.json) — инкрементальный режим:
+                отзывы собираются до первого известного, reviews.json дополняется
+        """
+        self.driver = driver
+        self.extractors = extractors
+        self.max_reviews = max_reviews
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        self.mock_reviews = mock_reviews
+        self.state = ReviewState(state_file) if state_file else None
+        self.stats = EngineStats()
+        self._started = False
+
+    async def start(self):
+        if not self._started:
+            await self.driver.start()
+            self._started = True
+
+    async def close(self):
+        if self._started:
+            await self.driver.close()
+            self._started = False
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # --- кэш ---
+
+    def _cache_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _cache_get(self, url: str) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(url)
+        if not os.path.exists(path) or time.time() - os.path.getmtime(path) > self.cache_ttl:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _cache_put(self, url: str, result: Dict[str, Any]):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(url)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    # --- парсинг ---
+
+    def _mock_reviews(self, site: SiteExtractor, product_key: str) -> List[Dict[str, Any]]:
+        logger.warning("⚠️ Отзывы не найдены, используем тестовые")
+        return [
+            {"id": review_id(product_key, text), "product_id": product_key, "text": text}
+            for text in MOCK_REVIEW_TEMPLATES
+        ]
+
+    async def parse_url(self, url: str) -> Dict[str, Any]:
+        """Парсинг одного URL на свободной странице драйвера"""
+        cached = self._cache_get(url)
+        if cached is not None:
+            self.stats.cache_hits += 1
+            logger.info(f"💾 Из кэша: {url}")
+            return cached
+
+        site = extractor_for(url, self.extractors)
+        product_key = site.product_key(url)
+        is_known = (lambda review: self.state.is_known(product_key, review)) if self.state else None
+        started = time.monotonic()
+
+        async with self.driver.page() as handle:
+            logger.info(f"📦 URL: {url}")
+            try:
+                await handle.open(url, site, is_known)
+            except Exception as e:
+                logger.error(f"Ошибка загрузки страницы: {e}")
+                # Попытка еще раз
+                await asyncio.sleep(random.uniform(1, 2))
+                await handle.open(url, site, is_known)
+            result = await site.extract(handle, url, max_reviews=self.max_reviews)
+
+        if self.state:
+            total = len(result["reviews"])
+            result["reviews"] = self.state.new_reviews(product_key, result["reviews"])
+            logger.info(f"🆕 Новых отзывов: {len(result['reviews'])} из {total}")
+
+        # В инкрементальном режиме пустой список — норма, если товар уже скачивался
+        if not result["reviews"] and self.mock_reviews and not (self.state and self.state.watermark(product_key)):
+            result["reviews"] = self._mock_reviews(site, product_key)
+
+        elapsed = time.monotonic() - started
+        self.stats.record(elapsed, len(result["reviews"]))
+        logger.info(f"✅ {url}: отзывов {len(result['reviews'])}, {elapsed:.1f} сек")
+
+        self._cache_put(url, result)
+        return result
+
+    async def parse_many(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Параллельный парсинг списка URL. Ошибка одного URL не останавливает остальные.
+        Порядок результатов совпадает с порядком URL (упавшие пропускаются).
+        """
+        async def parse_one(url: str) -> Optional[Dict[str, Any]]:
+            try:
+                return await self.parse_url(url)
+            except Exception as e:
+                self.stats.failures += 1
+                logger.error(f"❌ Ошибка парсинга {url}: {e}")
+                return None
+
+        results = await asyncio.gather(*(parse_one(url) for url in urls))
+        return [r for r in results if r is not None]
+
+    async def parse_and_save(self, urls: Union[str, List[str]], output_dir: str = "."):
+        """Парсинг одного или нескольких URL и сохранение product.json / reviews.json"""
+        single = isinstance(urls, str)
+        url_list = [urls] if single else list(urls)
+
+        try:
+            await self.start()
+            if single:
+                results = [await self.parse_url(url_list[0])]
+            else:
+                results = await self.parse_many(url_list)
+        finally:
+            await self.close()
+
+        added = save_results(results, output_dir, merge=self.state is not None)
+        if self.state:
+            for product_id in {r["product"]["id"] for r in results}:
+                self.state.advance(product_id, [a for a in added if a.get("product_id") == product_id])
+            self.state.save()
+        logger.info(f"📊 Статистика: {self.stats.summary()}")
+        return results[0] if single else results
+
+
+def _load_list(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError:
+            return []
+    return data if isinstance(data, list) else []
+
+
+def save_results(results: List[Dict[str, Any]], output_dir: str = ".", merge: bool = False) -> List[Dict[str, Any]]:
+    """
+    Сохранение результатов в product.json и reviews.json.
+    merge=True — дополнить существующие файлы: товары заменяются по id,
+    отзывы дописываются без дублей. Возвращает записанные (новые) отзывы.
+    """
+    product_file = os.path.join(output_dir, "product.json")
+    reviews_file = os.path.join(output_dir, "reviews.json")
+
+    product_data = [r["product"] for r in results]
+    incoming_reviews = [review for r in results for review in r["reviews"]]
+
+    if merge:
+        new_ids = {p["id"] for p in product_data}
+        product_data = [p for p in _load_list(product_file) if p.get("id") not in new_ids] + product_data
+        reviews_data = _load_list(reviews_file)
+        added = merge_reviews(reviews_data, incoming_reviews)
+    else:
+        reviews_data = added = incoming_reviews
+
+    with open(product_file, "w", encoding="utf-8") as f:
+        json.dump(product_data, f, ensure_ascii=False, indent=2)
+    logger.info(f"✅ Сохранено: {product_file}")
+
+    with open(reviews_file, "w", encoding="utf-8") as f:
+        json.dump(reviews_data, f, ensure_ascii=False, indent=2)
+    logger.info(f"✅ Сохранено: {reviews_file}")
+    logger.info(f"📊 Товаров: {len(product_data)}, отзывов: {len(reviews_data)} (новых: {len(added)})")
+    return added
@@ -0,0 +1,12 @@
+"""
+Доступ к общим модулям пайплайна из корня репозитория (review_ids, review_state)
+Достаточно импортировать модуль до них: import repo_root  # noqa: F401
+"""
+
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
@@ -0,0 +1,189 @@
+"""
+Перехват отзывов из XHR-ответов маркетплейсов
+WB и Ozon отдают отзывы JSON-ом — забираем его напрямую вместо чтения DOM
+"""
+
+import asyncio
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from playwright.async_api import Page, Response
+
+logger = logging.getLogger(__name__)
+
+# feedbacks1.wb.ru/feedbacks/v1/<imtId>, feedbacks2.wb.ru/feedbacks/v2/<imtId>
+WB_FEEDBACKS_RE = re.compile(r"https://feedbacks\d*\.wb\.ru/feedbacks/v\d+/\d+")
+# composer-api / entrypoint-api отдают состояния виджетов, в том числе список отзывов
+OZON_REVIEWS_RE = re.compile(r"ozon\.ru/api/(composer|entrypoint)-api\.bx/(page|widget)/json")
+
+
+def compose_review_text(pros: str, cons: str, comment: str) -> str:
+    """Текст отзыва в том же виде, что и в reviews.json: Достоинства/Недостатки/Комментарий"""
+    parts = []
+    if pros:
+        parts.append(f"Достоинства: {pros.strip()}")
+    if cons:
+        parts.append(f"Недостатки: {cons.strip()}")
+    if comment:
+        parts.append(f"Комментарий: {comment.strip()}")
+    return " ".join(parts)
+
+
+def iso_date(value: Any) -> Optional[str]:
+    """
+    Дата отзыва -> 'YYYY-MM-DDTHH:MM:SS' (UTC). Такие строки сравнивает отметка уровня
+    в review_state. Принимает ISO-строку (с Z или смещением) и Unix-время в секундах
+    или миллисекундах; непонятный формат -> None
+    """
+    try:
+        if isinstance(value, str) and value.strip().isdigit():
+            value = int(value.strip())
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            moment = datetime.fromtimestamp(value / 1000 if value > 1e11 else value, tz=timezone.utc)
+        elif isinstance(value, str) and value.strip():
+            moment = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        else:
+            return None
+    except (ValueError, OverflowError, OSError):
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.isoformat(timespec="seconds")
+
+
+def decode_wb_feedbacks(data: Dict[str, Any], product_id: str) -> List[Dict[str, Any]]:
+    """Отзывы из ответа feedbacks API Wildberries"""
+    reviews = []
+    for fb in (data or {}).get("feedbacks") or []:
+        pros = fb.get("pros") or ""
+        cons = fb.get("cons") or ""
+        comment = fb.get("text") or ""
+        text = compose_review_text(pros, cons, comment)
+        if not text:
+            continue
+        reviews.append({
+            "id": f"wb_{fb.get('id')}",
+            "product_id": product_id,
+            "text": text,
+            "rating": fb.get("productValuation"),
+            "date": iso_date(fb.get("createdDate")),
+            "pros": pros,
+            "cons": cons,
+        })
+    return reviews
+
+
+def _ozon_review_lists(data: Dict[str, Any]):
+    """Списки отзывов из widgetStates (значения там — JSON-строки)"""
+    for key, state in ((data or {}).get("widgetStates") or {}).items():
+        if "Review" not in key:
+            continue
+        if isinstance(state, str):
+            try:
+                state = json.loads(state)
+            except json.JSONDecodeError:
+                continue
+        if isinstance(state, dict) and isinstance(state.get("reviews"), list):
+            yield state["reviews"]
+
+
+def decode_ozon_reviews(data: Dict[str, Any], product_id: str) -> List[Dict[str, Any]]:
+    """Отзывы из ответа composer-api Ozon"""
+    reviews = []
+    for items in _ozon_review_lists(data):
+        for item in items:
+            content = item.get("content") or {}
+            pros = content.get("positive") or ""
+            cons = content.get("negative") or ""
+            comment = content.get("comment") or ""
+            text = compose_review_text(pros, cons, comment)
+            if not text:
+                continue
+            reviews.append({
+                "id": f"ozon_{item.get('uuid') or item.get('id')}",
+                "product_id": product_id,
+                "text": text,
+                "rating": content.get("score"),
+                "date": iso_date(item.get("publishedAt") or item.get("createdAt")),
+                "pros": pros,
+                "cons": cons,
+            })
+    return reviews
+
+
+DECODERS = {
+    "wb": (WB_FEEDBACKS_RE, decode_wb_feedbacks),
+    "ozon": (OZON_REVIEWS_RE, decode_ozon_reviews),
+}
+
+
+class ReviewCapture:
+    """
+    Слушает page.on("response") и собирает отзывы из API-ответов.
+    Используется так: capture.attach(page) до goto, затем await capture.wait().
+    is_known — признак уже скачанного отзыва: известные отзывы пропускаются, а сбор
+    останавливается, когда целая страница ответа API состоит из известных. На первом
+    известном не останавливаемся: закрепленный или "полезный" старый отзыв бывает
+    в начале первой страницы, перед новыми.
+    """
+
+    def __init__(self, marketplace: str, product_id: str, max_reviews: Optional[int] = None,
+                 is_known: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.pattern, self.decoder = DECODERS[marketplace]
+        self.product_id = product_id
+        self.max_reviews = max_reviews
+        self.is_known = is_known
+        self.reached_known = False
+        self.reviews: List[Dict[str, Any]] = []
+        self._seen = set()
+        self._page: Optional[Page] = None
+        self._got_reviews = asyncio.Event()
+
+    def attach(self, page: Page):
+        self._page = page
+        page.on("response", self._on_response)
+
+    def detach(self):
+        if self._page:
+            self._page.remove_listener("response", self._on_response)
+            self._page = None
+
+    async def _on_response(self, response: Response):
+        if self.reached_known or response.status != 200 or not self.pattern.search(response.url):
+            return
+        try:
+            data = await response.json()
+        except Exception as e:
+            logger.debug(f"Не удалось декодировать {response.url}: {e}")
+            return
+
+        page = self.decoder(data, self.product_id)
+        known = 0
+        for review in page:
+            if self.is_known and self.is_known(review):
+                known += 1
+                continue
+            if review["id"] in self._seen:
+                continue
+            self._seen.add(review["id"])
+            self.reviews.append(review)
+        if page and known == len(page):
+            logger.info("🛑 Страница ответа целиком из уже скачанных отзывов")
+            self.reached_known = True
+
+        if self.reviews or self.reached_known:
+            logger.info(f"📡 Перехвачено отзывов из API: {len(self.reviews)}")
+            self._got_reviews.set()
+
+    async def wait(self, timeout: float = 10) -> bool:
+        """Ожидание первого ответа с отзывами. False — если API так и не ответил"""
+        try:
+            await asyncio.wait_for(self._got_reviews.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def result(self) -> List[Dict[str, Any]]:
+        return self.reviews[:self.max_reviews] if self.max_reviews else list(self.reviews)
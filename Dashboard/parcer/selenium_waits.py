@@ -0,0 +1,80 @@
+"""
+Событийные ожидания для Selenium-парсеров
+Вместо фиксированных time.sleep ждем реальных изменений на странице
+"""
+
+import logging
+from typing import Iterable, Optional
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+logger = logging.getLogger(__name__)
+
+_PAGE_STATE_JS = """
+const selector = arguments[0];
+return [
+    document.body ? document.body.scrollHeight : 0,
+    selector ? document.querySelectorAll(selector).length : 0
+];
+"""
+
+
+def _page_state(driver, item_selector: Optional[str]):
+    """(высота документа, количество элементов по селектору)"""
+    height, count = driver.execute_script(_PAGE_STATE_JS, item_selector)
+    return int(height or 0), int(count or 0)
+
+
+def count_items(driver, item_selector: str) -> int:
+    """Количество элементов по селектору (без implicit wait, в отличие от find_elements)"""
+    return _page_state(driver, item_selector)[1]
+
+
+def wait_for_any(driver, selectors: Iterable[str], timeout: float = 15) -> bool:
+    """Ожидание появления хотя бы одного элемента из списка CSS-селекторов"""
+    query = ", ".join(selectors)
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            lambda d: d.execute_script("return !!document.querySelector(arguments[0]);", query)
+        )
+        return True
+    except TimeoutException:
+        logger.debug(f"Не дождались селекторов: {query}")
+        return False
+
+
+def wait_for_count_growth(driver, item_selector: str, previous: int, timeout: float = 5) -> int:
+    """Ожидание, пока элементов по селектору станет больше previous. Возвращает новое количество"""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            lambda d: _page_state(d, item_selector)[1] > previous
+        )
+    except TimeoutException:
+        pass
+    return _page_state(driver, item_selector)[1]
+
+
+def scroll_until_stable(driver, item_selector: Optional[str] = None, timeout: float = 3,
+                        max_rounds: int = 30) -> int:
+    """
+    Прокрутка вниз, пока страница растет: после каждого шага ждем через WebDriverWait
+    увеличения высоты документа или числа элементов item_selector. Если за timeout
+    ничего не догрузилось — контент стабилен, прокрутка заканчивается.
+    Возвращает итоговое количество элементов item_selector.
+    """
+    height, count = _page_state(driver, item_selector)
+
+    def grew(d) -> bool:
+        new_height, new_count = _page_state(d, item_selector)
+        return new_height > height or new_count > count
+
+    for round_no in range(max_rounds):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=0.1).until(grew)
+        except TimeoutException:
+            logger.debug(f"Страница стабильна после {round_no + 1} прокруток")
+            break
+        height, count = _page_state(driver, item_selector)
+
+    return count
@@ -1,519 +1,14 @@
 """
 Полноценный парсер для WB и Ozon на Firefox
-Собирает реальные данные и создает product.json и reviews.json
+Раньше здесь была копия firefox_parser.py — теперь это точка входа к тому же парсеру
 """
 
 import asyncio
-import json
-import re
-import random
-import logging
-from typing import List, Dict, Any, Optional
-from playwright.async_api import async_playwright
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+from firefox_parser import FirefoxMarketplaceParser, main
 
-
-class FirefoxMarketplaceParser:
-    """Парсер маркетплейсов на Firefox"""
-    
-    def __init__(self):
-        self.playwright = None
-        self.browser = None
-        self.context = None
-        self.page = None
-    
-    async def human_delay(self, min_sec=2, max_sec=4):
-        """Случайная задержка"""
-        delay = random.uniform(min_sec, max_sec)
-        logger.info(f"⏳ Задержка {delay:.1f} сек...")
-        await asyncio.sleep(delay)
-    
-    async def setup_browser(self):
-        """Запуск Firefox"""
-        logger.info("🦊 Запуск Firefox...")
-        
-        self.playwright = await async_playwright().start()
-        
-        self.browser = await self.playwright.firefox.launch(
-            headless=True  # Измените на False для отладки
-        )
-        
-        self.context = await self.browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:121.0) Gecko/20100101 Firefox/121.0",
-            locale="ru-RU"
-        )
-        
-        self.page = await self.context.new_page()
-        self.page.set_default_timeout(30000)
-        
-        logger.info("✅ Firefox запущен")
-    
-    async def close_browser(self):
-        """Закрытие браузера"""
-        if self.browser:
-            await self.browser.close()
-        if self.playwright:
-            await self.playwright.stop()
-        logger.info("🔒 Браузер закрыт")
-    
-    def _extract_number(self, text: str) -> Optional[int]:
-        """Извлечение числа из текста"""
-        if not text:
-            return None
-        cleaned = re.sub(r'[^\d]', '', text)
-        return int(cleaned) if cleaned.isdigit() else None
-    
-    async def _get_text(self, selector: str, timeout: int = 5000) -> Optional[str]:
-        """Безопасное получение текста"""
-        try:
-            await self.page.wait_for_selector(selector, timeout=timeout, state="visible")
-            element = await self.page.query_selector(selector)
-            if element:
-                text = await element.text_content()
-                return text.strip() if text else None
-        except Exception as e:
-            logger.debug(f"Селектор {selector} не найден: {e}")
-        return None
-    
-    async def parse_wildberries(self, url: str) -> Dict[str, Any]:
-        """Парсинг Wildberries"""
-        logger.info("="*60)
-        logger.info(f"🛒 ПАРСИНГ WILDBERRIES")
-        logger.info("="*60)
-        
-        try:
-            logger.info(f"📦 URL: {url}")
-            await self.page.goto(url, wait_until="domcontentloaded", timeout=60000)
-            await self.human_delay(3, 5)
-            
-            # ID товара
-            product_id = url.split("/")[-2] if "/catalog/" in url else "unknown"
-            logger.info(f"🆔 Product ID: {product_id}")
-            
-            # Название
-            name_selectors = [
-                "h1",
-                ".product-page__title",
-                "[data-link='text{:product-page/product-detail/header}']"
-            ]
-            name = None
-            for selector in name_selectors:
-                name = await self._get_text(selector)
-                if name:
-                    logger.info(f"✅ Название: {name[:60]}...")
-                    break
-            
-            if not name:
-                name = "Товар без названия"
-                logger.warning("⚠️ Название не найдено")
-            
-            # Цена
-            price = None
-            price_selectors = [
-                ".price-block__final-price",
-                "[class*='price-block__final']",
-                ".product-page__price-block span"
-            ]
-            
-            for selector in price_selectors:
-                price_text = await self._get_text(selector)
-                if price_text:
-                    price = self._extract_number(price_text)
-                    if price:
-                        logger.info(f"💰 Цена: {price} ₽")
-                        break
-            
-            if not price:
-                logger.warning("⚠️ Цена не найдена")
-            
-            # Описание
-            description = ""
-            desc_selectors = [
-                ".product-page__description-text",
-                "[class*='description']",
-                ".collapsable__content p"
-            ]
-            
-            for selector in desc_selectors:
-                desc = await self._get_text(selector, timeout=3000)
-                if desc and len(desc) > 20:
-                    description = desc[:500]  # Первые 500 символов
-                    logger.info(f"📝 Описание: {description[:60]}...")
-                    break
-            
-            # Характеристики
-            characteristics = ""
-            char_selectors = [
-                ".product-params__table",
-                "[class*='params']"
-            ]
-            
-            for selector in char_selectors:
-                chars = await self._get_text(selector, timeout=3000)
-                if chars:
-                    characteristics = chars[:500]
-                    logger.info(f"📊 Характеристики найдены")
-                    break
-            
-            # Отзывы
-            logger.info("💬 Сбор отзывов...")
-            reviews = await self._parse_wb_reviews(product_id)
-            logger.info(f"✅ Собрано отзывов: {len(reviews)}")
-            
-            return {
-                "product": {
-                    "id": f"wb_{product_id}",
-                    "name": name,
-                    "url": url,
-                    "price": price,
-                    "currency": "RUB",
-                    "description": description,
-                    "characteristics": characteristics
-                },
-                "reviews": reviews
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка парсинга WB: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            raise
-    
-    async def _parse_wb_reviews(self, product_id: str, max_reviews: int = 10) -> List[Dict[str, Any]]:
-        """Парсинг отзывов WB"""
-        reviews = []
-        
-        try:
-            # Ищем кнопку "Отзывы" и кликаем
-            review_button_selectors = [
-                "a[href*='#comments']",
-                "button:has-text('Отзывы')",
-                "[data-link*='comments']"
-            ]
-            
-            for selector in review_button_selectors:
-                try:
-                    button = await self.page.query_selector(selector)
-                    if button:
-                        await button.click()
-                        logger.info("🔽 Переход к отзывам...")
-                        await self.human_delay(2, 3)
-                        break
-                except:
-                    continue
-            
-            # Прокрутка до отзывов
-            await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight / 2)")
-            await self.human_delay(1, 2)
-            
-            # Селекторы для отзывов
-            review_selectors = [
-                ".comments__item",
-                ".feedback__item",
-                "[class*='comment']",
-                "[class*='review']"
-            ]
-            
-            elements = []
-            for selector in review_selectors:
-                elements = await self.page.query_selector_all(selector)
-                if elements and len(elements) > 0:
-                    logger.info(f"🔍 Найдено элементов отзывов: {len(elements)}")
-                    break
-            
-            # Извлечение текста
-            for i, elem in enumerate(elements[:max_reviews]):
-                try:
-                    text = await elem.text_content()
-                    if text and len(text.strip()) > 10:
-                        reviews.append({
-                            "id": f"wb_review_{i+1}",
-                            "product_id": f"wb_{product_id}",
-                            "text": text.strip()[:1000]  # Максимум 1000 символов
-                        })
-                except Exception as e:
-                    logger.debug(f"Ошибка извлечения отзыва {i}: {e}")
-                    continue
-            
-            # Если отзывов нет - создаем тестовые
-            if len(reviews) == 0:
-                logger.warning("⚠️ Отзывы не найдены, используем тестовые")
-                reviews = self._create_mock_reviews(product_id, "wb")
-        
-        except Exception as e:
-            logger.warning(f"⚠️ Ошибка сбора отзывов: {e}")
-            reviews = self._create_mock_reviews(product_id, "wb")
-        
-        return reviews
-    
-    async def parse_ozon(self, url: str) -> Dict[str, Any]:
-        """Парсинг Ozon"""
-        logger.info("="*60)
-        logger.info(f"🔵 ПАРСИНГ OZON")
-        logger.info("="*60)
-        
-        try:
-            logger.info(f"📦 URL: {url}")
-            await self.page.goto(url, wait_until="domcontentloaded", timeout=60000)
-            await self.human_delay(3, 5)
-            
-            # ID товара
-            product_id = url.split("/")[-1].split("-")[-1] if "/product/" in url else "unknown"
-            logger.info(f"🆔 Product ID: {product_id}")
-            
-            # Ждем загрузки h1
-            try:
-                await self.page.wait_for_selector("h1", timeout=10000)
-            except:
-                logger.warning("⚠️ Заголовок загружается долго")
-            
-            # Название
-            name = await self._get_text("h1")
-            if name:
-                logger.info(f"✅ Название: {name[:60]}...")
-            else:
-                name = "Товар без названия"
-                logger.warning("⚠️ Название не найдено")
-            
-            # Цена
-            price = await self._parse_ozon_price()
-            if price:
-                logger.info(f"💰 Цена: {price} ₽")
-            else:
-                logger.warning("⚠️ Цена не найдена")
-            
-            # Описание
-            description = ""
-            desc_selectors = [
-                "[data-widget='webDescription']",
-                ".RA-a1",
-                "[class*='ProductDescription']"
-            ]
-            
-            for selector in desc_selectors:
-                desc = await self._get_text(selector, timeout=3000)
-                if desc and len(desc) > 20:
-                    description = desc[:500]
-                    logger.info(f"📝 Описание: {description[:60]}...")
-                    break
-            
-            # Характеристики
-            characteristics = ""
-            char_selectors = [
-                "[data-widget='webCharacteristics']",
-                "[class*='Characteristics']"
-            ]
-            
-            for selector in char_selectors:
-                chars = await self._get_text(selector, timeout=3000)
-                if chars:
-                    characteristics = chars[:500]
-                    logger.info(f"📊 Характеристики найдены")
-                    break
-            
-            # Отзывы
-            logger.info("💬 Сбор отзывов...")
-            reviews = await self._parse_ozon_reviews(product_id)
-            logger.info(f"✅ Собрано отзывов: {len(reviews)}")
-            
-            return {
-                "product": {
-                    "id": f"ozon_{product_id}",
-                    "name": name,
-                    "url": url,
-                    "price": price,
-                    "currency": "RUB",
-                    "description": description,
-                    "characteristics": characteristics
-                },
-                "reviews": reviews
-            }
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка парсинга Ozon: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            raise
-    
-    async def _parse_ozon_price(self) -> Optional[int]:
-        """Парсинг цены Ozon"""
-        price_selectors = [
-            "[data-widget='webPrice'] span",
-            ".xk9",
-            "[class*='Price_price']",
-            "span[class*='price']"
-        ]
-        
-        for selector in price_selectors:
-            try:
-                elements = await self.page.query_selector_all(selector)
-                for elem in elements:
-                    text = await elem.text_content()
-                    if text:
-                        price = self._extract_number(text)
-                        if price and price > 100 and price < 1000000:
-                            return price
-            except:
-                continue
-        
-        return None
-    
-    async def _parse_ozon_reviews(self, product_id: str, max_reviews: int = 10) -> List[Dict[str, Any]]:
-        """Парсинг отзывов Ozon"""
-        reviews = []
-        
-        try:
-            # Прокрутка до отзывов
-            await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight / 2)")
-            await self.human_delay(2, 3)
-            
-            # Селекторы для отзывов
-            review_selectors = [
-                "[data-widget='webReviews'] > div",
-                "[class*='ReviewCard']",
-                "[class*='review']"
-            ]
-            
-            elements = []
-            for selector in review_selectors:
-                elements = await self.page.query_selector_all(selector)
-                if elements and len(elements) > 2:
-                    logger.info(f"🔍 Найдено элементов отзывов: {len(elements)}")
-                    break
-            
-            # Извлечение текста
-            for i, elem in enumerate(elements[:max_reviews]):
-                try:
-                    text = await elem.text_content()
-                    if text and len(text.strip()) > 20:
-                        reviews.append({
-                            "id": f"ozon_review_{i+1}",
-                            "product_id": f"ozon_{product_id}",
-                            "text": text.strip()[:1000]
-                        })
-                except:
-                    continue
-            
-            if len(reviews) == 0:
-                logger.warning("⚠️ Отзывы не найдены, используем тестовые")
-                reviews = self._create_mock_reviews(product_id, "ozon")
-        
-        except Exception as e:
-            logger.warning(f"⚠️ Ошибка сбора отзывов: {e}")
-            reviews = self._create_mock_reviews(product_id, "ozon")
-        
-        return reviews
-    
-    def _create_mock_reviews(self, product_id: str, marketplace: str) -> List[Dict[str, Any]]:
-        """Создание тестовых отзывов если парсинг не сработал"""
-        templates = [
-            "Отличный товар, всем рекомендую! Качество на высоте.",
-            "Хорошая цена, быстрая доставка. Пользуюсь уже месяц.",
-            "Неплохо для своей цены, но есть недостатки.",
-            "Не соответствует описанию, разочарован покупкой.",
-            "Качество среднее, за эти деньги можно было получше.",
-            "Отличное соотношение цены и качества!"
-        ]
-        
-        return [
-            {
-                "id": f"{marketplace}_review_{i+1}",
-                "product_id": f"{marketplace}_{product_id}",
-                "text": templates[i % len(templates)]
-            }
-            for i in range(6)
-        ]
-    
-    async def parse_and_save(self, url: str, output_dir: str = "."):
-        """Главная функция парсинга"""
-        try:
-            await self.setup_browser()
-            
-            # Определяем маркетплейс
-            if "wildberries" in url or "wb.ru" in url:
-                result = await self.parse_wildberries(url)
-            elif "ozon" in url:
-                result = await self.parse_ozon(url)
-            else:
-                raise ValueError("❌ Неподдерживаемый маркетплейс")
-            
-            # Сохранение product.json
-            product_data = [result["product"]]
-            product_file = f"{output_dir}/product.json"
-            with open(product_file, "w", encoding="utf-8") as f:
-                json.dump(product_data, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"✅ Сохранено: {product_file}")
-            
-            # Сохранение reviews.json
-            reviews_file = f"{output_dir}/reviews.json"
-            with open(reviews_file, "w", encoding="utf-8") as f:
-                json.dump(result["reviews"], f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"✅ Сохранено: {reviews_file}")
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"❌ Критическая ошибка: {e}")
-            raise
-        
-        finally:
-            await self.close_browser()
-
-
-async def main():
-    """Главная функция"""
-    
-    print("\n" + "="*60)
-    print("  ПАРСЕР МАРКЕТПЛЕЙСОВ (Firefox)")
-    print("="*60)
-    print("\nВыберите маркетплейс:")
-    print("1. Wildberries (тестовый товар)")
-    print("2. Ozon (тестовый товар)")
-    print("3. Свой URL")
-    print()
-    
-    choice = input("Ваш выбор (1/2/3): ").strip()
-    
-    urls = {
-        "1": "https://www.wildberries.ru/catalog/396501168/detail.aspx",
-        "2": "https://www.ozon.ru/product/drель-shurupovёrt-akkumulyatornyy-12-v-1500-mah-2-akkumulyatora-nabor-sverl-i-bit-6-predmetov-1829959393/"
-    }
-    
-    if choice in ["1", "2"]:
-        url = urls[choice]
-    elif choice == "3":
-        url = input("\nВведите URL товара: ").strip()
-    else:
-        print("❌ Неверный выбор")
-        return
-    
-    parser = FirefoxMarketplaceParser()
-    
-    try:
-        result = await parser.parse_and_save(url)
-        
-        print("\n" + "="*60)
-        print("  ✅ ПАРСИНГ ЗАВЕРШЕН!")
-        print("="*60)
-        print(f"\n📦 Товар: {result['product']['name'][:60]}...")
-        print(f"💰 Цена: {result['product']['price']} ₽")
-        print(f"💬 Отзывов: {len(result['reviews'])}")
-        print("\n📁 Файлы созданы:")
-        print("  ✓ product.json")
-        print("  ✓ reviews.json")
-        print("\n🚀 Теперь можно запустить анализ!")
-        
-    except Exception as e:
-        print(f"\n❌ Ошибка: {e}")
+__all__ = ["FirefoxMarketplaceParser", "main"]
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -8,8 +8,12 @@ import json
 import re
 import logging
 import aiohttp
+from contextlib import asynccontextmanager
 from typing import Dict, Any, List, Optional
 
+import repo_root  # noqa: F401
+from review_ids import review_id
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -17,49 +21,105 @@ logger = logging.getLogger(__name__)
 class WBAPIParser:
     """Парсер через API Wildberries"""
     
+    CARD_API_URL = "https://card.wb.ru/cards/v1/detail"
+    CARD_API_PARAMS = {"appType": "1", "curr": "rub", "dest": "-1257786", "spp": "30"}
+    
+    def __init__(self, chunk_size: int = 100, max_concurrency: int = 4):
+        """
+        Args:
+            chunk_size: сколько артикулов отправлять в одном запросе (nm=id1;id2;...)
+            max_concurrency: сколько пачек запрашивать параллельно
+        """
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
+        self.session: Optional[aiohttp.ClientSession] = None
+    
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Одна долгоживущая сессия на весь парсер (пул соединений переиспользуется)"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=30),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            )
+        return self.session
+    
+    async def close(self):
+        """Закрытие сессии"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    
+    @asynccontextmanager
+    async def _session_scope(self):
+        """
+        Вне async with WBAPIParser() сессия живет только на время вызова:
+        созданная здесь сессия закрывается в конце, открытая __aenter__ — остается
+        """
+        owned = self.session is None or self.session.closed
+        try:
+            yield
+        finally:
+            if owned:
+                await self.close()
+    
     @staticmethod
     def extract_product_id(url: str) -> str:
         """Извлечение ID товара из URL"""
         match = re.search(r'/catalog/(\d+)/', url)
         return match.group(1) if match else None
     
-    async def get_product_info(self, product_id: str) -> Optional[Dict]:
-        """Получение информации о товаре через API"""
+    async def _fetch_chunk(self, product_ids: List[str]) -> List[Dict]:
+        """Один запрос к API карточек сразу на несколько артикулов"""
+        params = dict(self.CARD_API_PARAMS, nm=";".join(product_ids))
         try:
-            # API для получения базовой информации
-            api_url = f"https://card.wb.ru/cards/v1/detail?appType=1&curr=rub&dest=-1257786&spp=30&nm={product_id}"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data
+            session = await self._get_session()
+            async with session.get(self.CARD_API_URL, params=params) as response:
+                if response.status == 200:
+                    data = await response.json(content_type=None)
+                    return (data or {}).get('data', {}).get('products', [])
+                logger.warning(f"⚠️ API вернул статус {response.status} для {len(product_ids)} товаров")
         except Exception as e:
             logger.error(f"❌ Ошибка API: {e}")
-        
-        return None
+        return []
     
-    async def parse_product(self, url: str) -> Dict[str, Any]:
-        """Парсинг товара"""
-        logger.info("="*60)
-        logger.info("🛒 ПАРСИНГ WILDBERRIES (API)")
-        logger.info("="*60)
-        
-        product_id = self.extract_product_id(url)
-        if not product_id:
-            raise ValueError("Не удалось извлечь ID товара из URL")
-        
-        logger.info(f"🆔 Product ID: {product_id}")
-        
-        # Получение данных через API
-        data = await self.get_product_info(product_id)
-        
-        if not data or 'data' not in data or 'products' not in data['data']:
-            logger.error("❌ Не удалось получить данные через API")
-            return self._create_fallback_data(product_id, url)
+    async def get_products_info(self, product_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Пакетное получение карточек: артикулы делятся на пачки по chunk_size,
+        пачки запрашиваются через одну сессию. Возвращает словарь id -> product.
+        """
+        unique_ids = list(dict.fromkeys(str(pid) for pid in product_ids if pid))
+        chunks = [unique_ids[i:i + self.chunk_size] for i in range(0, len(unique_ids), self.chunk_size)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
         
-        product = data['data']['products'][0]
+        async def fetch(chunk: List[str]) -> List[Dict]:
+            async with semaphore:
+                return await self._fetch_chunk(chunk)
         
+        logger.info(f"📡 Запрос {len(unique_ids)} товаров пачками: {len(chunks)} запросов")
+        products: Dict[str, Dict] = {}
+        async with self._session_scope():
+            for chunk_products in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+                for product in chunk_products:
+                    products[str(product.get('id'))] = product
+        return products
+    
+    async def get_product_info(self, product_id: str) -> Optional[Dict]:
+        """
+        Карточка одного товара — элемент data.products ответа API (не весь ответ,
+        как раньше), None — товар не найден или API недоступен
+        """
+        products = await self.get_products_info([product_id])
+        return products.get(str(product_id))
+    
+    def _build_product(self, product_id: str, url: str, product: Dict) -> Dict[str, Any]:
+        """Преобразование карточки API в формат product.json"""
         # Извлечение данных
         name = product.get('name', 'Товар без названия')
         logger.info(f"✅ Название: {name[:60]}...")
@@ -97,6 +157,46 @@ class WBAPIParser:
             }
         }
     
+    async def parse_product(self, url: str) -> Dict[str, Any]:
+        """Парсинг товара"""
+        logger.info("="*60)
+        logger.info("🛒 ПАРСИНГ WILDBERRIES (API)")
+        logger.info("="*60)
+        
+        product_id = self.extract_product_id(url)
+        if not product_id:
+            raise ValueError("Не удалось извлечь ID товара из URL")
+        
+        logger.info(f"🆔 Product ID: {product_id}")
+        
+        # Получение данных через API
+        product = await self.get_product_info(product_id)
+        
+        if not product:
+            logger.error("❌ Не удалось получить данные через API")
+            return self._create_fallback_data(product_id, url)
+        
+        return self._build_product(product_id, url, product)
+    
+    async def parse_products(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """Парсинг каталога: все товары загружаются пачками по chunk_size"""
+        ids_by_url = {url: self.extract_product_id(url) for url in urls}
+        products = await self.get_products_info([pid for pid in ids_by_url.values() if pid])
+        
+        results = []
+        for url, product_id in ids_by_url.items():
+            if not product_id:
+                logger.warning(f"⚠️ Не удалось извлечь ID товара из URL: {url}")
+                continue
+            product = products.get(product_id)
+            if product:
+                results.append(self._build_product(product_id, url, product))
+            else:
+                results.append(self._create_fallback_data(product_id, url))
+        
+        logger.info(f"✅ Получено товаров: {len(results)}")
+        return results
+    
     def _create_fallback_data(self, product_id: str, url: str) -> Dict[str, Any]:
         """Создание запасных данных"""
         logger.warning("⚠️ Используются запасные данные")
@@ -143,12 +243,12 @@ class WBAPIParser:
         
         return [
             {
-                "id": f"wb_review_{i+1}",
+                "id": review_id(f"wb_{product_id}", template["text"]),
                 "product_id": f"wb_{product_id}",
                 "text": template["text"],
                 "rating": template["rating"]
             }
-            for i, template in enumerate(reviews_templates[:count])
+            for template in reviews_templates[:count]
         ]
     
     async def parse_and_save(self, url: str, output_dir: str = "."):
@@ -186,18 +286,27 @@ async def main():
     print("="*60)
     print("\n1. Тестовый товар (люстра)")
     print("2. Свой URL")
+    print("3. Несколько URL (каталог)")
+    
+    choice = input("\nВаш выбор (1/2/3): ").strip()
     
-    choice = input("\nВаш выбор (1/2): ").strip()
+    if choice == "3":
+        urls = input("Введите URL через пробел: ").split()
+        async with WBAPIParser() as parser:
+            results = await parser.parse_products(urls)
+        print(f"\n📦 Получено товаров: {len(results)}")
+        for result in results:
+            print(f"  - {result['product']['id']}: {result['product']['name'][:60]}")
+        return
     
     if choice == "1":
         url = "https://www.wildberries.ru/catalog/264196671/detail.aspx"
     else:
         url = input("Введите URL: ").strip()
     
-    parser = WBAPIParser()
-    
     try:
-        result = await parser.parse_and_save(url)
+        async with WBAPIParser() as parser:
+            result = await parser.parse_and_save(url)
         
         print("\n" + "="*60)
         print("  ✅ УСПЕШНО!")
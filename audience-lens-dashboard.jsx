@@ -108,6 +108,22 @@ const MOCK_REVIEWS_DATA = [
   }
 ];
 
+// Агрегаты в формате dashboard_summary.json (считает update_dashboard.py)
+const MOCK_SUMMARY = {
+  "reviews": 3,
+  "sentiment": { "положительный": 1, "нейтральный": 1, "отрицательный": 1 },
+  "criteria": [
+    { "критерий": "Информативность", "средняя": 3.0, "n": 3, "распределение": [0, 1, 1, 1, 0] },
+    { "критерий": "Релевантность", "средняя": 3.0, "n": 3, "распределение": [0, 1, 1, 1, 0] },
+    { "критерий": "Опыт использования", "средняя": 3.67, "n": 3, "распределение": [0, 1, 0, 1, 1] },
+    { "критерий": "Ответы на вопросы", "средняя": 3.0, "n": 3, "распределение": [0, 1, 1, 1, 0] },
+    { "критерий": "Контекст", "средняя": 1.67, "n": 3, "распределение": [1, 2, 0, 0, 0] },
+    { "критерий": "Сравнение", "средняя": 1.0, "n": 3, "распределение": [3, 0, 0, 0, 0] },
+    { "критерий": "Нарушение правил", "средняя": 5.0, "n": 3, "распределение": [0, 0, 0, 0, 3] },
+    { "критерий": "Конфликт интересов", "средняя": 5.0, "n": 3, "распределение": [0, 0, 0, 0, 3] }
+  ]
+};
+
 const COLORS = {
   primary: '#0f172a',
   secondary: '#1e293b',
@@ -123,7 +139,7 @@ const COLORS = {
   chartColors: ['#3b82f6', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981']
 };
 
-const Dashboard = () => {
+const Dashboard = ({ summary = MOCK_SUMMARY }) => {
   const [activeTab, setActiveTab] = useState('overview');
   const [selectedSegment, setSelectedSegment] = useState(null);
 
@@ -132,41 +148,17 @@ const Dashboard = () => {
   const segments = audienceData.audience_segments;
 
   // Анализ тональности отзывов
-  const sentimentData = useMemo(() => {
-    const counts = { 'положительный': 0, 'нейтральный': 0, 'отрицательный': 0 };
-    MOCK_REVIEWS_DATA.forEach(review => {
-      const sentiment = review.result.тональность;
-      counts[sentiment]++;
-    });
-    return [
-      { name: 'Положительные', value: counts['положительный'], color: COLORS.positive },
-      { name: 'Нейтральные', value: counts['нейтральный'], color: COLORS.neutral },
-      { name: 'Отрицательные', value: counts['отрицательный'], color: COLORS.danger }
-    ];
-  }, []);
+  const sentimentData = useMemo(() => [
+    { name: 'Положительные', value: summary.sentiment['положительный'], color: COLORS.positive },
+    { name: 'Нейтральные', value: summary.sentiment['нейтральный'], color: COLORS.neutral },
+    { name: 'Отрицательные', value: summary.sentiment['отрицательный'], color: COLORS.danger }
+  ], [summary]);
 
   // Средние оценки по критериям
-  const criteriaAverages = useMemo(() => {
-    const criteriaSums = {};
-    const criteriaCounts = {};
-
-    MOCK_REVIEWS_DATA.forEach(review => {
-      review.result.критерии.forEach(crit => {
-        const name = crit.критерий;
-        if (!criteriaSums[name]) {
-          criteriaSums[name] = 0;
-          criteriaCounts[name] = 0;
-        }
-        criteriaSums[name] += crit.оценка;
-        criteriaCounts[name]++;
-      });
-    });
-
-    return Object.keys(criteriaSums).map(name => ({
-      критерий: name,
-      средняя: (criteriaSums[name] / criteriaCounts[name]).toFixed(1)
-    }));
-  }, []);
+  const criteriaAverages = useMemo(() => summary.criteria.map(item => ({
+    критерий: item.критерий,
+    средняя: item.средняя.toFixed(1)
+  })), [summary]);
 
   // Данные для радар-чарта
   const radarData = criteriaAverages.map(item => ({
@@ -2,8 +2,15 @@ import os
 import re
 import json
 import argparse
-from typing import Any, Dict, List, Optional
-from groq import Groq
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from groq import BadRequestError, Groq
+
+from review_corpus import ReviewCorpus
+from schemas import (AUDIENCE_SCHEMA, JSON_OBJECT_FORMAT, PARTIAL_AUDIENCE_SCHEMA, response_format, validate_audience,
+                     validate_partial_audience)
 
 MODELS = [
     "qwen/qwen3-32b",
@@ -54,6 +61,60 @@ USER_PROMPT_TEMPLATE = """
 Действуй согласно системной инструкции: выдели сегменты ЦА, их потребности, болевые точки, триггеры, рекомендации по позиционированию и гипотезы для A/B тестов.
 """
 
+# === Map-reduce по всем отзывам ===
+# map: куски отзывов -> сегменты с числом отзывов (параллельно);
+# reduce: слияние найденных сегментов, пока все не поместятся в один финальный промпт
+
+MAP_SYSTEM_PROMPT = """Ты — аналитик целевой аудитории. Тебе дан фрагмент отзывов о товаре.
+Раздели авторов этих отзывов на сегменты (2-6) и для каждого посчитай, сколько отзывов фрагмента к нему относится.
+Верни строго JSON без поясняющего текста:
+  {"segments": [{"name": "...", "count": integer, "needs": "...", "pain_points": "...", "quotes": ["короткая цитата", ...]}]}
+- count — число отзывов фрагмента в сегменте (каждый отзыв — ровно в одном сегменте);
+- quotes — 1-2 характерные цитаты из отзывов, дословно.
+"""
+
+MERGE_SYSTEM_PROMPT = """Ты — аналитик целевой аудитории. Тебе даны сегменты, найденные в разных частях отзывов о товаре.
+Объедини совпадающие по смыслу сегменты (2-8 итоговых), суммируя count. Сумма count должна сохраниться.
+Верни строго JSON в том же формате:
+  {"segments": [{"name": "...", "count": integer, "needs": "...", "pain_points": "...", "quotes": ["...", ...]}]}
+"""
+
+REDUCE_PROMPT_TEMPLATE = """
+Информация о товаре:
+- name: {name}
+- url: {url}
+- price: {price}
+
+Краткое описание:
+{description}
+
+Ключевые характеристики:
+{characteristics}
+
+Проанализировано {total} отзывов. Сегменты, найденные в отзывах (count — число отзывов сегмента):
+{segments}
+
+Объедини их в итоговые сегменты ЦА. share_pct_est считай по count: доля отзывов сегмента от {total}, в процентах.
+Дополнительная информация: продукт и отзывы относятся к российским маркетплейсам (Wildberries/Ozon) — учти ценовую чувствительность и ожидания бытовых инструментов.
+
+Действуй согласно системной инструкции: выдели сегменты ЦА, их потребности, болевые точки, триггеры, рекомендации по позиционированию и гипотезы для A/B тестов.
+"""
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_CHUNK_TOKENS = 3000   # бюджет входных токенов одного map/reduce-промпта
+DEFAULT_MAX_REVIEWS = 10000
+MAX_REVIEW_CHARS = 1500       # длинный отзыв обрезается, чтобы не занимал весь кусок
+
+# Повторы, если ответ не прошел схему AUDIENCE_SCHEMA
+MAX_RETRIES = 2
+
+# (имя для response_format, схема, валидатор)
+AUDIENCE_FORMAT = ("audience_analysis", AUDIENCE_SCHEMA, validate_audience)
+PARTIAL_FORMAT = ("audience_partial", PARTIAL_AUDIENCE_SCHEMA, validate_partial_audience)
+
+# Модели, которые отклонили response_format=json_schema: для них json_object, схема только в промпте
+_NO_SCHEMA_MODELS = set()
+
 JSON_RE_FIND = re.compile(r"(\{(?:.|\n)*\}|\[(?:.|\n)*\])", flags=re.MULTILINE)
 
 
@@ -126,9 +187,24 @@ def extract_reviews_from_results(results_json: Any) -> List[Dict[str, Any]]:
     return reviews_out
 
 
-def first_sample_reviews_for_product(reviews: List[Dict[str, Any]], product_id: Optional[str], n: int = 5) -> List[str]:
-    filtered = [r["review"] for r in reviews if (product_id is None or r.get("product_id") == product_id)]
-    return filtered[:n]
+def group_reviews_by_product(reviews: List[Dict[str, Any]]) -> Dict[Optional[str], List[str]]:
+    """Тексты отзывов по product_id за один проход; под ключом None — все отзывы"""
+    grouped: Dict[Optional[str], List[str]] = {None: []}
+    for r in reviews:
+        grouped[None].append(r["review"])
+        if r.get("product_id") is not None:
+            grouped.setdefault(r["product_id"], []).append(r["review"])
+    return grouped
+
+
+def first_sample_reviews_for_product(reviews: Union[ReviewCorpus, Dict[Optional[str], List[str]]],
+                                     product_id: Optional[str], n: int = 5) -> List[str]:
+    """Первые n текстов товара: из корпуса или из group_reviews_by_product"""
+    if isinstance(reviews, ReviewCorpus):
+        # корпус: диапазон строк товара берется из индекса, читаются только n текстов
+        rows = reviews.product_rows(product_id) if product_id is not None else range(len(reviews))
+        return list(reviews.iter_texts(rows[:n]))
+    return reviews.get(product_id, [])[:n]
 
 
 def extract_json_from_model_response(text: str) -> Any:
@@ -167,8 +243,10 @@ def strip_think_tags(text: str) -> str:
     """
     return THINK_RE.sub("", text).strip()
 
-def call_model_and_parse(client: Groq, model: str, system_prompt: str, user_prompt: str) -> Any:
-    completion = client.chat.completions.create(
+def create_completion(client: Groq, model: str, system_prompt: str, user_prompt: str,
+                      fmt: Tuple[str, Dict[str, Any], Callable] = AUDIENCE_FORMAT) -> str:
+    """Запрос к модели со схемой ответа; если модель отклоняет json_schema (400) — json_object"""
+    request = dict(
         model=model,
         messages=[
             {"role": "system", "content": system_prompt},
@@ -177,9 +255,36 @@ def call_model_and_parse(client: Groq, model: str, system_prompt: str, user_prom
         temperature=0.0,
         max_tokens=1500,
     )
-    content = completion.choices[0].message.content
-    parsed = extract_json_from_model_response(content)
-    return { "parsed": parsed}
+    if model not in _NO_SCHEMA_MODELS:
+        try:
+            completion = client.chat.completions.create(
+                **request, response_format=response_format(fmt[0], fmt[1])
+            )
+            return completion.choices[0].message.content or ""
+        except BadRequestError as e:
+            # 400 на json_schema — пробуем json_object; модель запоминаем, только если он прошел
+            print(f"[warning] {model}: json_schema отклонен ({e}), повтор с json_object")
+            completion = client.chat.completions.create(**request, response_format=JSON_OBJECT_FORMAT)
+            _NO_SCHEMA_MODELS.add(model)
+            return completion.choices[0].message.content or ""
+    completion = client.chat.completions.create(**request, response_format=JSON_OBJECT_FORMAT)
+    return completion.choices[0].message.content or ""
+
+
+def call_model_and_parse(client: Groq, model: str, system_prompt: str, user_prompt: str,
+                         retries: int = MAX_RETRIES, fmt: Tuple[str, Dict[str, Any], Callable] = AUDIENCE_FORMAT) -> Any:
+    """
+    Ответ модели, проверенный по схеме fmt (по умолчанию AUDIENCE_SCHEMA). Некорректный
+    ответ переспрашивается (до retries раз); если не помогло — сохраняется с полем validation_errors
+    """
+    for attempt in range(retries + 1):
+        content = create_completion(client, model, system_prompt, user_prompt, fmt)
+        parsed = extract_json_from_model_response(strip_think_tags(content))
+        errors = fmt[2](parsed)
+        if not errors:
+            return {"parsed": parsed}
+        print(f"[warning] Ответ не прошел схему (попытка {attempt + 1}/{retries + 1}): {'; '.join(errors[:3])}")
+    return {"parsed": parsed, "validation_errors": errors}
 
 
 def build_user_prompt_for_product(product: Dict[str, Any], sample_reviews: List[str]) -> str:
@@ -198,11 +303,189 @@ def build_user_prompt_for_product(product: Dict[str, Any], sample_reviews: List[
     )
 
 
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов: для русского текста ~3 символа на токен"""
+    return len(text) // 3 + 1
+
+
+def product_texts(reviews: Union[ReviewCorpus, Dict[Optional[str], List[str]]],
+                  product_id: Optional[str], limit: int = DEFAULT_MAX_REVIEWS) -> List[str]:
+    """Все тексты отзывов товара; если их больше limit — детерминированная случайная выборка"""
+    if isinstance(reviews, ReviewCorpus):
+        rows = reviews.product_rows(product_id) if product_id is not None else range(len(reviews))
+        if len(rows) > limit:
+            rows = sorted(random.Random(0).sample(rows, limit))
+        return list(reviews.iter_texts(rows))
+    texts = reviews.get(product_id, [])
+    if len(texts) > limit:
+        texts = random.Random(0).sample(texts, limit)
+    return texts
+
+
+def chunk_reviews(texts: List[str], budget_tokens: int) -> List[List[str]]:
+    """Жадная упаковка отзывов в куски, каждый — в пределах бюджета токенов"""
+    chunks: List[List[str]] = [[]]
+    used = 0
+    for text in texts:
+        text = text[:MAX_REVIEW_CHARS]
+        cost = estimate_tokens(text) + 2
+        if chunks[-1] and used + cost > budget_tokens:
+            chunks.append([])
+            used = 0
+        chunks[-1].append(text)
+        used += cost
+    return [chunk for chunk in chunks if chunk]
+
+
+def _segments_text(segments: List[Dict[str, Any]]) -> str:
+    return json.dumps(segments, ensure_ascii=False, separators=(",", ":"))
+
+
+def _parallel(fn: Callable, items: List[Any], concurrency: int) -> List[Any]:
+    """fn по всем items в пуле потоков (порядок результатов сохраняется)"""
+    if concurrency <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as pool:
+        return list(pool.map(fn, items))
+
+
+def chunk_segments(segments: List[Dict[str, Any]], budget_tokens: int) -> List[List[Dict[str, Any]]]:
+    """Группы сегментов для слияния, каждая — в пределах бюджета токенов"""
+    groups: List[List[Dict[str, Any]]] = [[]]
+    used = 0
+    for segment in segments:
+        cost = estimate_tokens(_segments_text([segment]))
+        if groups[-1] and used + cost > budget_tokens:
+            groups.append([])
+            used = 0
+        groups[-1].append(segment)
+        used += cost
+    return groups
+
+
+def analyze_mapreduce(client: Groq, model: str, product: Dict[str, Any], texts: List[str],
+                      concurrency: int = DEFAULT_CONCURRENCY, chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                      retries: int = MAX_RETRIES, limit: Optional[threading.Semaphore] = None) -> Dict[str, Any]:
+    """
+    Анализ аудитории по всем отзывам:
+      map    — каждый кусок отзывов (в пределах chunk_tokens) -> сегменты с count, параллельно;
+      reduce — сегменты сливаются группами по chunk_tokens, пока не поместятся в один промпт;
+      final  — итоговый AUDIENCE_SCHEMA, доли сегментов считаются по count.
+    Время — O(глубина дерева), а не O(число отзывов); одновременных запросов не больше concurrency.
+    limit — общий семафор запросов, если товары анализируются параллельно (см. main)
+    """
+    limit = limit or threading.BoundedSemaphore(max(concurrency, 1))
+    chunks = chunk_reviews(texts, chunk_tokens)
+    stats = {"reviews": len(texts), "chunks": len(chunks), "levels": 0, "calls": len(chunks), "failed": 0}
+    print(f"[info] map-reduce: {len(texts)} отзывов, {len(chunks)} кусков, до {concurrency} запросов одновременно")
+
+    def run_partial(system_prompt: str, user_prompt: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with limit:
+                res = call_model_and_parse(client, model, system_prompt, user_prompt, retries, PARTIAL_FORMAT)
+        except Exception as e:
+            print(f"[warning] Ошибка вызова модели {model}: {e}")
+            return None
+        return None if res.get("validation_errors") else res["parsed"]["segments"]
+
+    def map_chunk(chunk: List[str]) -> Optional[List[Dict[str, Any]]]:
+        prompt = f"Отзывов во фрагменте: {len(chunk)}\n" + "\n".join(f"- {text}" for text in chunk)
+        return run_partial(MAP_SYSTEM_PROMPT, prompt)
+
+    def merge_group(group: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        if len(group) == 1:
+            return group
+        return run_partial(MERGE_SYSTEM_PROMPT, _segments_text(group))
+
+    partials = _parallel(map_chunk, chunks, concurrency)
+    stats["failed"] = sum(part is None for part in partials)
+    segments = [segment for part in partials if part for segment in part]
+
+    # reduce: пока сегменты не помещаются в бюджет одного промпта — сливаем группами
+    while len(segments) > 1 and estimate_tokens(_segments_text(segments)) > chunk_tokens:
+        groups = chunk_segments(segments, chunk_tokens)
+        merged = _parallel(merge_group, groups, concurrency)
+        stats["levels"] += 1
+        stats["calls"] += sum(len(group) > 1 for group in groups)
+        stats["failed"] += sum(result is None for result in merged)
+        # группа, которую не удалось слить, остается как есть — count не теряется
+        reduced = [segment for group, result in zip(groups, merged) for segment in (result or group)]
+        if len(reduced) >= len(segments):
+            break  # слияние ничего не сократило
+        segments = reduced
+
+    if not segments:
+        return {"error": "ни один кусок отзывов не дал корректного ответа", "mapreduce": stats}
+
+    chars = product.get("characteristics") or product.get("characteristics_text") or ""
+    if isinstance(chars, dict):
+        chars = "\n".join([f"- {k}: {v}" for k, v in chars.items()])
+    total = sum(segment.get("count", 0) for segment in segments) or len(texts)
+    user_prompt = REDUCE_PROMPT_TEMPLATE.format(
+        name=product.get("name", "Unknown"),
+        url=product.get("url", ""),
+        price=product.get("price", ""),
+        description=(product.get("description") or "")[:2000],
+        characteristics=chars,
+        total=total,
+        segments="\n".join(f"- {_segments_text([segment])}" for segment in segments),
+    )
+    stats["calls"] += 1
+    with limit:
+        res = call_model_and_parse(client, model, SYSTEM_PROMPT, user_prompt, retries)
+    res["mapreduce"] = stats
+    print(f"[info] map-reduce: уровней слияния {stats['levels']}, запросов {stats['calls']}, неудачных {stats['failed']}")
+    return res
+
+
+class JsonArrayWriter:
+    """
+    Потоковая запись JSON-массива (в формате json.dump(..., indent=2)): элементы
+    дописываются по мере готовности в <path>.tmp, после закрытия файл подменяет path
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.count = 0
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.tmp_path, "w", encoding="utf-8")
+        self._f.write("[")
+        return self
+
+    def write(self, item: Any):
+        self._f.write(",\n  " if self.count else "\n  ")
+        self._f.write(json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+        self._f.flush()
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # недописанный файл не нужен: прошлый path остается как был
+            self._f.close()
+            os.unlink(self.tmp_path)
+            return
+        self._f.write("\n]" if self.count else "]")
+        self._f.close()
+        os.replace(self.tmp_path, self.path)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Audience analysis (Groq) - product + reviews -> audience JSON")
     parser.add_argument("--product", "-p", required=True, help="path to products.json")
-    parser.add_argument("--reviews", "-r", required=True, help="path to results.json (reviews)")
+    parser.add_argument("--reviews", "-r", required=True,
+                        help="path to results.json (reviews) or review corpus dir (review_corpus.py build)")
     parser.add_argument("--out", "-o", default="audience_analysis_results.json", help="output filename")
+    parser.add_argument("--workers", type=int, default=4, help="products x models analyzed in parallel")
+    parser.add_argument("--mapreduce", action="store_true",
+                        help="analyze all reviews (map-reduce over chunks) instead of 5 samples")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="parallel requests in map-reduce (in total across --workers)")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS,
+                        help="input token budget of one map/reduce prompt")
+    parser.add_argument("--max-reviews", type=int, default=DEFAULT_MAX_REVIEWS,
+                        help="max reviews per product in map-reduce (sampled if more)")
     args = parser.parse_args()
 
     # load files
@@ -212,14 +495,22 @@ def main():
         print(f"[error] Не удалось загрузить products file: {e}")
         return
 
-    try:
-        raw_reviews = safe_load_json(args.reviews)
-    except Exception as e:
-        print(f"[error] Не удалось загрузить reviews file: {e}")
-        return
-
     products = normalize_product_input(raw_products)
-    reviews = extract_reviews_from_results(raw_reviews)
+
+    if os.path.isdir(args.reviews):
+        # бинарный корпус: файл не разбирается, тексты читаются через mmap по индексу
+        try:
+            reviews = ReviewCorpus(args.reviews)
+        except Exception as e:
+            print(f"[error] Не удалось открыть корпус отзывов: {e}")
+            return
+    else:
+        try:
+            raw_reviews = safe_load_json(args.reviews)
+        except Exception as e:
+            print(f"[error] Не удалось загрузить reviews file: {e}")
+            return
+        reviews = extract_reviews_from_results(raw_reviews)
 
     if not reviews:
         print("[warning] Не найдено текстов отзывов в results.json. Убедитесь, что поле 'review' присутствует.")
@@ -227,25 +518,22 @@ def main():
     else:
         print(f"[info] Загружено {len(reviews)} отзывов.")
 
+    if not isinstance(reviews, ReviewCorpus):
+        # один проход по отзывам вместо фильтрации всего списка для каждого товара
+        reviews = group_reviews_by_product(reviews)
+
     client = get_client()
 
-    results_out = []
+    # Задачи: (товар в выходном файле, описание товара для промпта, выборка отзывов, все тексты для map-reduce)
+    jobs = []
     # Если products пуст — проанализируем всё сразу как общий кейс
     if not products:
         print("[warning] В products.json не найдено продуктов. Выполняется общий анализ по всем отзывам.")
         # строим фиктивный объект
         prod_obj = {"product_id": None, "name": "Aggregated product", "url": "", "price": "", "description": ""}
         sample = first_sample_reviews_for_product(reviews, None, n=5)
-        user_prompt = build_user_prompt_for_product(prod_obj, sample)
-        per_model = {}
-        for model in MODELS:
-            print(f"[info] Вызов модели: {model}")
-            try:
-                res = call_model_and_parse(client, model, SYSTEM_PROMPT, user_prompt)
-                per_model[model] = res
-            except Exception as e:
-                per_model[model] = {"error": str(e)}
-        results_out.append({"product": prod_obj, "models": per_model})
+        texts = product_texts(reviews, None, args.max_reviews) if args.mapreduce else []
+        jobs.append((prod_obj, prod_obj, sample, texts))
     else:
         for prod in products:
             pid = prod.get("product_id") or prod.get("id") or prod.get("sku") or prod.get("article")
@@ -256,24 +544,45 @@ def main():
             if not sample:
                 sample = first_sample_reviews_for_product(reviews, None, n=5)
                 print(f"[warning] Не найдено отзывов для product_id={pid}. Используем общие примеры ({len(sample)}).")
-            user_prompt = build_user_prompt_for_product(prod, sample)
-            per_model = {}
-            for model in MODELS:
-                print(f"[info] Вызов модели: {model} для продукта {name}")
-                try:
-                    res = call_model_and_parse(client, model, SYSTEM_PROMPT, user_prompt)
-                except Exception as e:
-                    print(f"[error] Ошибка вызова модели {model}: {e}")
-                    res = {"error": str(e)}
-                per_model[model] = res
-            results_out.append({"product": {"product_id": pid, "name": name}, "models": per_model})
-
-    # Сохраняем результат
+            texts = []
+            if args.mapreduce:
+                texts = product_texts(reviews, pid, args.max_reviews) or product_texts(reviews, None, args.max_reviews)
+            jobs.append(({"product_id": pid, "name": name}, prod, sample, texts))
+
+    # Один семафор на все товары: запросов map-reduce одновременно не больше --concurrency,
+    # сколько бы товаров ни обрабатывалось параллельно
+    limit = threading.BoundedSemaphore(max(args.concurrency, 1))
+
+    def run(job_index: int, model: str) -> Any:
+        _, prod, sample, texts = jobs[job_index]
+        print(f"[info] Вызов модели: {model} для продукта {prod.get('name')}")
+        try:
+            if args.mapreduce:
+                return analyze_mapreduce(client, model, prod, texts, args.concurrency, args.chunk_tokens,
+                                         limit=limit)
+            return call_model_and_parse(client, model, SYSTEM_PROMPT, build_user_prompt_for_product(prod, sample))
+        except Exception as e:
+            print(f"[error] Ошибка вызова модели {model}: {e}")
+            return {"error": str(e)}
+
+    # Товары x модели параллельно. Файл пишется в порядке товаров из products.json:
+    # готовый товар ждет в ready, пока не записаны все товары перед ним
     out_path = args.out
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(results_out, f, ensure_ascii=False, indent=2)
-
-    
+    per_product: Dict[int, Dict[str, Any]] = {}
+    ready: Dict[int, Dict[str, Any]] = {}
+    with JsonArrayWriter(out_path) as writer, ThreadPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        futures = {pool.submit(run, i, model): (i, model) for i in range(len(jobs)) for model in MODELS}
+        for future in as_completed(futures):
+            i, model = futures[future]
+            per_model = per_product.setdefault(i, {})
+            per_model[model] = future.result()
+            if len(per_model) == len(MODELS):
+                # порядок моделей — как в MODELS, а не как они ответили
+                ready[i] = {"product": jobs[i][0], "models": {m: per_model[m] for m in MODELS}}
+                del per_product[i]
+                while writer.count in ready:
+                    writer.write(ready.pop(writer.count))
+                print(f"[info] Готово товаров: {writer.count + len(ready)}/{len(jobs)}")
 
     print(f"[ok] Сохранено в {out_path}")
 
@@ -0,0 +1,228 @@
+"""
+criteria_analytics.py
+
+Аналитика по оценкам отзывов (results.json) на NumPy, без pandas и без циклов по строкам:
+  - средние по критериям — всего и по каждому товару;
+  - распределения оценок 1–5 по критериям;
+  - корреляции критериев между собой и с тональностью;
+  - отзывы-выбросы: сильнее всего отклоняются от средних по своему товару.
+
+Оценки загружаются через criteria_store.CriteriaTable и без копирования
+превращаются в матрицу int8 размером N x K (K = 8 критериев, 0 — нет оценки).
+Все расчеты — операции над этой матрицей (bincount, matmul), миллион отзывов
+обрабатывается за доли секунды; дольше всего — разбор самого JSON.
+
+Запуск:
+    python criteria_analytics.py results.json
+    python criteria_analytics.py results.json --top 20 --json criteria_report.json
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from criteria_store import CriteriaTable, Sentiment
+from schemas import CRITERIA_NAMES
+
+# Тональность как число для корреляций: положительный +1, нейтральный 0, отрицательный -1
+SENTIMENT_SCORE = np.zeros(len(Sentiment), dtype=np.float64)
+SENTIMENT_SCORE[Sentiment.POSITIVE] = 1.0
+SENTIMENT_SCORE[Sentiment.NEGATIVE] = -1.0
+
+
+class ScoreMatrix:
+    """Оценки N отзывов по K критериям + тональность и товар каждого отзыва"""
+
+    def __init__(self, table: CriteriaTable):
+        n, k = len(table), len(CRITERIA_NAMES)
+        # Представления над буферами array без копирования
+        self.scores = np.frombuffer(table.scores, dtype=np.int8).reshape(n, k) if n else np.zeros((0, k), np.int8)
+        self.sentiments = np.frombuffer(table.sentiments, dtype=np.int8)
+        self.product_codes = np.frombuffer(table.product_codes, dtype=np.uint32).astype(np.intp)
+        self.products = table.products
+        self.review_ids = table.review_ids
+        self.valid = self.scores > 0
+
+    @classmethod
+    def load(cls, path: str) -> "ScoreMatrix":
+        return cls(CriteriaTable.load(path, keep_justifications=False))
+
+    def __len__(self) -> int:
+        return self.scores.shape[0]
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    out = np.full(np.broadcast(num, den).shape, np.nan)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def criterion_means(m: ScoreMatrix) -> np.ndarray:
+    """Средняя оценка по каждому критерию (K,), пропуски не учитываются"""
+    return _safe_div(m.scores.sum(axis=0, dtype=np.int64), m.valid.sum(axis=0))
+
+
+def _by_product(m: ScoreMatrix, values: np.ndarray) -> np.ndarray:
+    """Суммы столбцов values (N, K) по товарам -> (P, K). Цикл только по K критериям"""
+    p = len(m.products)
+    return np.stack([np.bincount(m.product_codes, weights=values[:, j], minlength=p)
+                     for j in range(values.shape[1])], axis=1)
+
+
+def product_means(m: ScoreMatrix) -> np.ndarray:
+    """Средние по товарам и критериям (P, K)"""
+    return _safe_div(_by_product(m, m.scores), _by_product(m, m.valid))
+
+
+def histograms(m: ScoreMatrix) -> np.ndarray:
+    """Число оценок 1..5 по каждому критерию (K, 5)"""
+    k = m.scores.shape[1]
+    cells = (m.scores.astype(np.intp) + 6 * np.arange(k)).ravel()
+    return np.bincount(cells, minlength=6 * k).reshape(k, 6)[:, 1:]
+
+
+def sentiment_counts(m: ScoreMatrix) -> np.ndarray:
+    """Число отзывов каждой тональности по товарам (P, 3)"""
+    p, s = len(m.products), len(Sentiment)
+    return np.bincount(m.product_codes * s + m.sentiments, minlength=p * s).reshape(p, s)
+
+
+def _pearson(x: np.ndarray) -> np.ndarray:
+    """Корреляции Пирсона между столбцами x (float64, без пропусков)"""
+    if x.shape[0] < 2:
+        return np.full((x.shape[1], x.shape[1]), np.nan)
+    # Оценки — небольшие целые, поэтому ковариация через X^T X без центрирования точна
+    mean = x.mean(axis=0)
+    cov = x.T @ x - x.shape[0] * np.outer(mean, mean)
+    std = np.sqrt(np.diag(cov))
+    return _safe_div(cov, np.outer(std, std))
+
+
+def correlations(m: ScoreMatrix) -> Dict[str, np.ndarray]:
+    """
+    criteria — (K, K) между критериями, sentiment — (K,) каждого критерия с тональностью.
+    Считаются по отзывам, где оценены все критерии
+    """
+    complete = m.valid.all(axis=1)
+    if complete.all():
+        x = np.empty((len(m), m.scores.shape[1] + 1))
+        x[:, :-1] = m.scores
+        x[:, -1] = SENTIMENT_SCORE[m.sentiments]
+    else:
+        x = np.column_stack([m.scores[complete], SENTIMENT_SCORE[m.sentiments[complete]]]).astype(np.float64)
+    corr = _pearson(x)
+    return {"criteria": corr[:-1, :-1], "sentiment": corr[:-1, -1]}
+
+
+def outliers(m: ScoreMatrix, top: int = 10) -> List[Dict[str, Any]]:
+    """
+    Отзывы, сильнее всего отличающиеся от остальных отзывов того же товара:
+    сумма квадратов z-оценок по критериям относительно средних и разброса товара
+    """
+    if not len(m):
+        return []
+    counts = _by_product(m, m.valid)
+    means = _safe_div(_by_product(m, m.scores), counts)
+    # Дисперсия по товару и критерию: E[x^2] - E[x]^2
+    squares = np.square(m.scores, dtype=np.float32)
+    variance = _safe_div(_by_product(m, squares), counts) - means ** 2
+    inv_std = np.where(variance > 1e-9, 1.0 / np.sqrt(np.maximum(variance, 1e-9)), 0.0)
+    means, inv_std = np.nan_to_num(means).astype(np.float32), inv_std.astype(np.float32)
+
+    z = (m.scores - means[m.product_codes]) * inv_std[m.product_codes]
+    z[~m.valid] = 0.0
+    distance = np.sqrt(np.einsum("ij,ij->i", z, z))
+
+    top = min(top, len(m))
+    idx = np.argpartition(-distance, top - 1)[:top]
+    idx = idx[np.argsort(-distance[idx])]
+    return [{
+        "review_id": m.review_ids[i],
+        "product_id": m.products[m.product_codes[i]],
+        "distance": round(float(distance[i]), 3),
+        "sentiment": Sentiment(int(m.sentiments[i])).label,
+        "scores": {name: int(m.scores[i, j]) for j, name in enumerate(CRITERIA_NAMES) if m.valid[i, j]},
+    } for i in idx]
+
+
+def _round(values: np.ndarray) -> List:
+    return [None if np.isnan(v) else round(float(v), 3) for v in values]
+
+
+def build_report(m: ScoreMatrix, top: int = 10) -> Dict[str, Any]:
+    """Все метрики одним словарем (JSON-совместимым)"""
+    corr = correlations(m)
+    return {
+        "reviews": len(m),
+        "criteria": CRITERIA_NAMES,
+        "means": _round(criterion_means(m)),
+        "histograms": histograms(m).tolist(),
+        "products": {
+            product: {
+                "means": _round(row),
+                "sentiment": dict(zip((s.label for s in Sentiment), counts.tolist())),
+            }
+            for product, row, counts in zip(m.products, product_means(m), sentiment_counts(m))
+        },
+        "correlations": {
+            "criteria": [_round(row) for row in corr["criteria"]],
+            "sentiment": _round(corr["sentiment"]),
+        },
+        "outliers": outliers(m, top),
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print("\n" + "=" * 80)
+    print(f"  📊 АНАЛИТИКА ПО КРИТЕРИЯМ ({report['reviews']} отзывов)")
+    print("=" * 80)
+    print(f"\n{'Критерий':<38} {'Средняя':>8}  {'1':>6} {'2':>6} {'3':>6} {'4':>6} {'5':>6}  {'r(тон.)':>8}")
+    for name, mean, hist, r in zip(report["criteria"], report["means"], report["histograms"],
+                                   report["correlations"]["sentiment"]):
+        mean_txt = "-" if mean is None else f"{mean:.2f}"
+        r_txt = "-" if r is None else f"{r:+.2f}"
+        print(f"{name:<38} {mean_txt:>8}  " + " ".join(f"{c:>6}" for c in hist) + f"  {r_txt:>8}")
+
+    print(f"\nТоваров: {len(report['products'])}")
+    for product, data in list(report["products"].items())[:10]:
+        sentiment = ", ".join(f"{k}: {v}" for k, v in data["sentiment"].items())
+        print(f"  {product}: {sentiment}")
+
+    if report["outliers"]:
+        print("\nОтзывы-выбросы:")
+        for item in report["outliers"]:
+            print(f"  {item['review_id']:<24} {item['product_id']:<20} отклонение {item['distance']:.2f} ({item['sentiment']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Аналитика по оценкам отзывов (NumPy)")
+    parser.add_argument("results", nargs="?", default="results.json", help="файл результатов оценки")
+    parser.add_argument("--top", type=int, default=10, help="сколько отзывов-выбросов показать")
+    parser.add_argument("--json", dest="json_out", help="сохранить отчет в JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.results):
+        print(f"[error] Не найден файл {args.results}")
+        return
+
+    started = time.perf_counter()
+    matrix = ScoreMatrix.load(args.results)
+    loaded = time.perf_counter()
+    report = build_report(matrix, args.top)
+    computed = time.perf_counter()
+
+    print_report(report)
+    print(f"\n[info] Загрузка: {loaded - started:.2f}s, расчет: {computed - loaded:.3f}s")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[ok] Отчет сохранен в {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+criteria_store.py
+
+Компактное представление результатов оценки отзывов (results.json) в памяти.
+
+В JSON каждая строка — вложенные словари с повторяющимися русскими ключами
+("критерий": "Информативность", ...), и миллион строк после json.load занимает
+гигабайты. Здесь:
+  - CriteriaRecord — запись со __slots__: оценки — bytes по одному байту на критерий
+    в порядке schemas.CRITERIA_NAMES (0 — критерий не оценивался), тональность — Sentiment,
+    обоснования — интернированные строки (повторяющиеся тексты хранятся один раз);
+  - CriteriaTable — та же информация по колонкам: array('b') оценок, array('b')
+    тональности, словари товаров и моделей. Обоснования опциональны — для аналитики
+    их можно не загружать, и миллион отзывов занимает порядка сотни МБ.
+
+Обе структуры конвертируются в текущий формат results.json и обратно.
+results.json читается потоково (iter_json_array), без загрузки всего файла.
+
+    table = CriteriaTable.load("results.json", keep_justifications=False)
+    table.column("Контекст")          # array('b') оценок по критерию
+    table.save_json("results_copy.json")  # только при keep_justifications=True
+"""
+
+import json
+import os
+import sys
+from array import array
+from enum import IntEnum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from schemas import CRITERIA_NAMES, SENTIMENTS, validate_criteria
+
+CRITERION_INDEX = {name: i for i, name in enumerate(CRITERIA_NAMES)}
+MISSING = 0  # оценки 1–5, 0 — критерий в ответе отсутствует
+
+
+class Sentiment(IntEnum):
+    POSITIVE = 0
+    NEUTRAL = 1
+    NEGATIVE = 2
+
+    @property
+    def label(self) -> str:
+        """Значение в results.json"""
+        return SENTIMENTS[self]
+
+    @classmethod
+    def from_label(cls, label: str) -> "Sentiment":
+        return cls(SENTIMENTS.index(label))
+
+
+def _intern(text: Optional[str]) -> str:
+    return sys.intern(text or "")
+
+
+# Поля строки results.json, которые CriteriaRecord хранит в своих колонках
+ROW_FIELDS = frozenset(("review_id", "product_id", "model", "content_hash", "prompt_version", "result"))
+
+
+class CriteriaRecord:
+    """Одна строка results.json"""
+
+    __slots__ = ("review_id", "product_id", "model", "content_hash", "prompt_version",
+                 "sentiment", "scores", "justifications", "extras")
+
+    def __init__(self, review_id: str, product_id: str, model: str, sentiment: Sentiment,
+                 scores: bytes, justifications: Tuple[str, ...] = (),
+                 content_hash: Optional[str] = None, prompt_version: Optional[str] = None,
+                 extras: Optional[Dict[str, Any]] = None):
+        self.review_id = review_id
+        self.product_id = product_id
+        self.model = model
+        self.content_hash = content_hash
+        self.prompt_version = prompt_version
+        self.sentiment = sentiment
+        self.scores = scores
+        self.justifications = justifications
+        # прочие поля строки (cascade, validation_errors, ...) — как есть, None — их нет
+        self.extras = extras
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any], keep_justifications: bool = True) -> "CriteriaRecord":
+        """Строка results.json -> запись. ValueError, если ответ модели не проходит схему"""
+        result = row.get("result")
+        errors = validate_criteria(result)
+        if errors:
+            raise ValueError(f"{row.get('review_id')}: {'; '.join(errors[:3])}")
+
+        scores = bytearray(len(CRITERIA_NAMES))
+        justifications = [""] * len(CRITERIA_NAMES)
+        for crit in result["критерии"]:
+            i = CRITERION_INDEX[crit["критерий"]]
+            scores[i] = crit["оценка"]
+            justifications[i] = crit["обоснование"]
+        return cls(
+            review_id=row.get("review_id") or "",
+            product_id=_intern(row.get("product_id")),
+            model=_intern(row.get("model")),
+            sentiment=Sentiment.from_label(result["тональность"]),
+            scores=bytes(scores),
+            justifications=tuple(map(_intern, justifications)) if keep_justifications else (),
+            content_hash=row.get("content_hash"),
+            prompt_version=_intern(row["prompt_version"]) if row.get("prompt_version") else None,
+            extras={key: value for key, value in row.items() if key not in ROW_FIELDS} or None,
+        )
+
+    def score(self, criterion: str) -> Optional[int]:
+        value = self.scores[CRITERION_INDEX[criterion]]
+        return value or None
+
+    def to_row(self) -> Dict[str, Any]:
+        """Запись -> строка results.json в текущем формате"""
+        if not self.justifications:
+            raise ValueError("запись загружена без обоснований, восстановить строку results.json нельзя")
+        row: Dict[str, Any] = {
+            "review_id": self.review_id,
+            "product_id": self.product_id,
+            "model": self.model,
+        }
+        if self.content_hash is not None:
+            row["content_hash"] = self.content_hash
+        if self.prompt_version is not None:
+            row["prompt_version"] = self.prompt_version
+        row["result"] = {
+            "тональность": self.sentiment.label,
+            "критерии": [
+                {"критерий": name, "оценка": self.scores[i], "обоснование": self.justifications[i]}
+                for i, name in enumerate(CRITERIA_NAMES) if self.scores[i] != MISSING
+            ],
+        }
+        if self.extras:
+            row.update(self.extras)
+        return row
+
+    def __repr__(self) -> str:
+        return f"CriteriaRecord({self.review_id!r}, {self.sentiment.label}, {list(self.scores)})"
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """
+    Потоковое чтение JSON-массива объектов: элементы по одному, в памяти — только
+    текущий кусок файла. results.json читается так без json.load
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = f.read(chunk_size).lstrip()
+        if not buf.startswith("["):
+            raise ValueError(f"{path}: ожидался JSON-массив")
+        pos, eof = 1, False
+        while True:
+            # пропускаем пробелы и запятые между элементами
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield item
+            pos = end
+            if pos > chunk_size:
+                buf, pos = buf[pos:], 0
+
+
+class CriteriaTable:
+    """
+    Результаты по колонкам. i-я строка: review_ids[i], products[product_codes[i]],
+    models[model_codes[i]], sentiments[i], оценки scores[i*K:(i+1)*K], K = len(CRITERIA_NAMES)
+    """
+
+    def __init__(self, keep_justifications: bool = True):
+        self.keep_justifications = keep_justifications
+        self.review_ids: List[str] = []
+        self.content_hashes: List[Optional[str]] = []
+        self.products: List[str] = []
+        self.models: List[str] = []
+        self.prompt_versions: List[Optional[str]] = []
+        self.product_codes = array("I")
+        self.model_codes = array("H")  # до 65536 моделей и версий промпта
+        self.prompt_codes = array("H")
+        self.sentiments = array("b")
+        self.scores = array("b")
+        self.justifications: List[Tuple[str, ...]] = []
+        self.extras: Dict[int, Dict[str, Any]] = {}  # номер строки -> прочие поля, только где они есть
+        self.skipped = 0  # строки, не прошедшие схему
+        self._codes: Dict[Tuple[int, Any], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.review_ids)
+
+    def _code(self, values: List[Any], kind: int, value: Any) -> int:
+        key = (kind, value)
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(values)
+            values.append(value)
+        return code
+
+    def append(self, record: CriteriaRecord):
+        if record.extras:
+            self.extras[len(self.review_ids)] = record.extras
+        self.review_ids.append(record.review_id)
+        self.content_hashes.append(record.content_hash)
+        self.product_codes.append(self._code(self.products, 0, record.product_id))
+        self.model_codes.append(self._code(self.models, 1, record.model))
+        self.prompt_codes.append(self._code(self.prompt_versions, 2, record.prompt_version))
+        self.sentiments.append(record.sentiment)
+        self.scores.frombytes(record.scores)
+        if self.keep_justifications:
+            self.justifications.append(record.justifications)
+
+    def extend_rows(self, rows: Iterable[Dict[str, Any]]):
+        """Добавить строки results.json; некорректные пропускаются и считаются в skipped"""
+        for row in rows:
+            try:
+                self.append(CriteriaRecord.from_row(row, self.keep_justifications))
+            except (ValueError, AttributeError):
+                self.skipped += 1
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], keep_justifications: bool = True) -> "CriteriaTable":
+        table = cls(keep_justifications)
+        table.extend_rows(rows)
+        return table
+
+    @classmethod
+    def load(cls, path: str, keep_justifications: bool = True) -> "CriteriaTable":
+        """Потоковая загрузка results.json"""
+        return cls.from_rows(iter_json_array(path), keep_justifications)
+
+    def __getitem__(self, i: int) -> CriteriaRecord:
+        k = len(CRITERIA_NAMES)
+        return CriteriaRecord(
+            review_id=self.review_ids[i],
+            product_id=self.products[self.product_codes[i]],
+            model=self.models[self.model_codes[i]],
+            sentiment=Sentiment(self.sentiments[i]),
+            scores=self.scores[i * k:(i + 1) * k].tobytes(),
+            justifications=self.justifications[i] if self.keep_justifications else (),
+            content_hash=self.content_hashes[i],
+            prompt_version=self.prompt_versions[self.prompt_codes[i]],
+            extras=self.extras.get(i),
+        )
+
+    def __iter__(self) -> Iterator[CriteriaRecord]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def column(self, criterion: str) -> array:
+        """Оценки всех строк по одному критерию (0 — нет оценки)"""
+        return self.scores[CRITERION_INDEX[criterion]::len(CRITERIA_NAMES)]
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Строки в формате results.json"""
+        for record in self:
+            yield record.to_row()
+
+    def save_json(self, path: str):
+        """
+        Запись в формате results.json (как json.dump(..., indent=2)) построчно,
+        без сборки всего списка словарей в памяти. ValueError, если при загрузке
+        были пропущены строки (skipped): перезапись потеряла бы их вместе с отметками
+        validation_errors / parse_error
+        """
+        if self.skipped:
+            raise ValueError(f"при загрузке пропущено строк, не прошедших схему: {self.skipped}; "
+                             f"перезапись {path} потеряла бы их")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("[")
+            for i, row in enumerate(self.rows()):
+                f.write(",\n  " if i else "\n  ")
+                f.write(json.dumps(row, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+            f.write("\n]" if len(self) else "]")
+        os.replace(tmp_path, path)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+export_columnar.py
+
+Выгрузка отзывов, оценок по критериям и сегментов аудитории в колоночный формат
+(Parquet или Arrow IPC) с разбиением по товарам:
+
+    columnar/
+      reviews/product_id=wb_396501168/part-0.parquet    # id, текст, дата, рейтинг
+      criteria/product_id=wb_396501168/part-0.parquet   # тональность, 8 оценок int8, обоснования
+      segments/product_id=wb_396501168/part-0.parquet   # сегменты из audience_analysis_results.json
+
+Дальнейшие скрипты читают только нужные колонки и товары, а не json.load всего
+results.json со всеми обоснованиями:
+
+    from export_columnar import read_dataset
+    scores = read_dataset("columnar", "criteria", columns=["review_id", "context"],
+                          products=["wb_396501168"])
+
+Формат arrow (Arrow IPC) читается через memory map без копирования.
+
+Запуск:
+    python export_columnar.py
+    python export_columnar.py --format arrow --out columnar --no-justifications
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from criteria_store import CriteriaTable, iter_json_array
+from review_state import review_text
+from schemas import CRITERIA_COLUMNS, CRITERIA_NAMES, SENTIMENTS, validate_audience
+
+FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+
+
+def _dictionary(codes, values: List[str]) -> pa.DictionaryArray:
+    """Колонка-словарь поверх буфера array('i') с кодами строк"""
+    indices = pa.Array.from_buffers(pa.int32(), len(codes), [None, pa.py_buffer(codes)])
+    return pa.DictionaryArray.from_arrays(indices, pa.array(values, pa.string()))
+
+
+def criteria_table(results_path: str, keep_justifications: bool = True) -> pa.Table:
+    """results.json -> Arrow-таблица: одна строка на (отзыв, модель), оценки int8 (null — нет оценки)"""
+    table = CriteriaTable.load(results_path, keep_justifications)
+    n = len(table)
+    if table.skipped:
+        print(f"[warning] Пропущено строк, не прошедших схему: {table.skipped}")
+
+    sentiment_indices = pa.Array.from_buffers(pa.int8(), n, [None, pa.py_buffer(table.sentiments)])
+    columns: Dict[str, pa.Array] = {
+        "review_id": pa.array(table.review_ids, pa.string()),
+        "product_id": _dictionary(array("i", table.product_codes), table.products),
+        "model": pa.array([table.models[c] for c in table.model_codes], pa.string()).dictionary_encode(),
+        "sentiment": pa.DictionaryArray.from_arrays(sentiment_indices, pa.array(SENTIMENTS)),
+        "content_hash": pa.array(table.content_hashes, pa.string()),
+    }
+    for j, name in enumerate(CRITERIA_COLUMNS):
+        column = table.column(CRITERIA_NAMES[j])
+        scores = pa.Array.from_buffers(pa.int8(), n, [None, pa.py_buffer(column)])
+        columns[name] = pc.if_else(pc.equal(scores, 0), pa.scalar(None, pa.int8()), scores)
+    if keep_justifications:
+        for j, name in enumerate(CRITERIA_COLUMNS):
+            columns[f"{name}_why"] = pa.array([row[j] or None for row in table.justifications], pa.string())
+
+    metadata = {"criteria": json.dumps(dict(zip(CRITERIA_COLUMNS, CRITERIA_NAMES)), ensure_ascii=False)}
+    return pa.table(columns).replace_schema_metadata(metadata)
+
+
+def reviews_table(reviews_path: str) -> pa.Table:
+    """reviews.json -> Arrow-таблица отзывов"""
+    ids, products, texts, dates, ratings = [], [], [], [], []
+    for review in iter_json_array(reviews_path):
+        ids.append(review.get("id"))
+        products.append(review.get("product_id") or "unknown")
+        texts.append(review_text(review))
+        dates.append(review.get("date"))
+        rating = review.get("rating")
+        ratings.append(rating if isinstance(rating, (int, float)) and not isinstance(rating, bool) else None)
+    return pa.table({
+        "review_id": pa.array(ids, pa.string()),
+        "product_id": pa.array(products, pa.string()).dictionary_encode(),
+        "text": pa.array(texts, pa.string()),
+        "date": pa.array(dates, pa.string()),
+        "rating": pa.array(ratings, pa.float32()),
+    })
+
+
+def segments_table(audience_path: str) -> pa.Table:
+    """audience_analysis_results.json -> по строке на сегмент (ответы, не прошедшие схему, пропускаются)"""
+    with open(audience_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    rows: Dict[str, List[Any]] = {key: [] for key in (
+        "product_id", "model", "name", "share_pct_est", "needs", "pain_points", "recommended_message")}
+    for item in data if isinstance(data, list) else [data]:
+        product = item.get("product") or {}
+        product_id = product.get("product_id") or product.get("id") or "unknown"
+        for model, output in (item.get("models") or {}).items():
+            parsed = (output or {}).get("parsed")
+            if validate_audience(parsed):
+                print(f"[warning] {product_id} / {model}: ответ не прошел схему, сегменты пропущены")
+                continue
+            for segment in parsed["audience_segments"]:
+                rows["product_id"].append(product_id)
+                rows["model"].append(model)
+                for key in ("name", "share_pct_est", "needs", "pain_points", "recommended_message"):
+                    rows[key].append(segment[key])
+    return pa.table({
+        "product_id": pa.array(rows["product_id"], pa.string()).dictionary_encode(),
+        "model": pa.array(rows["model"], pa.string()).dictionary_encode(),
+        "name": pa.array(rows["name"], pa.string()),
+        "share_pct_est": pa.array(rows["share_pct_est"], pa.float32()),
+        "needs": pa.array(rows["needs"], pa.string()),
+        "pain_points": pa.array(rows["pain_points"], pa.string()),
+        "recommended_message": pa.array(rows["recommended_message"], pa.string()),
+    })
+
+
+def write_dataset(table: pa.Table, out_dir: str, name: str, fmt: str = "parquet") -> int:
+    """
+    Запись таблицы с разбиением по product_id (каталоги product_id=<id>).
+    Каталог набора пересоздается целиком. Возвращает размер на диске, байт
+    """
+    path = os.path.join(out_dir, name)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    ds.write_dataset(
+        table,
+        tmp_path,
+        format=FORMATS[fmt],
+        partitioning=ds.partitioning(pa.schema([("product_id", pa.string())]), flavor="hive"),
+        basename_template=f"part-{{i}}.{EXTENSIONS[fmt]}",
+    )
+    # Набор пишется во временный каталог и только потом подменяет прошлый
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def read_dataset(out_dir: str, name: str, columns: Optional[List[str]] = None,
+                 products: Optional[List[str]] = None, fmt: Optional[str] = None) -> pa.Table:
+    """
+    Чтение набора: только нужные колонки и каталоги нужных товаров.
+    Arrow IPC отображается в память (memory map) — без копирования данных
+    """
+    path = os.path.join(out_dir, name)
+    if fmt is None:
+        fmt = "arrow" if any(f.endswith(".arrow") for _, _, files in os.walk(path) for f in files) else "parquet"
+    dataset = ds.dataset(
+        path,
+        format=FORMATS[fmt],
+        partitioning=ds.partitioning(pa.schema([("product_id", pa.string())]), flavor="hive"),
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+    flt = ds.field("product_id").isin(products) if products else None
+    return dataset.to_table(columns=columns, filter=flt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка результатов в Parquet / Arrow IPC по товарам")
+    parser.add_argument("--results", default="results.json", help="оценки по критериям")
+    parser.add_argument("--reviews", default="reviews.json", help="отзывы")
+    parser.add_argument("--audience", default="audience_analysis_results.json", help="анализ аудитории")
+    parser.add_argument("--out", default="columnar", help="каталог выгрузки")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet", help="parquet или arrow (IPC)")
+    parser.add_argument("--no-justifications", action="store_true", help="не выгружать обоснования оценок")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    builders = [
+        ("reviews", args.reviews, reviews_table),
+        ("criteria", args.results, lambda path: criteria_table(path, not args.no_justifications)),
+        ("segments", args.audience, segments_table),
+    ]
+
+    print("\n" + "=" * 60)
+    print(f"  🗂  ВЫГРУЗКА В {args.format.upper()}")
+    print("=" * 60)
+    for name, source, build in builders:
+        if not os.path.exists(source):
+            print(f"⚠️  {source} не найден, {name} пропущен")
+            continue
+        started = time.perf_counter()
+        table = build(source)
+        size = write_dataset(table, args.out, name, args.format)
+        json_size = os.path.getsize(source)
+        print(f"✅ {name}: {table.num_rows} строк, {size / 1024:.1f} KB "
+              f"(исходный JSON {json_size / 1024:.1f} KB), {time.perf_counter() - started:.2f}s")
+
+    print(f"\n💾 Каталог: {args.out}/")
+
+
+if __name__ == "__main__":
+    main()
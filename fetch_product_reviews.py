@@ -18,6 +18,8 @@ fetch_product_reviews.py
   В этом случае скрипт попробует несколько раз с заголовками браузера.
   Если и это не поможет — появится подсказка использовать Selenium/прокси/ручной экспорт.
 - Скрипт сохраняет исходные html-страницы в ./cache для отладки.
+- Повторный запуск по тому же товару дописывает только новые отзывы
+  (отметки уровня хранятся в review_state.json, см. review_state.py).
 """
 
 import os
@@ -30,6 +32,9 @@ from urllib.parse import urlparse
 import requests
 from bs4 import BeautifulSoup
 
+from review_ids import product_id_from_url, review_id
+from review_state import ReviewState, merge_reviews
+
 # === Настройки ===
 CACHE_DIR = "cache_html"
 OUTPUT_PRODUCTS = "products.json"
@@ -60,8 +65,7 @@ def safe_get(url: str, max_retries: int = 4, timeout: int = 10) -> Tuple[str, in
         try:
             resp = requests.get(url, headers=DEFAULT_HEADERS, timeout=timeout)
             # Сохраним в кэш для отладки
-            parsed = urlparse(url)
-            fname = os.path.join(CACHE_DIR, f"{parsed.netloc}_{abs(hash(url))}.html")
+            fname = os.path.join(CACHE_DIR, f"{product_id_from_url(url)}.html")
             with open(fname, "w", encoding="utf-8") as f:
                 f.write(resp.text)
             return resp.text, resp.status_code
@@ -320,9 +324,8 @@ def main():
     product = parsed["product"]
     reviews = parsed["reviews"]
 
-    # Make product_id
-    parsed_url = urlparse(url)
-    product_id = f"{parsed_url.netloc}_{abs(hash(url))}"
+    # Make product_id: артикул для WB / Ozon, хэш URL для прочих сайтов — одинаковый между запусками
+    product_id = product_id_from_url(url)
 
     # if product name missing, ask user to input (fallback)
     if not product.get("name"):
@@ -345,20 +348,34 @@ def main():
     # If no reviews found — allow manual entry
     if not reviews:
         print("[info] Найдено отзывов: 0")
-        extra = interactive_add_reviews(product_id)
-        if extra:
-            for r in extra:
-                out_reviews.append({"product_id": product_id, "text": r["text"]})
+        incoming = [
+            {"id": review_id(product_id, r["text"]), "product_id": product_id, "text": r["text"]}
+            for r in interactive_add_reviews(product_id)
+        ]
     else:
         # Normalize review items
+        incoming = []
         for r in reviews:
             text = r.get("text") or r.get("comment") or ""
-            out_reviews.append({"product_id": product_id, "text": text, "rating": r.get("rating")})
+            incoming.append({
+                "id": review_id(product_id, text),
+                "product_id": product_id,
+                "text": text,
+                "rating": r.get("rating"),
+            })
+
+    # Только отзывы новее отметки уровня и без дублей в reviews.json
+    state = ReviewState()
+    fresh = state.new_reviews(product_id, incoming)
+    added = merge_reviews(out_reviews, fresh)
+    state.advance(product_id, added)
 
     # Persist files
     json_save(OUTPUT_PRODUCTS, out_products)
     json_save(OUTPUT_REVIEWS, out_reviews)
+    state.save()
 
+    print(f"[info] Новых отзывов: {len(added)} (пропущено известных: {len(incoming) - len(added)})")
     print(f"[info] Найдено отзывов: {len([r for r in out_reviews if r.get('product_id')==product_id])}")
 
 
@@ -5,6 +5,8 @@ from typing import Dict, Any, List
 
 from groq import Groq
 
+from schemas import validate_audience
+
 SYSTEM_PROMPT = """
 Ты — профессиональный копирайтер-маркетолог, специализирующийся на персонализации контента для маркетплейсов.
 Твоя задача — создавать убедительные тексты для товаров, которые максимально точно обращаются к языку, 
@@ -122,15 +124,40 @@ def load_products(path: str) -> Dict[str, Dict[str, Any]]:
     return products_by_id
 
 
-def load_audience_segments(path: str) -> Dict[str, Any]:
+def load_audience_segments(path: str, product_id: str) -> Dict[str, Any]:
     """
-    Загружает audience_analysis_results.json и извлекает сегменты.
-    Структура: массив[0].models['qwen/qwen3-32b'].parsed
+    Загружает audience_analysis_results.json и извлекает сегменты товара product_id.
+    Структура: массив[товар].models[модель].parsed — берется первый ответ по этому
+    товару, прошедший AUDIENCE_SCHEMA. Если товара нет или корректных ответов нет —
+    ValueError с ошибками схемы.
     """
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
     
-    parsed = data[0]['models']['qwen/qwen3-32b']['parsed']
+    # Старый формат — один объект на файл, без привязки к товару
+    items = data if isinstance(data, list) else [data]
+    if isinstance(data, list):
+        items = [item for item in data if isinstance(item, dict)
+                 and (item.get('product') or {}).get('product_id') == product_id]
+        if not items:
+            raise ValueError(f"в {path} нет анализа аудитории для товара {product_id}")
+    
+    problems = []
+    parsed = None
+    for item in items:
+        models = item.get('models') if isinstance(item, dict) else None
+        for model, output in (models or {}).items():
+            candidate = output.get('parsed') if isinstance(output, dict) else None
+            errors = validate_audience(candidate)
+            if not errors:
+                parsed = candidate
+                break
+            problems.append(f"{model}: {'; '.join(errors[:3])}")
+        if parsed is not None:
+            break
+    if parsed is None:
+        raise ValueError(f"в {path} нет корректного анализа аудитории для товара {product_id} "
+                         f"({' | '.join(problems) or 'нет ответов моделей'})")
     
     return {
         'product_name': parsed['product_name'],
@@ -239,7 +266,9 @@ def main():
     
     try:
         products = load_products("product.json")
-        audience_data = load_audience_segments("audience_analysis_results.json")
+        # Берём первый товар (можно расширить для нескольких)
+        product_id = list(products.keys())[0]
+        audience_data = load_audience_segments("audience_analysis_results.json", product_id)
         reviews_insights = load_reviews("reviews.json")
         
         print(f"[info] Загружено товаров: {len(products)}")
@@ -253,9 +282,11 @@ def main():
         print("  - audience_analysis_results.json")
         print("  - reviews.json (опционально)")
         return
+    except ValueError as e:
+        print(f"\n[error] Некорректные данные: {e}")
+        print("\n💡 Перезапустите audience_analysis_groq.py")
+        return
     
-    # Получаем первый товар (можно расширить для нескольких)
-    product_id = list(products.keys())[0]
     product = products[product_id]
     
     print(f"\n[info] Товар для генерации: {product['name']}")
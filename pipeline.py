@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+pipeline.py
+
+Запуск пайплайна Audience Lens как DAG:
+
+    fetch ──┬── criteria ──────┬── dashboard
+            │            └─────┼── search
+            └── audience ──┬───┘
+                           └── descriptions
+
+У каждого этапа объявлены входы и выходы. Для файлов хранятся хэши содержимого
+(sha256) и штампы (размер + mtime, чтобы не перечитывать неизмененные файлы)
+в .pipeline_state.json. Этап запускается заново, только если изменились его входы,
+команда или выходы пропали/были изменены вручную. Независимые этапы
+(criteria и audience) выполняются параллельно.
+
+Запуск:
+    python pipeline.py plan                 # что будет выполнено и почему
+    python pipeline.py run                  # выполнить устаревшие этапы
+    python pipeline.py run --force fetch    # принудительно (например, обновить отзывы)
+    python pipeline.py run --only criteria  # только выбранные этапы
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+STATE_FILE = ".pipeline_state.json"
+PYTHON = sys.executable
+
+
+@dataclass
+class Stage:
+    """Этап пайплайна: команда + объявленные входы и выходы"""
+    name: str
+    command: List[str]
+    inputs: List[str]
+    outputs: List[str] = field(default_factory=list)
+    deps: List[str] = field(default_factory=list)
+    description: str = ""
+
+    @property
+    def command_key(self) -> str:
+        """Команда без пути к интерпретатору — он не влияет на результат"""
+        return " ".join(self.command[1:] if self.command[0] == PYTHON else self.command)
+
+
+STAGES: List[Stage] = [
+    Stage(
+        name="fetch",
+        command=[PYTHON, "Dashboard/parcer/marketplace_parser.py", "--urls-file", "urls.txt",
+                 "--state-file", "review_state.json"],
+        inputs=["urls.txt"],
+        outputs=["product.json", "reviews.json"],
+        description="парсинг товаров и новых отзывов",
+    ),
+    Stage(
+        name="criteria",
+        command=[PYTHON, "reviews_groq_criteria.py", "--incremental", "--out", "results.json"],
+        inputs=["product.json", "reviews.json", "reviews_groq_criteria.py"],
+        outputs=["results.json"],
+        deps=["fetch"],
+        description="оценка отзывов по критериям",
+    ),
+    Stage(
+        name="audience",
+        command=[PYTHON, "audience_analysis_groq.py", "--product", "product.json",
+                 "--reviews", "reviews.json", "--out", "audience_analysis_results.json"],
+        inputs=["product.json", "reviews.json", "audience_analysis_groq.py"],
+        outputs=["audience_analysis_results.json"],
+        deps=["fetch"],
+        description="сегменты целевой аудитории",
+    ),
+    Stage(
+        name="descriptions",
+        command=[PYTHON, "generate_product_descriptions.py"],
+        inputs=["product.json", "audience_analysis_results.json", "reviews.json",
+                "generate_product_descriptions.py"],
+        outputs=["product_descriptions.json"],
+        deps=["audience"],
+        description="описания товара под сегменты",
+    ),
+    Stage(
+        name="dashboard",
+        command=[PYTHON, "update_dashboard.py"],
+        inputs=["product.json", "reviews.json", "results.json", "audience_analysis_results.json"],
+        deps=["criteria", "audience"],
+        description="копирование данных в dashboard",
+    ),
+    Stage(
+        name="search",
+        command=[PYTHON, "review_search.py", "index", "--reviews", "reviews.json", "--results", "results.json"],
+        inputs=["reviews.json", "results.json"],
+        deps=["criteria"],
+        description="полнотекстовый индекс отзывов",
+    ),
+]
+
+
+# === Хэши и штампы ===
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PipelineState:
+    """Хэши файлов и результаты последних запусков этапов"""
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.data: Dict[str, Any] = {"stamps": {}, "stages": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                try:
+                    self.data = json.load(f)
+                except json.JSONDecodeError:
+                    pass
+        self.data.setdefault("stamps", {})
+        self.data.setdefault("stages", {})
+
+    def fingerprint(self, path: str) -> Optional[str]:
+        """
+        Хэш содержимого файла. Если размер и mtime совпадают со штампом,
+        берем хэш из штампа и файл не читаем
+        """
+        if not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        stamp = self.data["stamps"].get(path)
+        if stamp and stamp["size"] == st.st_size and stamp["mtime_ns"] == st.st_mtime_ns:
+            return stamp["sha256"]
+        digest = file_sha256(path)
+        self.data["stamps"][path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def fingerprints(self, paths: List[str]) -> Dict[str, Optional[str]]:
+        return {path: self.fingerprint(path) for path in paths}
+
+    def stage(self, name: str) -> Dict[str, Any]:
+        return self.data["stages"].get(name, {})
+
+    def record(self, stage: Stage, inputs: Dict[str, Optional[str]], seconds: float):
+        self.data["stages"][stage.name] = {
+            "command": stage.command_key,
+            "inputs": inputs,
+            "outputs": self.fingerprints(stage.outputs),
+            "seconds": round(seconds, 2),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+# === Планирование ===
+
+def stale_reason(stage: Stage, state: PipelineState) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+    """
+    Причина перезапуска этапа или None, если этап актуален.
+    Вторым значением — текущие хэши входов.
+    """
+    inputs = state.fingerprints(stage.inputs)
+    missing = [path for path, digest in inputs.items() if digest is None]
+    if missing:
+        return f"нет входов: {', '.join(missing)}", inputs
+
+    last = state.stage(stage.name)
+    if not last:
+        return "еще не запускался", inputs
+    if last.get("command") != stage.command_key:
+        return "изменилась команда", inputs
+
+    changed = [path for path, digest in inputs.items() if last.get("inputs", {}).get(path) != digest]
+    if changed:
+        return f"изменились входы: {', '.join(changed)}", inputs
+
+    outputs = state.fingerprints(stage.outputs)
+    touched = [path for path, digest in outputs.items() if last.get("outputs", {}).get(path) != digest]
+    if touched:
+        return f"выходы отсутствуют или изменены: {', '.join(touched)}", inputs
+    return None, inputs
+
+
+def select_stages(only: Optional[List[str]]) -> List[Stage]:
+    names = {s.name for s in STAGES}
+    for name in only or []:
+        if name not in names:
+            raise SystemExit(f"[error] Неизвестный этап: {name}. Доступны: {', '.join(sorted(names))}")
+    return [s for s in STAGES if not only or s.name in only]
+
+
+def print_plan(stages: List[Stage], state: PipelineState, force: List[str]):
+    print("\n" + "=" * 70)
+    print("  📋 ПЛАН ПАЙПЛАЙНА")
+    print("=" * 70)
+    will_run = set()
+    for stage in stages:
+        reason, _ = stale_reason(stage, state)
+        upstream = [d for d in stage.deps if d in will_run]
+        if stage.name in force:
+            status, reason = "▶ run ", "принудительно (--force)"
+        elif reason and reason.startswith("нет входов") and not upstream:
+            status = "⏭ skip"
+        elif reason:
+            status = "▶ run "
+        elif upstream:
+            status, reason = "? maybe", f"если изменятся выходы: {', '.join(upstream)}"
+        else:
+            status, reason = "✓ ok  ", "актуален"
+        if status.startswith(("▶", "?")):
+            will_run.add(stage.name)
+        last = state.stage(stage.name)
+        timing = f"{last['seconds']}s" if last.get("seconds") is not None else "-"
+        print(f"  {status} {stage.name:<13} {timing:>8}  {reason}")
+    print()
+
+
+# === Выполнение ===
+
+def run_stage(stage: Stage) -> Tuple[int, float]:
+    started = time.monotonic()
+    print(f"  $ {' '.join(stage.command)}", flush=True)
+    proc = subprocess.run(stage.command)
+    return proc.returncode, time.monotonic() - started
+
+
+def run_pipeline(stages: List[Stage], state: PipelineState, force: List[str], jobs: int,
+                 dry_run: bool = False) -> bool:
+    """
+    Выполнение по готовности: этап стартует, когда завершены все его зависимости
+    (зависимости вне выбранных этапов считаются выполненными). Актуальность этапа
+    проверяется в момент старта — по реальным хэшам выходов предыдущих этапов.
+    """
+    selected = {s.name for s in stages}
+    pending = {s.name: s for s in stages}
+    done: Dict[str, str] = {}  # имя -> ran / skipped / failed / up-to-date
+    timings: Dict[str, float] = {}
+    running = {}
+
+    def ready(stage: Stage) -> bool:
+        return all(d in done or d not in selected for d in stage.deps)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if not ready(stage):
+                    continue
+                del pending[name]
+                if any(done.get(d) == "failed" for d in stage.deps):
+                    print(f"⏭ [{name}] пропущен: упала зависимость")
+                    done[name] = "failed"
+                    continue
+                reason, inputs = stale_reason(stage, state)
+                if name not in force and reason is None:
+                    print(f"✓ [{name}] актуален")
+                    done[name] = "up-to-date"
+                    continue
+                if name not in force and reason.startswith("нет входов"):
+                    print(f"⏭ [{name}] пропущен: {reason}")
+                    done[name] = "skipped"
+                    continue
+                print(f"▶ [{name}] {reason or 'принудительно (--force)'}")
+                if dry_run:
+                    done[name] = "ran"
+                    continue
+                running[pool.submit(run_stage, stage)] = (stage, inputs)
+
+            if not running:
+                if pending and not any(ready(s) for s in pending.values()):
+                    raise RuntimeError("Цикл в зависимостях этапов")
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, inputs = running.pop(future)
+                code, seconds = future.result()
+                timings[stage.name] = seconds
+                if code == 0:
+                    state.record(stage, inputs, seconds)
+                    state.save()
+                    done[stage.name] = "ran"
+                    print(f"✅ [{stage.name}] {seconds:.1f}s")
+                else:
+                    done[stage.name] = "failed"
+                    print(f"❌ [{stage.name}] код выхода {code}")
+
+    print("\n" + "=" * 70)
+    print("  ⏱  ЭТАПЫ")
+    print("=" * 70)
+    for stage in stages:
+        seconds = f"{timings[stage.name]:.1f}s" if stage.name in timings else "-"
+        print(f"  {stage.name:<13} {done.get(stage.name, '-'):<11} {seconds:>8}")
+    state.save()
+    return all(status != "failed" for status in done.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пайплайн Audience Lens с перезапуском только устаревших этапов")
+    parser.add_argument("command", choices=["plan", "run"], help="plan — показать план, run — выполнить")
+    parser.add_argument("--only", nargs="+", metavar="STAGE", help="только указанные этапы")
+    parser.add_argument("--force", nargs="+", metavar="STAGE", default=[], help="выполнить даже если актуальны")
+    parser.add_argument("--jobs", "-j", type=int, default=2, help="сколько этапов выполнять параллельно")
+    parser.add_argument("--dry-run", action="store_true", help="показать, что будет выполнено, без запуска")
+    parser.add_argument("--state", default=STATE_FILE, help="файл состояния пайплайна")
+    args = parser.parse_args()
+
+    # Пути этапов заданы относительно корня репозитория
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    stages = select_stages(args.only)
+    state = PipelineState(args.state)
+
+    if args.command == "plan":
+        print_plan(stages, state, args.force)
+        state.save()
+        return
+
+    ok = run_pipeline(stages, state, args.force, max(1, args.jobs), args.dry_run)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+review_clustering.py
+
+Сегменты аудитории по кластерам отзывов — локально, на CPU, без модели эмбеддингов:
+  1. текст отзыва -> вектор хэшированных символьных n-грамм (3–5 символов внутри слов),
+     TF-IDF и L2-нормировка; хэш стабильный (crc32), размер вектора фиксирован;
+  2. mini-batch k-means по косинусной близости (NumPy), каждая итерация — случайная пачка отзывов;
+  3. доля кластера = доля его отзывов — измеренная, а не оценка модели;
+  4. модели отправляются только описания кластеров: частые слова и несколько отзывов,
+     ближайших к центроиду. Модель их называет, доли берутся из шага 3.
+
+Размер промпта не зависит от числа отзывов: k кластеров x (слова + exemplars) на товар.
+
+Запуск:
+    python review_clustering.py --reviews reviews.json --product product.json
+    python review_clustering.py --reviews reviews.corpus --k 6 --no-llm
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import time
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from criteria_store import iter_json_array
+from review_corpus import ReviewCorpus
+from review_search import stem
+from review_state import review_text
+from schemas import CLUSTER_NAMING_SCHEMA, validate_cluster_naming
+
+DIMENSIONS = 1 << 12
+NGRAMS = (3, 4, 5)
+DEFAULT_K = 5
+BATCH_SIZE = 1024
+ITERATIONS = 100
+EXEMPLARS = 3
+TOP_TERMS = 8
+EXEMPLAR_CHARS = 300
+
+_WORD_RE = re.compile(r"[0-9a-zа-яё]+")
+
+NAMING_SYSTEM_PROMPT = """Ты — аналитик целевой аудитории. Отзывы о товаре разбиты на кластеры автоматически.
+Для каждого кластера даны доля отзывов, характерные слова и типичные отзывы.
+Дай каждому кластеру название сегмента аудитории, опиши потребности, болевые точки и рекламное сообщение.
+Верни строго JSON без поясняющего текста:
+  {"clusters": [{"cluster": номер, "name": "...", "needs": "...", "pain_points": "...", "recommended_message": "..."}]}
+Доли не меняй и не пересчитывай — они измерены.
+"""
+
+
+# === Векторизация ===
+
+@lru_cache(maxsize=200_000)
+def _word_features(word: str) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+    """Индексы и знаки хэшированных n-грамм слова (слова повторяются — считаем один раз)"""
+    padded = f"<{word}>"
+    indices, signs = [], []
+    for n in NGRAMS:
+        for i in range(len(padded) - n + 1):
+            h = zlib.crc32(padded[i:i + n].encode("utf-8"))
+            indices.append(h % DIMENSIONS)
+            signs.append(1.0 if h & 0x80000000 else -1.0)  # знак снижает вклад коллизий
+    return tuple(indices), tuple(signs)
+
+
+class HashedVectors:
+    """
+    Разреженная матрица отзывов (CSR: indptr, indices, data) с TF-IDF весами.
+    Плотными делаются только пачки строк — память O(пачка x DIMENSIONS)
+    """
+
+    def __init__(self, texts: List[str]):
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            row: Dict[int, float] = {}
+            for word in _WORD_RE.findall(text.lower()):
+                for j, sign in zip(*_word_features(word)):
+                    row[j] = row.get(j, 0.0) + sign
+            indices.extend(row)
+            data.extend(row.values())
+            indptr.append(len(indices))
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(data, dtype=np.float32)
+
+        # TF-IDF: сублинейный tf, idf по числу отзывов с признаком
+        n = len(texts)
+        df = np.bincount(self.indices, minlength=DIMENSIONS)
+        idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+        data = np.sign(data) * np.log1p(np.abs(data)) * idf[self.indices]
+
+        # L2-нормировка строк: скалярное произведение = косинус
+        rows = np.repeat(np.arange(n), np.diff(self.indptr))
+        norms = np.sqrt(np.bincount(rows, weights=data.astype(np.float64) ** 2, minlength=n))
+        data /= np.maximum(norms, 1e-12)[rows].astype(np.float32)
+        self.data = data.astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def dense(self, rows: np.ndarray) -> np.ndarray:
+        """Плотная матрица выбранных строк (len(rows), DIMENSIONS)"""
+        out = np.zeros((len(rows), DIMENSIONS), dtype=np.float32)
+        for k, r in enumerate(rows):
+            start, end = self.indptr[r], self.indptr[r + 1]
+            out[k, self.indices[start:end]] = self.data[start:end]
+        return out
+
+    def blocks(self, size: int = 4096):
+        for start in range(0, len(self), size):
+            rows = np.arange(start, min(start + size, len(self)))
+            yield rows, self.dense(rows)
+
+
+# === Кластеризация ===
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def _init_centers(vectors: HashedVectors, k: int, rng: np.random.Generator) -> np.ndarray:
+    """k-means++ на подвыборке"""
+    sample = vectors.dense(rng.choice(len(vectors), size=min(len(vectors), 20 * k), replace=False))
+    centers = [sample[rng.integers(len(sample))]]
+    for _ in range(1, k):
+        distance = 1.0 - np.max(sample @ np.stack(centers).T, axis=1)
+        distance = np.maximum(distance, 0)
+        total = distance.sum()
+        probs = distance / total if total > 0 else None
+        centers.append(sample[rng.choice(len(sample), p=probs)])
+    return np.stack(centers)
+
+
+def minibatch_kmeans(vectors: HashedVectors, k: int, iterations: int = ITERATIONS,
+                     batch_size: int = BATCH_SIZE, seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Сферический mini-batch k-means (Sculley, 2010): центр сдвигается к точкам пачки
+    с шагом 1/(число точек, уже отнесенных к центру).
+    Возвращает (центроиды (k, D), метки (N,), косинус каждого отзыва к его центроиду (N,))
+    """
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    k = min(k, n)
+    centers = _init_centers(vectors, k, rng)
+    counts = np.zeros(k)
+    for _ in range(iterations):
+        batch = vectors.dense(rng.choice(n, size=min(batch_size, n), replace=False))
+        labels = np.argmax(batch @ centers.T, axis=1)
+        for c in np.unique(labels):
+            members = batch[labels == c]
+            counts[c] += len(members)
+            rate = len(members) / counts[c]
+            centers[c] = (1 - rate) * centers[c] + rate * members.mean(axis=0)
+        centers = _normalize(centers)
+
+    labels = np.empty(n, dtype=np.int64)
+    similarity = np.empty(n, dtype=np.float32)
+    for rows, block in vectors.blocks():
+        sims = block @ centers.T
+        labels[rows] = np.argmax(sims, axis=1)
+        similarity[rows] = sims[np.arange(len(rows)), labels[rows]]
+    return centers, labels, similarity
+
+
+def top_terms(texts: List[str], labels: np.ndarray, k: int, n: int = TOP_TERMS) -> List[List[str]]:
+    """
+    Характерные слова кластера: частота основы в кластере относительно всех отзывов
+    (основа считается один раз на отзыв; показывается самая частая форма слова)
+    """
+    overall: Counter = Counter()
+    per_cluster = [Counter() for _ in range(k)]
+    forms: Dict[str, Counter] = {}
+    for text, label in zip(texts, labels):
+        seen = set()
+        for word in _WORD_RE.findall(text.lower()):
+            if len(word) < 3:
+                continue
+            s = stem(word)
+            forms.setdefault(s, Counter())[word] += 1
+            seen.add(s)
+        overall.update(seen)
+        per_cluster[label].update(seen)
+
+    total = len(texts)
+    result = []
+    for c in range(k):
+        size = max(int((labels == c).sum()), 1)
+        scored = [(count * math.log((count / size) / (overall[s] / total)), s)
+                  for s, count in per_cluster[c].items() if count >= 2]
+        scored.sort(reverse=True)
+        result.append([forms[s].most_common(1)[0][0] for score, s in scored[:n] if score > 0])
+    return result
+
+
+def cluster_reviews(texts: List[str], k: int = DEFAULT_K, seed: int = 0) -> List[Dict[str, Any]]:
+    """Кластеры отзывов: размер, измеренная доля, характерные слова, отзывы у центроида"""
+    if not texts:
+        return []
+    vectors = HashedVectors(texts)
+    _, labels, similarity = minibatch_kmeans(vectors, k, seed=seed)
+    k = int(labels.max()) + 1
+    terms = top_terms(texts, labels, k)
+
+    clusters = []
+    for c in range(k):
+        members = np.flatnonzero(labels == c)
+        if not len(members):
+            continue
+        closest = members[np.argsort(-similarity[members])[:EXEMPLARS]]
+        clusters.append({
+            "cluster": len(clusters),
+            "size": int(len(members)),
+            "share_pct": round(100.0 * len(members) / len(texts), 1),
+            "cohesion": round(float(similarity[members].mean()), 3),
+            "top_terms": terms[c],
+            "exemplars": [texts[i][:EXEMPLAR_CHARS] for i in closest],
+        })
+    clusters.sort(key=lambda item: -item["size"])
+    for i, cluster in enumerate(clusters):
+        cluster["cluster"] = i
+    return clusters
+
+
+# === Названия сегментов (LLM) ===
+
+def naming_prompt(product: Dict[str, Any], clusters: List[Dict[str, Any]]) -> str:
+    lines = [f"Товар: {product.get('name', 'Unknown')}", f"Всего отзывов: {sum(c['size'] for c in clusters)}", ""]
+    for c in clusters:
+        lines.append(f"Кластер {c['cluster']}: {c['share_pct']}% отзывов")
+        lines.append(f"  Характерные слова: {', '.join(c['top_terms']) or '-'}")
+        lines.extend(f"  - {text}" for text in c["exemplars"])
+    return "\n".join(lines)
+
+
+def name_clusters(client, model: str, product: Dict[str, Any], clusters: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Названия и описания сегментов от модели + измеренные доли -> audience_segments
+    (формат AUDIENCE_SCHEMA)
+    """
+    # groq нужен только для этого шага — кластеризация работает и без него (--no-llm)
+    from audience_analysis_groq import call_model_and_parse
+
+    res = call_model_and_parse(client, model, NAMING_SYSTEM_PROMPT, naming_prompt(product, clusters),
+                               fmt=("cluster_naming", CLUSTER_NAMING_SCHEMA, validate_cluster_naming))
+    if res.get("validation_errors"):
+        return {"error": "; ".join(res["validation_errors"][:3])}
+    named = {item["cluster"]: item for item in res["parsed"]["clusters"]}
+    segments = []
+    for c in clusters:
+        item = named.get(c["cluster"], {})
+        segments.append({
+            "name": item.get("name") or f"Кластер {c['cluster']}",
+            "share_pct_est": c["share_pct"],
+            "needs": item.get("needs", ""),
+            "pain_points": item.get("pain_points", ""),
+            "recommended_message": item.get("recommended_message", ""),
+        })
+    return {"audience_segments": segments}
+
+
+# === Загрузка ===
+
+def load_texts_by_product(path: str) -> Dict[str, List[str]]:
+    """Тексты отзывов по товарам: reviews.json (потоково) или каталог review_corpus"""
+    if os.path.isdir(path):
+        with ReviewCorpus(path) as corpus:
+            return {product: list(corpus.iter_texts(corpus.product_rows(product))) for product in corpus.products}
+    grouped: Dict[str, List[str]] = {}
+    for review in iter_json_array(path):
+        text = review_text(review)
+        if text:
+            grouped.setdefault(review.get("product_id") or "unknown", []).append(text)
+    return grouped
+
+
+def load_products(path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    products = data if isinstance(data, list) else [data]
+    return {p.get("product_id") or p.get("id"): p for p in products if isinstance(p, dict)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Кластеризация отзывов и измеренные доли сегментов")
+    parser.add_argument("--reviews", default="reviews.json", help="reviews.json или каталог корпуса (review_corpus.py)")
+    parser.add_argument("--product", default="product.json", help="товары — названия для промпта")
+    parser.add_argument("--out", default="review_clusters.json")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="число кластеров на товар")
+    parser.add_argument("--model", default="qwen/qwen3-32b", help="модель для названий сегментов")
+    parser.add_argument("--no-llm", action="store_true", help="только кластеры, без названий от модели")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.reviews):
+        print(f"[error] Не найден {args.reviews}")
+        return
+
+    texts_by_product = load_texts_by_product(args.reviews)
+    products = load_products(args.product)
+    client = None
+    if not args.no_llm:
+        from audience_analysis_groq import get_client
+        client = get_client()
+
+    output = []
+    for product_id, texts in texts_by_product.items():
+        product = products.get(product_id) or {"name": product_id}
+        started = time.perf_counter()
+        clusters = cluster_reviews(texts, args.k, args.seed)
+        print(f"[info] {product_id}: {len(texts)} отзывов -> {len(clusters)} кластеров "
+              f"за {time.perf_counter() - started:.2f}s")
+        for c in clusters:
+            print(f"    {c['cluster']}: {c['share_pct']:5.1f}%  {', '.join(c['top_terms'][:5])}")
+
+        item = {"product_id": product_id, "product_name": product.get("name"), "reviews": len(texts),
+                "clusters": clusters}
+        if client is not None and clusters:
+            try:
+                item.update(name_clusters(client, args.model, product, clusters))
+            except Exception as e:
+                print(f"[error] Ошибка вызова модели {args.model}: {e}")
+                item["error"] = str(e)
+        output.append(item)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"[ok] Сохранено в {args.out}")
+
+
+if __name__ == "__main__":
+    main()
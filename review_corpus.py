@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+review_corpus.py
+
+Бинарный корпус отзывов с доступом через mmap — вместо json.load всего reviews.json.
+
+Каталог корпуса (reviews.corpus/):
+    texts.bin    — тексты отзывов в UTF-8 подряд
+    ids.bin      — id отзывов в UTF-8 подряд
+    index.bin    — по записи фиксированного размера на отзыв (RECORD): смещения и длины
+                   текста и id, код товара, рейтинг, дата. Записи отсортированы по товару,
+                   так что отзывы товара — непрерывный диапазон строк
+    idhash.bin   — хэш-таблица с открытой адресацией: хэш id -> номер строки
+    meta.json    — версия формата и диапазоны строк по товарам
+
+Поиск по id и по товару — O(1) без чтения корпуса; выборка и фильтрация
+(товар, рейтинг, дата) просматривают только index.bin, тексты читаются лишь
+для отобранных строк.
+
+    corpus = ReviewCorpus("reviews.corpus")
+    corpus.by_id("wb_3f2a…")                 # -> {"id", "product_id", "text", "rating", "date"}
+    corpus.sample("wb_396501168", 5)         # 5 случайных текстов товара
+    rows = corpus.filter(max_rating=2)       # номера строк, только по индексу
+
+Запуск:
+    python review_corpus.py build reviews.json --out reviews.corpus
+    python review_corpus.py info reviews.corpus
+    python review_corpus.py sample reviews.corpus --product wb_396501168 -n 5
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import random
+import shutil
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from criteria_store import iter_json_array
+from review_state import review_text
+
+FORMAT_VERSION = 1
+
+# text_offset, id_offset, text_len, id_len, product, date (YYYYMMDD, 0 — нет), rating (-1 — нет)
+RECORD = struct.Struct("<QQIIIib")
+# хэш id (0 — пустой слот), номер строки
+SLOT = struct.Struct("<QI")
+
+NO_RATING = -1
+
+
+def id_hash(review_id: str) -> int:
+    """64-битный хэш id (0 зарезервирован под пустой слот)"""
+    value = int.from_bytes(hashlib.blake2b(review_id.encode("utf-8"), digest_size=8).digest(), "little")
+    return value or 1
+
+
+def _date_key(date: Optional[str]) -> int:
+    """'2024-05-17T10:00:00' -> 20240517; нет даты — 0"""
+    digits = (date or "")[:10].replace("-", "")
+    return int(digits) if len(digits) == 8 and digits.isdigit() else 0
+
+
+def _rating(value: Any) -> int:
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and 0 <= value <= 5:
+        return int(round(value))
+    return NO_RATING
+
+
+def build_corpus(reviews: Iterable[Dict[str, Any]], path: str) -> Dict[str, Any]:
+    """
+    Сборка корпуса из отзывов (формат reviews.json). Тексты пишутся потоково,
+    в памяти держатся только записи индекса. Каталог собирается рядом и подменяет старый.
+    Возвращает meta
+    """
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    products: Dict[str, int] = {}
+    records = []
+    text_offset = id_offset = 0
+    with open(os.path.join(tmp_path, "texts.bin"), "wb") as texts, \
+            open(os.path.join(tmp_path, "ids.bin"), "wb") as ids:
+        for review in reviews:
+            review_id = str(review.get("id") or "")
+            text = review_text(review).encode("utf-8")
+            rid = review_id.encode("utf-8")
+            product = products.setdefault(review.get("product_id") or "unknown", len(products))
+            texts.write(text)
+            ids.write(rid)
+            records.append((product, text_offset, id_offset, len(text), len(rid),
+                            _date_key(review.get("date")), _rating(review.get("rating")), review_id))
+            text_offset += len(text)
+            id_offset += len(rid)
+
+    # Строки индекса группируются по товару (порядок отзывов внутри товара сохраняется)
+    records.sort(key=lambda r: r[0])
+    names = {code: name for name, code in products.items()}
+    ranges: Dict[str, List[int]] = {}
+    with open(os.path.join(tmp_path, "index.bin"), "wb") as index:
+        for row, (product, t_off, i_off, t_len, i_len, date, rating, _) in enumerate(records):
+            index.write(RECORD.pack(t_off, i_off, t_len, i_len, product, date, rating))
+            start_end = ranges.setdefault(names[product], [row, row])
+            start_end[1] = row + 1
+
+    # Хэш-таблица id -> строка: заполненность не больше 50%, линейное пробирование
+    capacity = 1
+    while capacity < 2 * max(len(records), 1):
+        capacity *= 2
+    table = bytearray(SLOT.size * capacity)
+    mask = capacity - 1
+    for row, record in enumerate(records):
+        h = id_hash(record[-1])
+        slot = h & mask
+        while SLOT.unpack_from(table, slot * SLOT.size)[0]:
+            slot = (slot + 1) & mask
+        SLOT.pack_into(table, slot * SLOT.size, h, row)
+    with open(os.path.join(tmp_path, "idhash.bin"), "wb") as f:
+        f.write(table)
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "reviews": len(records),
+        "capacity": capacity,
+        "products": [{"product_id": name, "start": start, "end": end} for name, (start, end) in ranges.items()],
+    }
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return meta
+
+
+def _map(path: str):
+    """mmap файла только для чтения (пустой файл mmap не поддерживает)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ReviewCorpus:
+    """Корпус отзывов, открытый через mmap. Файлы не читаются целиком"""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"{path}: неподдерживаемая версия корпуса {self.meta.get('version')}")
+        self.path = path
+        self._texts = _map(os.path.join(path, "texts.bin"))
+        self._ids = _map(os.path.join(path, "ids.bin"))
+        self._index = _map(os.path.join(path, "index.bin"))
+        self._hash = _map(os.path.join(path, "idhash.bin"))
+        self._mask = self.meta["capacity"] - 1
+        self.products = [p["product_id"] for p in self.meta["products"]]
+        self._ranges = {p["product_id"]: range(p["start"], p["end"]) for p in self.meta["products"]}
+
+    def __len__(self) -> int:
+        return self.meta["reviews"]
+
+    def close(self):
+        for m in (self._texts, self._ids, self._index, self._hash):
+            if isinstance(m, mmap.mmap):
+                m.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # === Доступ к строкам ===
+
+    def record(self, row: int):
+        return RECORD.unpack_from(self._index, row * RECORD.size)
+
+    def review_id(self, row: int) -> str:
+        _, i_off, _, i_len, _, _, _ = self.record(row)
+        return self._ids[i_off:i_off + i_len].decode("utf-8")
+
+    def text(self, row: int) -> str:
+        t_off, _, t_len, _, _, _, _ = self.record(row)
+        return self._texts[t_off:t_off + t_len].decode("utf-8")
+
+    def get(self, row: int) -> Dict[str, Any]:
+        t_off, i_off, t_len, i_len, product, date, rating = self.record(row)
+        return {
+            "id": self._ids[i_off:i_off + i_len].decode("utf-8"),
+            "product_id": self.products[product],
+            "text": self._texts[t_off:t_off + t_len].decode("utf-8"),
+            "rating": None if rating == NO_RATING else rating,
+            "date": f"{date // 10000:04d}-{date // 100 % 100:02d}-{date % 100:02d}" if date else None,
+        }
+
+    def row_of(self, review_id: str) -> Optional[int]:
+        """Номер строки по id: пробирование хэш-таблицы, O(1) в среднем"""
+        h = id_hash(review_id)
+        slot = h & self._mask
+        while True:
+            stored, row = SLOT.unpack_from(self._hash, slot * SLOT.size)
+            if not stored:
+                return None
+            if stored == h and self.review_id(row) == review_id:
+                return row
+            slot = (slot + 1) & self._mask
+
+    def by_id(self, review_id: str) -> Optional[Dict[str, Any]]:
+        row = self.row_of(review_id)
+        return None if row is None else self.get(row)
+
+    def product_rows(self, product_id: str) -> range:
+        """Диапазон строк товара (пустой, если товара нет)"""
+        return self._ranges.get(product_id, range(0))
+
+    # === Выборка и фильтрация по индексу ===
+
+    def filter(self, product_id: Optional[str] = None, min_rating: Optional[int] = None,
+               max_rating: Optional[int] = None, since: Optional[str] = None,
+               until: Optional[str] = None) -> List[int]:
+        """Номера строк, подходящих под условия. Читается только index.bin"""
+        rows = self.product_rows(product_id) if product_id else range(len(self))
+        since_key, until_key = _date_key(since), _date_key(until)
+        if min_rating is None and max_rating is None and not since_key and not until_key:
+            return list(rows)
+
+        result = []
+        for row in rows:
+            _, _, _, _, _, date, rating = RECORD.unpack_from(self._index, row * RECORD.size)
+            if min_rating is not None and (rating == NO_RATING or rating < min_rating):
+                continue
+            if max_rating is not None and (rating == NO_RATING or rating > max_rating):
+                continue
+            if since_key and (not date or date < since_key):
+                continue
+            if until_key and (not date or date > until_key):
+                continue
+            result.append(row)
+        return result
+
+    def sample(self, product_id: Optional[str] = None, n: int = 5, seed: Optional[int] = 0,
+               **filters) -> List[str]:
+        """n случайных текстов (детерминированно при заданном seed)"""
+        rows = self.filter(product_id, **filters) if filters else self.product_rows(product_id) \
+            if product_id else range(len(self))
+        picked = random.Random(seed).sample(rows, min(n, len(rows)))
+        return [self.text(row) for row in sorted(picked)]
+
+    def iter_texts(self, rows: Iterable[int]) -> Iterator[str]:
+        for row in rows:
+            yield self.text(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бинарный корпус отзывов (mmap)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="собрать корпус из reviews.json")
+    p_build.add_argument("reviews", nargs="?", default="reviews.json")
+    p_build.add_argument("--out", default="reviews.corpus")
+
+    p_info = sub.add_parser("info", help="сводка по корпусу")
+    p_info.add_argument("corpus", nargs="?", default="reviews.corpus")
+
+    p_get = sub.add_parser("get", help="отзыв по id")
+    p_get.add_argument("corpus")
+    p_get.add_argument("review_id")
+
+    p_sample = sub.add_parser("sample", help="случайные отзывы")
+    p_sample.add_argument("corpus", nargs="?", default="reviews.corpus")
+    p_sample.add_argument("--product")
+    p_sample.add_argument("-n", type=int, default=5)
+    p_sample.add_argument("--max-rating", type=int)
+    p_sample.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        meta = build_corpus(iter_json_array(args.reviews), args.out)
+        print(f"✅ Корпус {args.out}: отзывов {meta['reviews']}, товаров {len(meta['products'])}")
+        return
+
+    with ReviewCorpus(args.corpus) as corpus:
+        if args.command == "info":
+            print(f"📚 {args.corpus}: отзывов {len(corpus)}")
+            for product in corpus.products:
+                print(f"  {product}: {len(corpus.product_rows(product))}")
+        elif args.command == "get":
+            review = corpus.by_id(args.review_id)
+            print(json.dumps(review, ensure_ascii=False, indent=2) if review else f"⚠️  {args.review_id} не найден")
+        elif args.command == "sample":
+            filters = {"max_rating": args.max_rating} if args.max_rating is not None else {}
+            for text in corpus.sample(args.product, args.n, args.seed, **filters):
+                print(f"- {text}")
+
+
+if __name__ == "__main__":
+    main()
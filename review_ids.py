@@ -0,0 +1,80 @@
+"""
+review_ids.py
+
+Детерминированные идентификаторы товаров и отзывов.
+Встроенный hash() в Python солится на каждый процесс, поэтому id на его основе
+меняются от запуска к запуску. Здесь id строятся из артикула (SKU) товара
+и из содержимого отзыва — одинаковые данные всегда дают одинаковый id.
+
+    product_id_from_url("https://www.wildberries.ru/catalog/396501168/detail.aspx")  -> "wb_396501168"
+    review_id("wb_396501168", "Отличный шуруповерт")                                  -> "wb_3f2a…"
+"""
+
+import hashlib
+import re
+from typing import Optional
+from urllib.parse import urlparse, urlunparse
+
+# Артикул в URL карточки: маркетплейс -> (признак домена, регулярка)
+SKU_PATTERNS = {
+    "wb": (("wildberries", "wb.ru"), re.compile(r"/catalog/(\d+)/")),
+    "ozon": (("ozon",), re.compile(r"/product/[^/?#]*?-?(\d+)/?(?:[?#]|$)")),
+}
+
+HASH_LEN = 16
+
+
+def stable_hash(text: str, length: int = HASH_LEN) -> str:
+    """Короткий sha1-хэш строки, одинаковый в любом процессе"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:length]
+
+
+def normalize_text(text: str) -> str:
+    """Нормализация текста перед хэшированием: регистр и пробелы не влияют на id"""
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+
+def normalize_url(url: str) -> str:
+    """URL без query/fragment и завершающего слэша — для товаров без артикула"""
+    parsed = urlparse(url.strip())
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path, "", "", ""))
+
+
+def marketplace_of(url: str) -> Optional[str]:
+    """Ключ маркетплейса ('wb', 'ozon') по URL или None"""
+    netloc = urlparse(url).netloc.lower()
+    for key, (domains, _) in SKU_PATTERNS.items():
+        if any(domain in netloc for domain in domains):
+            return key
+    return None
+
+
+def sku_from_url(url: str) -> Optional[str]:
+    """Артикул товара из URL карточки WB / Ozon"""
+    key = marketplace_of(url)
+    if not key:
+        return None
+    match = SKU_PATTERNS[key][1].search(url)
+    return match.group(1) if match else None
+
+
+def product_id_from_url(url: str) -> str:
+    """
+    id товара: "<маркетплейс>_<артикул>" для WB / Ozon,
+    для прочих сайтов — "<домен>_<хэш нормализованного URL>"
+    """
+    key = marketplace_of(url)
+    sku = sku_from_url(url)
+    if key and sku:
+        return f"{key}_{sku}"
+    return f"{urlparse(url).netloc.lower()}_{stable_hash(normalize_url(url), 12)}"
+
+
+def review_id(product_id: str, text: str, prefix: Optional[str] = None) -> str:
+    """
+    id отзыва по содержимому: хэш от товара и нормализованного текста.
+    prefix по умолчанию — маркетплейс из product_id ("wb_123" -> "wb")
+    """
+    prefix = prefix or product_id.split("_", 1)[0]
+    return f"{prefix}_{stable_hash(product_id + '|' + normalize_text(text))}"
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+review_search.py
+
+Полнотекстовый поиск по отзывам: инвертированный индекс SQLite FTS5 поверх
+основ слов (стемминг Snowball для русского) + фильтры по оценкам критериев,
+тональности, рейтингу и товару.
+
+    python review_search.py index --reviews reviews.json --results results.json
+    python review_search.py search "аккумулятор" --max-rating 2
+    python review_search.py search '"быстро садится" OR (батарея NOT зарядка)' --score "Контекст<=2"
+    python review_search.py search "доставка" --sentiment отрицательный --product wb_396501168 --json
+
+Язык запросов: слова (ищутся по основе: "аккумулятора" найдет "аккумулятор"),
+"фразы в кавычках", AND / OR / NOT (или И / ИЛИ / НЕ), -слово вместо NOT слово,
+скобки, слово* — поиск по началу основы. Соседние слова объединяются через AND.
+
+Индекс обновляется инкрементально: отзыв переиндексируется, только если изменился
+его текст; оценки из results.json заменяются по (review_id, model). Отзывы и оценки,
+которых нет во входных файлах, из индекса удаляются.
+Для промптов — quotes(): подходящие предложения из найденных отзывов.
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from criteria_store import iter_json_array
+from review_ids import normalize_text, stable_hash
+from review_state import review_key, review_text
+from schemas import CRITERIA_COLUMNS, CRITERIA_NAMES, SENTIMENTS, validate_criteria
+
+DEFAULT_DB = "reviews_search.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    review_id TEXT NOT NULL UNIQUE,
+    product_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    rating INTEGER,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS reviews_product ON reviews(product_id);
+
+-- Индекс без копии текста (content=''): в нем только основы слов и их позиции
+CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(stems, content='', tokenize='unicode61');
+
+CREATE TABLE IF NOT EXISTS scores (
+    review_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    {criteria},
+    PRIMARY KEY (review_id, model)
+);
+""".format(criteria=",\n    ".join(f"{name} INTEGER" for name in CRITERIA_COLUMNS))
+
+
+# === Стемминг (Snowball, русский) ===
+
+_VOWELS = set("аеиоуыэюя")
+
+_PERFECTIVE_GERUND = (("в", "вши", "вшись"), ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+_REFLEXIVE = ("ся", "сь")
+_ADJECTIVE = ("ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+              "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею")
+_PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+_VERB = (("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"),
+         ("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+          "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"))
+_NOUN = ("а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий", "й",
+         "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я")
+_SUPERLATIVE = ("ейше", "ейш")
+_DERIVATIONAL = ("ость", "ост")
+
+
+def _endings(groups) -> List[Tuple[str, bool]]:
+    """(окончание, нужна ли перед ним а/я), длинные первыми: among в Snowball берет самое длинное"""
+    if isinstance(groups[0], str):
+        groups = ((), groups)
+    pairs = [(e, True) for e in groups[0]] + [(e, False) for e in groups[1]]
+    return sorted(pairs, key=lambda p: -len(p[0]))
+
+
+_PERFECTIVE_GERUND_E = _endings(_PERFECTIVE_GERUND)
+_REFLEXIVE_E = _endings(_REFLEXIVE)
+_ADJECTIVE_E = _endings(_ADJECTIVE)
+_PARTICIPLE_E = _endings(_PARTICIPLE)
+_VERB_E = _endings(_VERB)
+_NOUN_E = _endings(_NOUN)
+_SUPERLATIVE_E = _endings(_SUPERLATIVE)
+_DERIVATIONAL_E = _endings(_DERIVATIONAL)
+
+
+def _strip(rv: str, endings: List[Tuple[str, bool]]) -> Optional[str]:
+    """Снять самое длинное подходящее окончание; None — окончание не найдено или не прошло условие"""
+    for ending, after_a in endings:
+        if rv.endswith(ending):
+            stem = rv[:-len(ending)]
+            if after_a and not stem.endswith(("а", "я")):
+                return None
+            return stem
+    return None
+
+
+def _regions(word: str) -> Tuple[int, int]:
+    """Начало RV и R2 в слове"""
+    def after_vc(start: int) -> int:
+        for i in range(start + 1, len(word)):
+            if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+                return i + 1
+        return len(word)
+
+    rv = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+    r1 = after_vc(0)
+    r2 = after_vc(r1) if r1 < len(word) else len(word)
+    return rv, r2
+
+
+@lru_cache(maxsize=200_000)
+def stem(word: str) -> str:
+    """Основа слова (русский Snowball). Латиница и числа не меняются"""
+    word = word.lower().replace("ё", "е")
+    if not re.fullmatch(r"[а-я]+", word):
+        return word
+    rv_start, r2_start = _regions(word)
+    head, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1
+    stripped = _strip(rv, _PERFECTIVE_GERUND_E)
+    if stripped is not None:
+        rv = stripped
+    else:
+        reflexive = _strip(rv, _REFLEXIVE_E)
+        if reflexive is not None:
+            rv = reflexive
+        adjective = _strip(rv, _ADJECTIVE_E)
+        if adjective is not None:
+            participle = _strip(adjective, _PARTICIPLE_E)
+            rv = participle if participle is not None else adjective
+        else:
+            verb = _strip(rv, _VERB_E)
+            if verb is not None:
+                rv = verb
+            else:
+                noun = _strip(rv, _NOUN_E)
+                if noun is not None:
+                    rv = noun
+
+    # Шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательное окончание только в R2
+    r2 = max(r2_start - rv_start, 0)
+    derivational = _strip(rv, _DERIVATIONAL_E)
+    if derivational is not None and len(derivational) >= r2:
+        rv = derivational
+
+    # Шаг 4
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        superlative = _strip(rv, _SUPERLATIVE_E)
+        if superlative is not None:
+            rv = superlative[:-1] if superlative.endswith("нн") else superlative
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+    return head + rv
+
+
+_WORD_RE = re.compile(r"[0-9a-zа-яё]+", re.IGNORECASE)
+
+
+def stems(text: str) -> List[str]:
+    return [stem(w) for w in _WORD_RE.findall(text or "")]
+
+
+# === Индексация ===
+
+def connect(db_path: str = DEFAULT_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _rating(value: Any) -> Optional[int]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(round(value))
+    return None
+
+
+def index_reviews(conn: sqlite3.Connection, reviews: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Синхронизировать индекс с reviews: добавить/обновить отзывы, удалить отсутствующие
+    (вместе с их оценками). Неизмененные (тот же хэш текста) пропускаются без стемминга.
+    Возвращает счетчики added / updated / unchanged / removed
+    """
+    counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+    seen = set()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for review in reviews:
+            text = review_text(review)
+            if not text:
+                continue
+            # тот же ключ, что review_id в results.json; без id — id по содержимому
+            key = str(review.get("id") or review_key(review))
+            seen.add(key)
+            content_hash = stable_hash(normalize_text(text))
+            values = (review.get("product_id") or "unknown", text, content_hash,
+                      _rating(review.get("rating")), review.get("date"))
+
+            old = conn.execute("SELECT id, text, content_hash FROM reviews WHERE review_id = ?", (key,)).fetchone()
+            if old is None:
+                cur = conn.execute(
+                    "INSERT INTO reviews(review_id, product_id, text, content_hash, rating, date) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (key,) + values)
+                rowid = cur.lastrowid
+                counts["added"] += 1
+            elif old[2] == content_hash:
+                counts["unchanged"] += 1
+                continue
+            else:
+                rowid = old[0]
+                # contentless FTS5: для удаления нужно передать ровно то, что индексировалось
+                conn.execute("INSERT INTO reviews_fts(reviews_fts, rowid, stems) VALUES ('delete', ?, ?)",
+                             (rowid, " ".join(stems(old[1]))))
+                conn.execute("UPDATE reviews SET product_id = ?, text = ?, content_hash = ?, rating = ?, date = ? "
+                             "WHERE id = ?", values + (rowid,))
+                counts["updated"] += 1
+            conn.execute("INSERT INTO reviews_fts(rowid, stems) VALUES (?, ?)", (rowid, " ".join(stems(text))))
+
+        # Отзывы, которых больше нет во входных данных
+        removed = [(rowid, key) for rowid, key in conn.execute("SELECT id, review_id FROM reviews")
+                   if key not in seen]
+        for rowid, key in removed:
+            (old_text,) = conn.execute("SELECT text FROM reviews WHERE id = ?", (rowid,)).fetchone()
+            conn.execute("INSERT INTO reviews_fts(reviews_fts, rowid, stems) VALUES ('delete', ?, ?)",
+                         (rowid, " ".join(stems(old_text))))
+            conn.execute("DELETE FROM reviews WHERE id = ?", (rowid,))
+            conn.execute("DELETE FROM scores WHERE review_id = ?", (key,))
+        counts["removed"] = len(removed)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return counts
+
+
+def index_results(conn: sqlite3.Connection, rows: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Оценки из results.json (по строке на отзыв и модель). Невалидные ответы пропускаются;
+    оценки, которых нет среди валидных строк rows, удаляются
+    """
+    placeholders = ", ".join("?" * (3 + len(CRITERIA_COLUMNS)))
+    sql = (f"INSERT OR REPLACE INTO scores(review_id, model, sentiment, {', '.join(CRITERIA_COLUMNS)}) "
+           f"VALUES ({placeholders})")
+    counts = {"scores": 0, "invalid": 0, "removed": 0}
+    seen = set()
+
+    def records():
+        for row in rows:
+            result = row.get("result")
+            if row.get("validation_errors") or validate_criteria(result):
+                counts["invalid"] += 1
+                continue
+            by_name = {c["критерий"]: c["оценка"] for c in result["критерии"]}
+            counts["scores"] += 1
+            seen.add((row.get("review_id"), row.get("model") or ""))
+            yield (row.get("review_id"), row.get("model") or "", result["тональность"],
+                   *(by_name.get(name) for name in CRITERIA_NAMES))
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(sql, records())
+        stale = [key for key in conn.execute("SELECT review_id, model FROM scores") if key not in seen]
+        conn.executemany("DELETE FROM scores WHERE review_id = ? AND model = ?", stale)
+        counts["removed"] = len(stale)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return counts
+
+
+# === Запросы ===
+
+_QUERY_TOKEN_RE = re.compile(r'"[^"]*"|\(|\)|-?[^\s()"]+')
+_OPERATORS = {"AND": "AND", "И": "AND", "OR": "OR", "ИЛИ": "OR", "NOT": "NOT", "НЕ": "NOT"}
+
+
+def _phrase(words: List[str], prefix: bool = False) -> Optional[str]:
+    if not words:
+        return None
+    return '"' + " ".join(words) + '"' + ("*" if prefix else "")
+
+
+def to_fts_query(query: str) -> Tuple[str, List[str]]:
+    """
+    Запрос пользователя -> выражение FTS5 над основами слов.
+    Возвращает (выражение, основы для подсветки цитат). ValueError — некорректный запрос
+    """
+    parts: List[str] = []
+    terms: List[str] = []
+    depth = 0
+    for token in _QUERY_TOKEN_RE.findall(query):
+        operator = _OPERATORS.get(token.upper())
+        if operator:
+            if not parts or parts[-1] in ("AND", "OR", "NOT", "("):
+                raise ValueError(f"оператор {token} без левого операнда")
+            parts.append(operator)
+            continue
+        if token == "(":
+            if parts and parts[-1] not in ("AND", "OR", "NOT", "("):
+                parts.append("AND")
+            parts.append("(")
+            depth += 1
+            continue
+        if token == ")":
+            depth -= 1
+            if depth < 0 or not parts or parts[-1] in ("AND", "OR", "NOT", "("):
+                raise ValueError("непарная или пустая скобка")
+            parts.append(")")
+            continue
+
+        negate = token.startswith("-") and len(token) > 1
+        prefix = token.endswith("*")
+        words = stems(token.strip('"-*') if token.startswith('"') else token.lstrip("-").rstrip("*"))
+        expr = _phrase(words, prefix and not token.startswith('"'))
+        if expr is None:
+            continue
+        terms.extend(words)
+        if parts and parts[-1] not in ("AND", "OR", "NOT", "("):
+            parts.append("NOT" if negate else "AND")
+        elif negate:
+            if not parts or parts[-1] == "(":
+                raise ValueError("NOT не может стоять в начале запроса или скобки")
+            parts.append("NOT")
+        parts.append(expr)
+
+    if depth:
+        raise ValueError("непарная скобка")
+    if parts and parts[-1] in ("AND", "OR", "NOT"):
+        raise ValueError("оператор в конце запроса")
+    return " ".join(parts), terms
+
+
+_SCORE_FILTER_RE = re.compile(r"^\s*(.+?)\s*(<=|>=|=|<|>)\s*([1-5])\s*$")
+
+
+def parse_score_filter(text: str) -> Tuple[str, str, int]:
+    """
+    'Контекст<=2' / 'context<=2' / 'Опыт<=2' -> (колонка, оператор, значение).
+    Критерий — точное имя колонки или критерия либо однозначное начало имени критерия
+    """
+    match = _SCORE_FILTER_RE.match(text)
+    if not match:
+        raise ValueError(f"фильтр оценки {text!r}: ожидалось <критерий><оператор><1-5>")
+    name, op, value = match.groups()
+    lowered = name.lower()
+    pairs = list(zip(CRITERIA_COLUMNS, CRITERIA_NAMES))
+    found = [column for column, criterion in pairs if lowered in (column, criterion.lower())] \
+        or [column for column, criterion in pairs if criterion.lower().startswith(lowered)]
+    if not found:
+        raise ValueError(f"неизвестный критерий {name!r}")
+    if len(found) > 1:
+        names = ", ".join(CRITERIA_NAMES[CRITERIA_COLUMNS.index(c)] for c in found)
+        raise ValueError(f"критерий {name!r} неоднозначен: {names}")
+    return found[0], op, int(value)
+
+
+@dataclass
+class Hit:
+    review_id: str
+    product_id: str
+    text: str
+    rating: Optional[int]
+    quote: str
+    rank: float
+
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def make_quote(text: str, terms: Iterable[str], max_len: int = 240) -> str:
+    """Предложение отзыва, в котором больше всего слов запроса"""
+    wanted = set(terms)
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()] or [text]
+    best = max(sentences, key=lambda s: len(wanted & set(stems(s)))) if wanted else sentences[0]
+    return best if len(best) <= max_len else best[:max_len - 1].rstrip() + "…"
+
+
+def search(conn: sqlite3.Connection, query: str = "", product_id: Optional[str] = None,
+           min_rating: Optional[int] = None, max_rating: Optional[int] = None,
+           sentiment: Optional[str] = None, scores: Iterable[str] = (), model: Optional[str] = None,
+           limit: int = 20) -> List[Hit]:
+    """
+    Поиск: текстовый запрос + фильтры. Условия на оценки и тональность должны
+    выполняться в одной строке results.json (одна модель; model — какая именно)
+    """
+    fts_query, terms = to_fts_query(query) if query.strip() else ("", [])
+    where: List[str] = []
+    params: List[Any] = []
+
+    if fts_query:
+        sql = ("SELECT r.review_id, r.product_id, r.text, r.rating, bm25(reviews_fts) AS rank "
+               "FROM reviews_fts JOIN reviews r ON r.id = reviews_fts.rowid")
+        where.append("reviews_fts MATCH ?")
+        params.append(fts_query)
+    else:
+        sql = "SELECT r.review_id, r.product_id, r.text, r.rating, 0.0 AS rank FROM reviews r"
+
+    if product_id:
+        where.append("r.product_id = ?")
+        params.append(product_id)
+    if min_rating is not None:
+        where.append("r.rating >= ?")
+        params.append(min_rating)
+    if max_rating is not None:
+        where.append("r.rating <= ?")
+        params.append(max_rating)
+
+    score_where: List[str] = []
+    for text in scores:
+        column, op, value = parse_score_filter(text)
+        score_where.append(f"s.{column} {op} ?")
+        params.append(value)
+    if sentiment:
+        if sentiment not in SENTIMENTS:
+            raise ValueError(f"тональность {sentiment!r}: ожидалось одно из {', '.join(SENTIMENTS)}")
+        score_where.append("s.sentiment = ?")
+        params.append(sentiment)
+    if model:
+        score_where.append("s.model = ?")
+        params.append(model)
+    if score_where:
+        where.append("EXISTS (SELECT 1 FROM scores s WHERE s.review_id = r.review_id AND "
+                     + " AND ".join(score_where) + ")")
+
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY rank LIMIT ?" if fts_query else " ORDER BY r.id LIMIT ?"
+    params.append(limit)
+
+    return [Hit(review_id=rid, product_id=pid, text=text, rating=rating,
+                quote=make_quote(text, terms), rank=round(rank, 4))
+            for rid, pid, text, rating, rank in conn.execute(sql, params)]
+
+
+def quotes(conn: sqlite3.Connection, query: str, product_id: Optional[str] = None, n: int = 5, **filters) -> List[str]:
+    """Цитаты для промпта: по предложению из n самых релевантных отзывов"""
+    return [hit.quote for hit in search(conn, query, product_id=product_id, limit=n, **filters)]
+
+
+def stats(conn: sqlite3.Connection) -> Dict[str, Any]:
+    reviews, products = conn.execute("SELECT COUNT(*), COUNT(DISTINCT product_id) FROM reviews").fetchone()
+    scored, models = conn.execute("SELECT COUNT(DISTINCT review_id), COUNT(DISTINCT model) FROM scores").fetchone()
+    return {"reviews": reviews, "products": products, "scored_reviews": scored, "models": models}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Полнотекстовый поиск по отзывам (SQLite FTS5)")
+    parser.add_argument("--db", default=DEFAULT_DB, help="файл индекса")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_index = sub.add_parser("index", help="синхронизировать индекс с reviews.json и results.json")
+    p_index.add_argument("--reviews", default="reviews.json")
+    p_index.add_argument("--results", default="results.json", help="оценки по критериям (если есть)")
+
+    p_search = sub.add_parser("search", help="поиск")
+    p_search.add_argument("query", nargs="?", default="", help="текстовый запрос")
+    p_search.add_argument("--product")
+    p_search.add_argument("--min-rating", type=int)
+    p_search.add_argument("--max-rating", type=int)
+    p_search.add_argument("--sentiment", choices=SENTIMENTS)
+    p_search.add_argument("--score", action="append", default=[], help='фильтр оценки, например "Контекст<=2"')
+    p_search.add_argument("--model", help="оценки какой модели учитывать (по умолчанию любой)")
+    p_search.add_argument("--limit", type=int, default=20)
+    p_search.add_argument("--json", action="store_true", help="вывод в JSON")
+
+    sub.add_parser("stats", help="размер индекса")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+
+    if args.command == "index":
+        started = time.perf_counter()
+        if not os.path.exists(args.reviews):
+            print(f"[error] Не найден файл {args.reviews}")
+            return
+        counts = index_reviews(conn, iter_json_array(args.reviews))
+        print(f"[info] Отзывы: новых {counts['added']}, изменено {counts['updated']}, "
+              f"без изменений {counts['unchanged']}, удалено {counts['removed']}")
+        if os.path.exists(args.results):
+            scored = index_results(conn, iter_json_array(args.results))
+            print(f"[info] Оценки: {scored['scores']} (невалидных пропущено: {scored['invalid']}, "
+                  f"удалено устаревших: {scored['removed']})")
+        print(f"[ok] Индекс {args.db} обновлен за {time.perf_counter() - started:.2f}s")
+
+    elif args.command == "search":
+        started = time.perf_counter()
+        try:
+            hits = search(conn, args.query, product_id=args.product, min_rating=args.min_rating,
+                          max_rating=args.max_rating, sentiment=args.sentiment, scores=args.score,
+                          model=args.model, limit=args.limit)
+        except (ValueError, sqlite3.OperationalError) as e:
+            print(f"[error] {e}")
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        if args.json:
+            print(json.dumps([hit.__dict__ for hit in hits], ensure_ascii=False, indent=2))
+            return
+        print(f"🔎 Найдено: {len(hits)} ({elapsed:.1f} мс)")
+        for hit in hits:
+            rating = f"★{hit.rating}" if hit.rating is not None else ""
+            print(f"\n  {hit.review_id} [{hit.product_id}] {rating}")
+            print(f"  «{hit.quote}»")
+
+    elif args.command == "stats":
+        for key, value in stats(conn).items():
+            print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+review_state.py
+
+Отметки уровня (high-water marks) по товарам: какой самый свежий отзыв уже
+скачан и какие отзывы известны. Позволяет при повторном запуске остановить
+листание отзывов на первом известном и дописать в reviews.json только новые.
+
+Состояние хранится в review_state.json:
+    {
+      "<product_id>": {
+        "latest_id": "...",      # id самого свежего известного отзыва
+        "latest_date": "...",    # его дата (ISO), если источник ее отдает
+        "known": ["...", ...],   # ключи последних MAX_KNOWN известных отзывов (старые — первыми)
+        "updated_at": "..."
+      }
+    }
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from review_ids import review_id
+
+STATE_FILE = "review_state.json"
+
+# Сколько ключей известных отзывов хранить на товар. Более старые отсекает отметка
+# уровня по дате, а повторы без даты — merge_reviews по reviews.json
+MAX_KNOWN = 5000
+
+# Позиционные id из старых выгрузок DOM-парсеров (wb_review_3) не привязаны к содержимому отзыва
+_POSITIONAL_ID = re.compile(r"_review_\d+$")
+
+
+def review_text(review: Dict[str, Any]) -> str:
+    """Текст отзыва: скраперы пишут его в "text", готовые выгрузки — в "review" """
+    return review.get("text") or review.get("review") or ""
+
+
+def review_key(review: Dict[str, Any]) -> str:
+    """Ключ отзыва для дедупликации: id, а если его нет (или он позиционный) — id по содержимому"""
+    if review.get("id") and not _POSITIONAL_ID.search(str(review["id"])):
+        return str(review["id"])
+    return review_id(review.get("product_id") or "", review_text(review))
+
+
+class ReviewState:
+    """Отметки уровня по всем товарам"""
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.products: Dict[str, Dict[str, Any]] = {}
+        self._known: Dict[str, set] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                try:
+                    self.products = json.load(f)
+                except json.JSONDecodeError:
+                    self.products = {}
+
+    def known_keys(self, product_id: str) -> set:
+        if product_id not in self._known:
+            self._known[product_id] = set(self.products.get(product_id, {}).get("known", []))
+        return self._known[product_id]
+
+    def is_known(self, product_id: str, review: Dict[str, Any]) -> bool:
+        """
+        Отзыв уже скачивался: его ключ известен или он старше отметки уровня
+        (отзывы с той же датой считаются новыми — повтор отсеется по ключу)
+        """
+        if review_key(review) in self.known_keys(product_id):
+            return True
+        latest_date = self.products.get(product_id, {}).get("latest_date")
+        date = review.get("date")
+        # даты — ISO-строки (review_capture.iso_date); другой тип не сравниваем
+        return isinstance(latest_date, str) and isinstance(date, str) and bool(date) and date < latest_date
+
+    def new_reviews(self, product_id: str, reviews: Iterable[Dict[str, Any]],
+                    newest_first: bool = False) -> List[Dict[str, Any]]:
+        """
+        Новые отзывы из списка. Если источник гарантированно отдает отзывы от свежих
+        к старым (newest_first), листание останавливается на первом известном,
+        иначе известные отзывы просто отфильтровываются
+        """
+        fresh = []
+        for review in reviews:
+            if self.is_known(product_id, review):
+                if newest_first:
+                    break
+                continue
+            fresh.append(review)
+        return fresh
+
+    def advance(self, product_id: str, reviews: Iterable[Dict[str, Any]]):
+        """Сдвиг отметки уровня после сохранения новых отзывов"""
+        reviews = list(reviews)
+        if not reviews:
+            return
+        entry = self.products.setdefault(product_id, {})
+        known = self.known_keys(product_id)
+        order = list(entry.get("known", []))
+        for key in map(review_key, reviews):
+            if key not in known:
+                known.add(key)
+                order.append(key)
+        if len(order) > MAX_KNOWN:
+            known.difference_update(order[:-MAX_KNOWN])
+            order = order[-MAX_KNOWN:]
+
+        dated = [r for r in reviews if isinstance(r.get("date"), str) and r["date"]]
+        newest = max(dated, key=lambda r: r["date"]) if dated else reviews[0]
+        newest_date = newest["date"] if dated else ""
+        if not entry.get("latest_date") or newest_date >= entry["latest_date"]:
+            entry["latest_id"] = review_key(newest)
+            entry["latest_date"] = newest_date or entry.get("latest_date")
+
+        entry["known"] = order
+        entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+
+    def watermark(self, product_id: str) -> Optional[Dict[str, Any]]:
+        entry = self.products.get(product_id)
+        if not entry:
+            return None
+        return {"latest_id": entry.get("latest_id"), "latest_date": entry.get("latest_date")}
+
+    def save(self):
+        """Атомарная запись: временный файл + os.replace"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.products, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def merge_reviews(existing: List[Dict[str, Any]], incoming: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Дописать в existing только отзывы с новыми ключами. Возвращает добавленные"""
+    seen = {(r.get("product_id"), review_key(r)) for r in existing}
+    added = []
+    for review in incoming:
+        key = (review.get("product_id"), review_key(review))
+        if key in seen:
+            continue
+        seen.add(key)
+        existing.append(review)
+        added.append(review)
+    return added
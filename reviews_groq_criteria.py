@@ -1,9 +1,15 @@
 import os
 import json
 import re
-from typing import Dict, Any, List
+import time
+import argparse
+from typing import Dict, Any, List, Optional, Tuple
 
-from groq import Groq
+from groq import BadRequestError, Groq
+
+from review_ids import normalize_text, stable_hash
+from review_state import review_text
+from schemas import CRITERIA_SCHEMA, JSON_OBJECT_FORMAT, response_format, validate_criteria
 
 SYSTEM_PROMPT = """
 Ты — аналитик отзывов с экспертизой в выявлении скрытых паттернов, мотивации пользователя и потенциальных манипуляций.
@@ -124,20 +130,91 @@ MODELS: List[str] = [
 
 THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
 
+# Сколько раз переспрашивать модель, если ответ не прошел схему
+MAX_RETRIES = 2
+
+# Модели, которые отклонили response_format=json_schema: для них json_object, схема только в промпте
+_NO_SCHEMA_MODELS = set()
+
+# === Каскад: дешевая модель оценивает все, сильная — только сомнительные отзывы ===
+CASCADE_CHEAP_MODEL = "llama-3.1-8b-instant"
+CASCADE_STRONG_MODEL = "qwen/qwen3-32b"
+# Флаги: по этим критериям 5 — признаков нет (так отвечают модели, см. results.json),
+# поэтому перепроверяется отзыв с оценкой FLAG_MAX и ниже
+FLAG_CRITERIA = ("Нарушение правил", "Конфликт интересов")
+FLAG_MAX = 2
+# Пограничный ответ: не меньше BORDERLINE_MIN критериев с "средней" оценкой 3
+BORDERLINE_MIN = 4
+
+# Цена, $ за 1M токенов (вход, выход) — для отчета об экономии
+MODEL_PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "qwen/qwen3-32b": (0.29, 0.59),
+}
+
+
+def prompt_version() -> str:
+    """
+    Версия промпта: хэш системного промпта и шаблона user prompt.
+    Любая правка формулировок или критериев меняет версию — и все отзывы переоцениваются.
+    """
+    template = build_user_prompt({}, "")
+    return stable_hash(SYSTEM_PROMPT + "\n" + template, 12)
+
+
+def content_hash(text: str) -> str:
+    """Хэш нормализованного текста отзыва"""
+    return stable_hash(normalize_text(text))
+
+
+def load_previous_results(path: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Прошлые результаты по ключу (review_id, model). Нет файла — пустой словарь"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            rows = json.load(f)
+        except json.JSONDecodeError:
+            return {}
+    return {(row.get("review_id"), row.get("model")): row for row in rows if isinstance(row, dict)}
+
+
+def is_up_to_date(row: Optional[Dict[str, Any]], text_hash: str, version: str) -> bool:
+    """Прошлый результат годится: тот же текст, та же версия промпта, ответ проходит схему"""
+    if not row:
+        return False
+    return (
+        row.get("content_hash") == text_hash
+        and row.get("prompt_version") == version
+        and not validate_criteria(row.get("result"))
+    )
+
 def strip_think_tags(text: str) -> str:
     """
     Удаляет блоки вида <think>...</think> из ответа модели, если они есть.
     """
     return THINK_RE.sub("", text).strip()
 
-def call_model(client: Groq, model: str, product: Dict[str, Any], review_text: str) -> Dict[str, Any]:
+def _record_usage(usage: Optional[Dict[str, Dict[str, float]]], model: str, completion: Any, seconds: float):
+    """Учет вызовов, токенов и времени по моделям (для отчета каскада)"""
+    if usage is None:
+        return
+    stats = usage.setdefault(model, {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0})
+    stats["calls"] += 1
+    stats["seconds"] += seconds
+    tokens = getattr(completion, "usage", None)
+    stats["prompt_tokens"] += getattr(tokens, "prompt_tokens", 0) or 0
+    stats["completion_tokens"] += getattr(tokens, "completion_tokens", 0) or 0
+
+
+def call_model(client: Groq, model: str, product: Dict[str, Any], review_text: str,
+               usage: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Any]:
     """
     Вызов модели Groq: system + user, постобработка без <think>, парсинг JSON.
     Возвращаем dict с результатом или с полем raw_response, если JSON не распарсился.
     """
     user_prompt = build_user_prompt(product, review_text)
-
-    completion = client.chat.completions.create(
+    request = dict(
         model=model,
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
@@ -146,6 +223,21 @@ def call_model(client: Groq, model: str, product: Dict[str, Any], review_text: s
         temperature=0.0,
     )
 
+    started = time.perf_counter()
+    if model in _NO_SCHEMA_MODELS:
+        completion = client.chat.completions.create(**request, response_format=JSON_OBJECT_FORMAT)
+    else:
+        try:
+            completion = client.chat.completions.create(
+                **request, response_format=response_format("review_criteria", CRITERIA_SCHEMA)
+            )
+        except BadRequestError as e:
+            # 400 на json_schema — пробуем json_object; модель запоминаем, только если он прошел
+            print(f"[WARN] {model}: json_schema отклонен ({e}), повтор с json_object")
+            completion = client.chat.completions.create(**request, response_format=JSON_OBJECT_FORMAT)
+            _NO_SCHEMA_MODELS.add(model)
+
+    _record_usage(usage, model, completion, time.perf_counter() - started)
     content = completion.choices[0].message.content or ""
     content = strip_think_tags(content)
 
@@ -159,54 +251,212 @@ def call_model(client: Groq, model: str, product: Dict[str, Any], review_text: s
         }
 
 
-def main():
-    products = load_products("product.json")
-    reviews = load_reviews("reviews.json")
-    client = get_client()
+def score_review(
+    client: Groq, model: str, product: Dict[str, Any], review_text: str, retries: int = MAX_RETRIES,
+    usage: Optional[Dict[str, Dict[str, float]]] = None,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Оценка одного отзыва с проверкой по схеме. Если ответ не прошел валидацию,
+    переспрашиваем модель только по этому отзыву (до retries раз).
+    Возвращает (ответ, ошибки валидации последней попытки)
+    """
+    for attempt in range(retries + 1):
+        resp = call_model(client, model, product, review_text, usage)
+        errors = validate_criteria(resp)
+        if not errors:
+            return resp, []
+        print(f"[WARN] Ответ не прошел схему (попытка {attempt + 1}/{retries + 1}): {'; '.join(errors[:3])}")
+    return resp, errors
+
+
+def escalation_reasons(resp: Dict[str, Any], errors: List[str]) -> List[str]:
+    """Почему ответ дешевой модели нужно перепроверить сильной (пустой список — не нужно)"""
+    if errors:
+        return ["invalid"]
+    scores = {c["критерий"]: c["оценка"] for c in resp["критерии"]}
+    reasons = [f"flag:{name}" for name in FLAG_CRITERIA if scores.get(name, 5) <= FLAG_MAX]
+    if sum(score == 3 for score in scores.values()) >= BORDERLINE_MIN:
+        reasons.append("borderline")
+    return reasons
+
+
+def cascade_score(
+    client: Groq, product: Dict[str, Any], text: str, cheap: str, strong: str, retries: int,
+    usage: Dict[str, Dict[str, float]],
+) -> Tuple[Dict[str, Any], List[str], str, List[str]]:
+    """
+    Каскад: дешевая модель (без повторов — вместо повтора эскалация), при сомнениях — сильная.
+    Возвращает (ответ, ошибки валидации, модель ответа, причины эскалации)
+    """
+    resp, errors = score_review(client, cheap, product, text, 0, usage)
+    reasons = escalation_reasons(resp, errors)
+    if not reasons:
+        return resp, errors, cheap, reasons
+
+    print(f"[info] Эскалация на {strong}: {', '.join(reasons)}")
+    strong_resp, strong_errors = score_review(client, strong, product, text, retries, usage)
+    if strong_errors and not errors:
+        # сильная модель не справилась — остается корректный ответ дешевой
+        return resp, errors, cheap, reasons
+    return strong_resp, strong_errors, strong, reasons
+
+
+def _cost(model: str, stats: Dict[str, float]) -> Optional[float]:
+    price = MODEL_PRICES.get(model)
+    if price is None:
+        return None
+    return (stats["prompt_tokens"] * price[0] + stats["completion_tokens"] * price[1]) / 1e6
+
+
+def print_cascade_report(cheap: str, strong: str, scored: int, reasons: Dict[str, int], escalated: int,
+                         usage: Dict[str, Dict[str, float]]):
+    """Доля эскалаций и экономия относительно оценки всех отзывов сильной моделью"""
+    if not scored:
+        return
+    print(f"\n[info] Каскад {cheap} -> {strong}: оценено {scored}, "
+          f"эскалировано {escalated} ({100.0 * escalated / scored:.1f}%)")
+    for reason, count in sorted(reasons.items(), key=lambda item: -item[1]):
+        print(f"    {reason}: {count}")
+
+    empty = {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+    cheap_stats, strong_stats = usage.get(cheap, empty), usage.get(strong, empty)
+    seconds = cheap_stats["seconds"] + strong_stats["seconds"]
+    # Базовая линия: все отзывы через сильную модель. Средние на вызов берем по эскалациям,
+    # а если их не было — токены дешевой модели по цене сильной
+    reference = strong_stats if strong_stats["calls"] else cheap_stats
+    per_call = {key: reference[key] / max(reference["calls"], 1) for key in empty}
+    baseline = {key: per_call[key] * scored for key in empty}
+
+    print(f"    время: {seconds:.1f}s" + (f" (все через {strong}: ~{baseline['seconds']:.1f}s)"
+                                          if strong_stats["calls"] else ""))
+    cost = [_cost(cheap, cheap_stats), _cost(strong, strong_stats)]
+    baseline_cost = _cost(strong, baseline)
+    if None not in cost and baseline_cost:
+        total = sum(cost)
+        print(f"    стоимость: ${total:.4f} (все через {strong}: ~${baseline_cost:.4f}, "
+              f"экономия {100.0 * (1 - total / baseline_cost):.0f}%)")
 
-    results: List[Dict[str, Any]] = []
+
+def main():
+    parser = argparse.ArgumentParser(description="Оценка отзывов по критериям (Groq)")
+    parser.add_argument("--products", default="product.json", help="путь к product.json")
+    parser.add_argument("--reviews", default="reviews.json", help="путь к reviews.json")
+    parser.add_argument("--out", "-o", default="results_criteria.json", help="файл результатов")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="оценивать только новые/измененные отзывы (по хэшу текста и версии промпта), "
+             "остальные результаты взять из --out",
+    )
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES,
+                        help="повторы для отзыва, ответ на который не прошел схему")
+    parser.add_argument("--cascade", action="store_true",
+                        help="каскад: все отзывы оценивает --cheap-model, сомнительные — --strong-model "
+                             "(вместо списка MODELS)")
+    parser.add_argument("--cheap-model", default=CASCADE_CHEAP_MODEL)
+    parser.add_argument("--strong-model", default=CASCADE_STRONG_MODEL)
+    args = parser.parse_args()
+
+    products = load_products(args.products)
+    reviews = load_reviews(args.reviews)
+    version = prompt_version()
+
+    # Результаты по ключу (review_id, model) — только для текущих отзывов и моделей;
+    # в инкрементальном режиме актуальные прошлые строки переносятся, остальные отбрасываются
+    previous = load_previous_results(args.out) if args.incremental else {}
+    results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    client = None
+    reused = scored = invalid = 0
+    # В каскаде строка отзыва одна — от той модели, чей ответ принят
+    models = [args.cheap_model, args.strong_model] if args.cascade else MODELS
+    usage: Dict[str, Dict[str, float]] = {}
+    escalated = 0
+    reasons_count: Dict[str, int] = {}
 
     for r in reviews:
         review_id = r["id"]
         product_id = r["product_id"]
-        text = r["text"]
+        text = review_text(r)
+        text_hash = content_hash(text)
 
         product = products.get(product_id)
         if not product:
             print(f"[WARN] Для отзыва {review_id} не найден product_id={product_id}, пропускаю.")
             continue
 
+        if args.cascade:
+            prev = [previous.get((review_id, m)) for m in models]
+            kept = [row for row in prev if row and row.get("cascade") and is_up_to_date(row, text_hash, version)][:1]
+            pending = [] if kept else ["cascade"]
+        else:
+            # строки каскада (с полем cascade) в обычном режиме не переиспользуются
+            current = {m: previous.get((review_id, m)) for m in MODELS}
+            current = {m: row for m, row in current.items()
+                       if row and not row.get("cascade") and is_up_to_date(row, text_hash, version)}
+            kept = list(current.values())
+            pending = [m for m in MODELS if m not in current]
+        for row in kept:
+            results[(review_id, row["model"])] = row
+        reused += len(kept)
+        if not pending:
+            continue
+
         print("=" * 80)
         print(f"Отзыв: {review_id}")
         print(f"Товар: {product['name']}")
         print(f"Текст отзыва: {text}\n")
 
-        for model in MODELS:
+        for model in pending:
             print("-" * 80)
-            print(f"Модель: {model}")
-
-            resp = call_model(client, model, product, text)
-
-            sentiment = resp.get("тональность") if isinstance(resp, dict) else None
-            crits = resp.get("критерии") if isinstance(resp, dict) else None
-            print(f"Тональность (по модели): {sentiment}")
-            if isinstance(crits, list):
-                print(f"Критериев: {len(crits)}")
+            print(f"Модель: {model}" if model != "cascade" else f"Каскад: {args.cheap_model} -> {args.strong_model}")
+
+            # Клиент создаем только если есть что оценивать
+            client = client or get_client()
+            cascade = None
+            if model == "cascade":
+                resp, errors, model, reasons = cascade_score(
+                    client, product, text, args.cheap_model, args.strong_model, args.retries, usage)
+                cascade = {"cheap_model": args.cheap_model, "escalated": bool(reasons), "reasons": reasons}
+                escalated += bool(reasons)
+                for reason in reasons:
+                    reasons_count[reason] = reasons_count.get(reason, 0) + 1
             else:
-                print("Ответ не в формате ожидаемого JSON, см. results_criteria.json")
+                resp, errors = score_review(client, model, product, text, args.retries, usage)
+            scored += 1
 
-            results.append({
+            row = {
                 "review_id": review_id,
                 "product_id": product_id,
                 "model": model,
+                "content_hash": text_hash,
+                "prompt_version": version,
                 "result": resp
-            })
-
-    out_path = "results_criteria.json"
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-
-    print(f"\nГотово! Результаты сохранены в {out_path}")
+            }
+            if cascade:
+                row["cascade"] = cascade
+            if errors:
+                # Отзыв сохраняется с ошибками и будет переоценен при следующем --incremental
+                invalid += 1
+                row["validation_errors"] = errors
+                print(f"Ответ не соответствует схеме, см. {args.out}")
+            else:
+                print(f"Тональность (по модели): {resp['тональность']}")
+                print(f"Критериев: {len(resp['критерии'])}")
+            results[(review_id, model)] = row
+
+    # Запись во временный файл + rename: прерванный запуск не портит прошлые результаты
+    tmp_path = args.out + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(list(results.values()), f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, args.out)
+
+    if args.incremental:
+        print(f"\n[info] Оценено заново: {scored}, взято из прошлых результатов: {reused}")
+    if invalid:
+        print(f"[WARN] Не прошли схему после повторов: {invalid} (поле validation_errors)")
+    if args.cascade:
+        print_cascade_report(args.cheap_model, args.strong_model, scored, reasons_count, escalated, usage)
+    print(f"\nГотово! Результаты сохранены в {args.out}")
 
 
 if __name__ == "__main__":
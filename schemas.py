@@ -0,0 +1,335 @@
+"""
+schemas.py
+
+JSON Schema ответов моделей и быстрые локальные валидаторы к ним.
+
+Одна и та же схема используется дважды:
+  - как response_format (json_schema) в запросе к Groq — модель сразу отвечает в нужной форме;
+  - как валидатор на входе: compile_schema() один раз превращает схему в дерево
+    замыканий, и проверка записи — это несколько isinstance без интерпретации схемы
+    (~15 мкс на ответ из 8 критериев). Подробные сообщения об ошибках собираются
+    только для некорректных записей.
+
+    errors = validate_criteria(resp)   # [] — ответ корректен (и каждый критерий по разу)
+    errors = validate_audience(parsed)
+    errors = validate_partial_audience(partial)
+
+Поддерживается подмножество JSON Schema, которое нужно этим схемам:
+type, properties, required, items, enum, minimum/maximum, minItems/maxItems, minLength.
+"""
+
+from typing import Any, Callable, Dict, List
+
+SENTIMENTS = ["положительный", "нейтральный", "отрицательный"]
+
+# Названия критериев ровно в том виде, в каком их требует промпт reviews_groq_criteria.py
+CRITERIA_NAMES = [
+    "Информативность",
+    "Релевантность",
+    "Опыт использования (User Experience)",
+    "Ответы на вопросы",
+    "Контекст",
+    "Сравнение",
+    "Нарушение правил",
+    "Конфликт интересов",
+]
+
+# Те же критерии латиницей — для имен колонок (Parquet, SQLite)
+CRITERIA_COLUMNS = [
+    "informativeness",
+    "relevance",
+    "user_experience",
+    "answers",
+    "context",
+    "comparison",
+    "rule_violation",
+    "conflict_of_interest",
+]
+
+CRITERIA_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "тональность": {"type": "string", "enum": SENTIMENTS},
+        "критерии": {
+            "type": "array",
+            "minItems": len(CRITERIA_NAMES),
+            "maxItems": len(CRITERIA_NAMES),
+            "items": {
+                "type": "object",
+                "properties": {
+                    "критерий": {"type": "string", "enum": CRITERIA_NAMES},
+                    "оценка": {"type": "integer", "minimum": 1, "maximum": 5},
+                    "обоснование": {"type": "string", "minLength": 1},
+                },
+                "required": ["критерий", "оценка", "обоснование"],
+            },
+        },
+    },
+    "required": ["тональность", "критерии"],
+}
+
+AUDIENCE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "product_id": {"type": ["string", "null"]},
+        "product_name": {"type": "string"},
+        "summary": {"type": "string"},
+        "audience_segments": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "minLength": 1},
+                    "share_pct_est": {"type": "number", "minimum": 0, "maximum": 100},
+                    "needs": {"type": "string"},
+                    "pain_points": {"type": "string"},
+                    "recommended_message": {"type": "string"},
+                },
+                "required": ["name", "share_pct_est", "needs", "pain_points", "recommended_message"],
+            },
+        },
+        "recommendations": {"type": "array", "items": {"type": "string"}},
+        "a_b_test_hypotheses": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["product_name", "summary", "audience_segments", "recommendations", "a_b_test_hypotheses"],
+}
+
+# Промежуточный результат map-reduce анализа аудитории: сегменты в части отзывов
+# с числом отзывов в каждом (из них потом считаются доли)
+PARTIAL_AUDIENCE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "segments": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "minLength": 1},
+                    "count": {"type": "integer", "minimum": 0},
+                    "needs": {"type": "string"},
+                    "pain_points": {"type": "string"},
+                    "quotes": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["name", "count", "needs", "pain_points"],
+            },
+        },
+    },
+    "required": ["segments"],
+}
+# Названия кластеров отзывов (review_clustering.py): доли считаются локально, модель только называет
+CLUSTER_NAMING_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "clusters": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "cluster": {"type": "integer", "minimum": 0},
+                    "name": {"type": "string", "minLength": 1},
+                    "needs": {"type": "string"},
+                    "pain_points": {"type": "string"},
+                    "recommended_message": {"type": "string"},
+                },
+                "required": ["cluster", "name", "needs", "pain_points", "recommended_message"],
+            },
+        },
+    },
+    "required": ["clusters"],
+}
+
+
+# === Компиляция схемы в валидатор ===
+
+Check = Callable[[Any, str, List[str]], None]
+
+
+class _Stop(Exception):
+    """Тип узла не совпал — дальше узел не проверяем"""
+
+
+# bool — подкласс int, но в JSON это разные типы
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def _compile(schema: Dict[str, Any]) -> Check:
+    """Схема -> функция check(value, path, errors), дописывающая ошибки в errors"""
+    checks: List[Check] = []
+
+    if "type" in schema:
+        types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        type_checks = [_TYPE_CHECKS[t] for t in types]
+        expected = "|".join(types)
+
+        def check_type(value, path, errors):
+            if not any(check(value) for check in type_checks):
+                errors.append(f"{path}: ожидался {expected}, получен {type(value).__name__}")
+                raise _Stop
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = frozenset(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: недопустимое значение {value!r}")
+        checks.append(check_enum)
+
+    if "minimum" in schema or "maximum" in schema:
+        low, high = schema.get("minimum"), schema.get("maximum")
+
+        def check_range(value, path, errors):
+            if (low is not None and value < low) or (high is not None and value > high):
+                errors.append(f"{path}: {value} вне диапазона [{low}, {high}]")
+        checks.append(check_range)
+
+    if "minLength" in schema:
+        min_length = schema["minLength"]
+
+        def check_length(value, path, errors):
+            if isinstance(value, str) and len(value.strip()) < min_length:
+                errors.append(f"{path}: пустая строка")
+        checks.append(check_length)
+
+    if "required" in schema or "properties" in schema:
+        required = list(schema.get("required", []))
+        properties = [(name, _compile(sub)) for name, sub in schema.get("properties", {}).items()]
+
+        def check_object(value, path, errors):
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}.{name}: отсутствует")
+            for name, check in properties:
+                if name in value:
+                    check(value[name], f"{path}.{name}", errors)
+        checks.append(check_object)
+
+    if "minItems" in schema or "maxItems" in schema:
+        min_items, max_items = schema.get("minItems", 0), schema.get("maxItems")
+
+        def check_size(value, path, errors):
+            if len(value) < min_items or (max_items is not None and len(value) > max_items):
+                errors.append(f"{path}: {len(value)} элементов, ожидалось {min_items}..{max_items or '∞'}")
+        checks.append(check_size)
+
+    if "items" in schema:
+        item_check = _compile(schema["items"])
+
+        def check_items(value, path, errors):
+            for i, item in enumerate(value):
+                item_check(item, f"{path}[{i}]", errors)
+        checks.append(check_items)
+
+    def check(value, path, errors):
+        try:
+            for step in checks:
+                step(value, path, errors)
+        except _Stop:
+            pass  # тип не совпал — остальные проверки узла бессмысленны
+    return check
+
+
+def _compile_fast(schema: Dict[str, Any]) -> Callable[[Any], bool]:
+    """
+    Схема -> предикат value -> bool. Без путей и сообщений: так проверяется
+    каждая запись, а подробный разбор (_compile) нужен только для некорректных
+    """
+    preds: List[Callable[[Any], bool]] = []
+
+    if "type" in schema:
+        type_checks = [_TYPE_CHECKS[t] for t in (schema["type"] if isinstance(schema["type"], list) else [schema["type"]])]
+        preds.append(type_checks[0] if len(type_checks) == 1 else (lambda v: any(c(v) for c in type_checks)))
+    if "enum" in schema:
+        allowed = frozenset(schema["enum"])
+        preds.append(lambda v: v in allowed)
+    if "minimum" in schema or "maximum" in schema:
+        low, high = schema.get("minimum", float("-inf")), schema.get("maximum", float("inf"))
+        preds.append(lambda v: low <= v <= high)
+    if "minLength" in schema:
+        min_length = schema["minLength"]
+        preds.append(lambda v: len(v.strip()) >= min_length)
+    if "required" in schema or "properties" in schema:
+        required = tuple(schema.get("required", []))
+        properties = tuple((name, _compile_fast(sub)) for name, sub in schema.get("properties", {}).items())
+
+        def object_ok(v):
+            for name in required:
+                if name not in v:
+                    return False
+            for name, pred in properties:
+                if name in v and not pred(v[name]):
+                    return False
+            return True
+        preds.append(object_ok)
+    if "minItems" in schema or "maxItems" in schema:
+        min_items, max_items = schema.get("minItems", 0), schema.get("maxItems", float("inf"))
+        preds.append(lambda v: min_items <= len(v) <= max_items)
+    if "items" in schema:
+        item_ok = _compile_fast(schema["items"])
+        preds.append(lambda v: all(map(item_ok, v)))
+
+    preds_t = tuple(preds)
+
+    def ok(value):
+        for pred in preds_t:
+            if not pred(value):
+                return False
+        return True
+    return ok
+
+
+def compile_schema(schema: Dict[str, Any]) -> Callable[[Any], List[str]]:
+    """Валидатор для схемы: value -> список ошибок (пустой — значение корректно)"""
+    ok = _compile_fast(schema)
+    check = _compile(schema)
+
+    def validate(value: Any) -> List[str]:
+        if ok(value):
+            return []
+        errors: List[str] = []
+        check(value, "$", errors)
+        return errors or ["$: не соответствует схеме"]
+    return validate
+
+
+def response_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """response_format для chat.completions.create со схемой ответа"""
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}
+
+
+# Для моделей, отклоняющих json_schema (400): только "ответ — JSON", схема остается в промпте
+JSON_OBJECT_FORMAT: Dict[str, Any] = {"type": "json_object"}
+
+
+_validate_criteria_schema = compile_schema(CRITERIA_SCHEMA)
+
+
+def validate_criteria(value: Any) -> List[str]:
+    """
+    CRITERIA_SCHEMA + каждый критерий ровно один раз: уникальность по полю
+    "критерий" средствами JSON Schema не выражается (uniqueItems сравнивает элементы целиком)
+    """
+    errors = _validate_criteria_schema(value)
+    if errors:
+        return errors
+    names = [c["критерий"] for c in value["критерии"]]
+    if len(set(names)) != len(names):
+        repeated = sorted({name for name in names if names.count(name) > 1})
+        return [f"$.критерии: повторяются критерии {', '.join(repeated)}"]
+    return []
+
+
+validate_audience = compile_schema(AUDIENCE_SCHEMA)
+validate_partial_audience = compile_schema(PARTIAL_AUDIENCE_SCHEMA)
+validate_cluster_naming = compile_schema(CLUSTER_NAMING_SCHEMA)
@@ -0,0 +1,30 @@
+"""Общие фикстуры: модули пайплайна из корня и парсер из Dashboard/parcer"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+for path in (ROOT_DIR, ROOT_DIR / "Dashboard" / "parcer"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from schemas import CRITERIA_NAMES  # noqa: E402
+
+
+def make_result(sentiment="положительный", scores=None):
+    """Ответ модели, проходящий CRITERIA_SCHEMA"""
+    scores = scores or [5, 4, 3, 2, 1, 5, 1, 1]
+    return {
+        "тональность": sentiment,
+        "критерии": [
+            {"критерий": name, "оценка": score, "обоснование": f"обоснование {i}"}
+            for i, (name, score) in enumerate(zip(CRITERIA_NAMES, scores))
+        ],
+    }
+
+
+@pytest.fixture
+def criteria_result():
+    return make_result()
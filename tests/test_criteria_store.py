@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from conftest import make_result
+from criteria_store import CriteriaRecord, CriteriaTable, Sentiment
+
+
+def rows():
+    return [
+        {"review_id": "wb_a", "product_id": "wb_1", "model": "m1", "content_hash": "h1",
+         "prompt_version": "v1", "result": make_result()},
+        {"review_id": "wb_b", "product_id": "wb_1", "model": "m2",
+         "result": make_result("отрицательный", [1, 1, 1, 1, 1, 1, 1, 1]), "cascade": {"stage": 2}},
+    ]
+
+
+def test_record_round_trip():
+    row = rows()[1]
+    record = CriteriaRecord.from_row(row)
+    assert record.sentiment is Sentiment.NEGATIVE
+    assert record.score("Контекст") == 1
+    assert record.to_row() == row
+
+
+def test_record_rejects_invalid_result():
+    with pytest.raises(ValueError):
+        CriteriaRecord.from_row({"review_id": "x", "result": {"тональность": "положительный"}})
+
+
+def test_table_save_is_byte_identical(tmp_path):
+    source = tmp_path / "results.json"
+    copy = tmp_path / "copy.json"
+    source.write_text(json.dumps(rows(), ensure_ascii=False, indent=2), encoding="utf-8")
+    table = CriteriaTable.load(str(source))
+    assert len(table) == 2 and table.skipped == 0
+    assert list(table.column("Информативность")) == [5, 1]
+    table.save_json(str(copy))
+    assert copy.read_bytes() == source.read_bytes()
+
+
+def test_table_refuses_lossy_save(tmp_path):
+    table = CriteriaTable.from_rows(rows() + [{"review_id": "bad", "raw_response": "...", "parse_error": "x"}])
+    assert table.skipped == 1
+    with pytest.raises(ValueError):
+        table.save_json(str(tmp_path / "out.json"))
+
+
+def test_table_without_justifications():
+    table = CriteriaTable.from_rows(rows(), keep_justifications=False)
+    assert table[0].model == "m1"
+    with pytest.raises(ValueError):
+        next(table.rows())
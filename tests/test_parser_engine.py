@@ -0,0 +1,60 @@
+import json
+import os
+import time
+
+from parser_engine import Driver, ParserEngine, save_results
+
+
+def engine(tmp_path, ttl=60):
+    return ParserEngine(Driver(), cache_dir=str(tmp_path / "cache"), cache_ttl=ttl)
+
+
+def test_cache_round_trip(tmp_path):
+    parser = engine(tmp_path)
+    assert parser._cache_get("https://a") is None
+    parser._cache_put("https://a", {"product": {"id": "wb_1"}, "reviews": []})
+    assert parser._cache_get("https://a") == {"product": {"id": "wb_1"}, "reviews": []}
+    assert parser._cache_get("https://b") is None
+
+
+def test_cache_ttl(tmp_path):
+    parser = engine(tmp_path, ttl=60)
+    parser._cache_put("https://a", {"reviews": []})
+    path = parser._cache_path("https://a")
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert parser._cache_get("https://a") is None
+
+
+def test_no_cache_dir(tmp_path):
+    parser = ParserEngine(Driver())
+    parser._cache_put("https://a", {"reviews": []})
+    assert parser._cache_get("https://a") is None
+
+
+def result(product_id, *texts):
+    return {"product": {"id": product_id, "name": product_id},
+            "reviews": [{"id": f"{product_id}_{t}", "product_id": product_id, "text": t} for t in texts]}
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_save_results_overwrites(tmp_path):
+    save_results([result("wb_1", "a")], str(tmp_path))
+    added = save_results([result("wb_2", "b")], str(tmp_path))
+    assert [r["id"] for r in added] == ["wb_2_b"]
+    assert [p["id"] for p in load(tmp_path / "product.json")] == ["wb_2"]
+
+
+def test_save_results_merge(tmp_path):
+    save_results([result("wb_1", "a"), result("wb_2", "b")], str(tmp_path))
+    updated = result("wb_1", "a", "c")
+    updated["product"]["name"] = "новое имя"
+    added = save_results([updated], str(tmp_path), merge=True)
+    assert [r["id"] for r in added] == ["wb_1_c"]
+    products = load(tmp_path / "product.json")
+    assert [(p["id"], p["name"]) for p in products] == [("wb_2", "wb_2"), ("wb_1", "новое имя")]
+    assert [r["id"] for r in load(tmp_path / "reviews.json")] == ["wb_1_a", "wb_2_b", "wb_1_c"]
@@ -0,0 +1,43 @@
+import pytest
+
+from review_corpus import ReviewCorpus, build_corpus
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    reviews = [
+        {"id": "wb_a", "product_id": "wb_1", "text": "первый", "rating": 5, "date": "2024-05-17T10:00:00"},
+        {"id": "oz_b", "product_id": "ozon_2", "review": "второй", "rating": 1},
+        {"id": "wb_c", "product_id": "wb_1", "text": "третий ёж", "date": "2024-06-01"},
+    ]
+    path = str(tmp_path / "reviews.corpus")
+    meta = build_corpus(reviews, path)
+    assert meta["reviews"] == 3
+    with ReviewCorpus(path) as opened:
+        yield opened
+
+
+def test_lookup_by_id(corpus):
+    assert corpus.by_id("wb_c") == {"id": "wb_c", "product_id": "wb_1", "text": "третий ёж",
+                                    "rating": None, "date": "2024-06-01"}
+    assert corpus.by_id("oz_b")["text"] == "второй"
+    assert corpus.by_id("missing") is None
+
+
+def test_product_rows_keep_order(corpus):
+    assert list(corpus.iter_texts(corpus.product_rows("wb_1"))) == ["первый", "третий ёж"]
+    assert list(corpus.product_rows("unknown")) == []
+
+
+def test_filter_by_index(corpus):
+    assert [corpus.review_id(r) for r in corpus.filter(max_rating=2)] == ["oz_b"]
+    assert [corpus.review_id(r) for r in corpus.filter(since="2024-05-20")] == ["wb_c"]
+    assert corpus.sample("wb_1", n=5) == ["первый", "третий ёж"]
+
+
+def test_empty_corpus(tmp_path):
+    path = str(tmp_path / "empty.corpus")
+    build_corpus([], path)
+    with ReviewCorpus(path) as empty:
+        assert len(empty) == 0
+        assert empty.by_id("x") is None
@@ -0,0 +1,23 @@
+from review_ids import product_id_from_url, review_id
+
+
+def test_review_id_ignores_case_and_spaces():
+    assert review_id("wb_123", "Отличный  товар\n") == review_id("wb_123", "отличный товар")
+
+
+def test_review_id_depends_on_product():
+    assert review_id("wb_123", "текст") != review_id("wb_124", "текст")
+
+
+def test_review_id_prefix():
+    assert review_id("wb_123", "текст").startswith("wb_")
+    assert review_id("ozon_1", "текст").startswith("ozon_")
+    assert review_id("wb_123", "текст", prefix="x").startswith("x_")
+
+
+def test_product_id_from_url():
+    assert product_id_from_url("https://www.wildberries.ru/catalog/396501168/detail.aspx?x=1") == "wb_396501168"
+    assert product_id_from_url("https://www.ozon.ru/product/chehol-12345/") == "ozon_12345"
+    other = product_id_from_url("https://shop.example.com/item/?utm=1")
+    assert other == product_id_from_url("https://shop.example.com/item")
+    assert other.startswith("shop.example.com_")
@@ -0,0 +1,41 @@
+import pytest
+
+from review_search import parse_score_filter, to_fts_query
+
+
+def test_words_are_stemmed_and_joined_with_and():
+    assert to_fts_query("аккумулятор") == ('"аккумулятор"', ["аккумулятор"])
+    assert to_fts_query("a b")[0] == '"a" AND "b"'
+
+
+def test_phrase_operators_and_brackets():
+    expr, terms = to_fts_query('"быстро садится" OR (батарея NOT зарядка)')
+    assert expr == '"быстр сад" OR ( "батаре" NOT "зарядк" )'
+    assert terms == ["быстр", "сад", "батаре", "зарядк"]
+
+
+def test_russian_operators_and_minus():
+    assert to_fts_query("батарея ИЛИ зарядка")[0] == '"батаре" OR "зарядк"'
+    assert to_fts_query("зарядка -кабель")[0] == '"зарядк" NOT "кабел"'
+
+
+def test_prefix():
+    assert to_fts_query("батар*")[0] == '"батар"*'
+
+
+@pytest.mark.parametrize("query", ["OR a", "(a", "a OR", "-a", "()", "a)"])
+def test_invalid_queries(query):
+    with pytest.raises(ValueError):
+        to_fts_query(query)
+
+
+def test_score_filter():
+    assert parse_score_filter("Контекст<=2") == ("context", "<=", 2)
+    assert parse_score_filter("context >= 4") == ("context", ">=", 4)
+    assert parse_score_filter("Опыт=3") == ("user_experience", "=", 3)
+
+
+@pytest.mark.parametrize("text", ["Контекст<6", "xyz=1", "О=1", "Контекст"])
+def test_invalid_score_filters(text):
+    with pytest.raises(ValueError):
+        parse_score_filter(text)
@@ -0,0 +1,73 @@
+import json
+
+from review_state import MAX_KNOWN, ReviewState, merge_reviews, review_key
+
+
+def review(rid, date=None, text="текст"):
+    return {"id": rid, "product_id": "wb_1", "text": text, "date": date}
+
+
+def test_is_known_by_key(tmp_path):
+    state = ReviewState(str(tmp_path / "state.json"))
+    state.advance("wb_1", [review("a", "2024-05-01T10:00:00")])
+    assert state.is_known("wb_1", review("a"))
+    assert not state.is_known("wb_2", review("a"))
+
+
+def test_is_known_by_watermark(tmp_path):
+    state = ReviewState(str(tmp_path / "state.json"))
+    state.advance("wb_1", [review("a", "2024-05-01T10:00:00"), review("b", "2024-04-01T10:00:00")])
+    assert state.watermark("wb_1") == {"latest_id": "a", "latest_date": "2024-05-01T10:00:00"}
+    assert state.is_known("wb_1", review("old", "2024-04-30T00:00:00"))
+    # та же дата — новый отзыв, повтор отсеивается по ключу
+    assert not state.is_known("wb_1", review("same", "2024-05-01T10:00:00"))
+    assert not state.is_known("wb_1", review("new", "2024-06-01T00:00:00"))
+    # не ISO-строки не сравниваются
+    assert not state.is_known("wb_1", {"id": "n", "date": 20240101})
+
+
+def test_advance_keeps_newest_mark(tmp_path):
+    state = ReviewState(str(tmp_path / "state.json"))
+    state.advance("wb_1", [review("a", "2024-05-01T10:00:00")])
+    state.advance("wb_1", [review("b", "2024-01-01T10:00:00")])
+    assert state.watermark("wb_1")["latest_id"] == "a"
+    assert state.is_known("wb_1", review("b"))
+
+
+def test_advance_bounds_known(tmp_path):
+    state = ReviewState(str(tmp_path / "state.json"))
+    state.advance("wb_1", [review(str(i)) for i in range(MAX_KNOWN + 10)])
+    assert len(state.products["wb_1"]["known"]) == MAX_KNOWN
+    assert not state.is_known("wb_1", review("0"))
+    assert state.is_known("wb_1", review(str(MAX_KNOWN + 9)))
+
+
+def test_save_and_reload(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = ReviewState(path)
+    state.advance("wb_1", [review("a", "2024-05-01T10:00:00")])
+    state.save()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["wb_1"]["latest_id"] == "a"
+    assert ReviewState(path).is_known("wb_1", review("a"))
+
+
+def test_new_reviews_stops_on_known(tmp_path):
+    state = ReviewState(str(tmp_path / "state.json"))
+    state.advance("wb_1", [review("b")])
+    page = [review("a"), review("b"), review("c")]
+    assert [r["id"] for r in state.new_reviews("wb_1", page)] == ["a", "c"]
+    assert [r["id"] for r in state.new_reviews("wb_1", page, newest_first=True)] == ["a"]
+
+
+def test_positional_ids_use_content():
+    first = {"id": "wb_review_3", "product_id": "wb_1", "text": "Хороший"}
+    second = {"id": "wb_review_7", "product_id": "wb_1", "text": "хороший "}
+    assert review_key(first) == review_key(second)
+
+
+def test_merge_reviews():
+    existing = [review("a"), review("b")]
+    added = merge_reviews(existing, [review("b"), review("c"), review("c"), {**review("a"), "product_id": "wb_2"}])
+    assert [(r["product_id"], r["id"]) for r in added] == [("wb_1", "c"), ("wb_2", "a")]
+    assert len(existing) == 4
@@ -0,0 +1,33 @@
+from schemas import validate_criteria
+
+
+def test_valid_result(criteria_result):
+    assert validate_criteria(criteria_result) == []
+
+
+def test_score_out_of_range(criteria_result):
+    criteria_result["критерии"][0]["оценка"] = 6
+    assert validate_criteria(criteria_result)
+
+
+def test_unknown_sentiment(criteria_result):
+    criteria_result["тональность"] = "восторженный"
+    assert validate_criteria(criteria_result)
+
+
+def test_missing_criterion(criteria_result):
+    criteria_result["критерии"].pop()
+    assert validate_criteria(criteria_result)
+
+
+def test_repeated_criterion(criteria_result):
+    criteria = criteria_result["критерии"]
+    criteria[1] = dict(criteria[0])
+    errors = validate_criteria(criteria_result)
+    assert len(errors) == 1
+    assert criteria[0]["критерий"] in errors[0]
+
+
+def test_not_an_object():
+    assert validate_criteria(None)
+    assert validate_criteria([])
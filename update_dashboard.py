@@ -5,9 +5,52 @@
 """
 
 import os
+import sys
+import time
 import shutil
 import json
+import ctypes
+import ctypes.util
+import hashlib
+import select
+import struct
+import argparse
+import gzip
+import tempfile
 from pathlib import Path
+from urllib.parse import quote
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from schemas import SENTIMENTS, validate_criteria
+
+try:
+    import brotli
+except ImportError:  # .br не создаются, остается .gz
+    brotli = None
+
+
+# Файлы, которые копируются в dashboard как есть
+DASHBOARD_FILES = [
+    'audience_analysis_results.json',
+    'product.json',
+]
+
+# Предрасчитанные агрегаты: dashboard грузит только их, а не все оценки
+SUMMARY_FILE = 'dashboard_summary.json'
+SUMMARY_SOURCES = {'results.json', 'product.json', 'audience_analysis_results.json'}
+
+# Оценки отзывов режутся на страницы по товарам: reviews/index.json + reviews/<товар>/page-0001.json
+REVIEWS_DIR = 'reviews'
+PAGES_SOURCES = {'results.json', 'reviews.json', 'product.json'}
+PAGE_SIZE = 20
+
+# Сжатые копии сгенерированных файлов для раздачи статикой (gzip_static / brotli_static)
+SIDECARS = ['.gz', '.br']
+
+# Все исходные файлы, за которыми следит режим наблюдения
+WATCHED_FILES = sorted(set(DASHBOARD_FILES) | SUMMARY_SOURCES | PAGES_SOURCES)
+
+_SENTIMENT_EN = {'positive': 'положительный', 'neutral': 'нейтральный', 'negative': 'отрицательный'}
 
 
 def find_dashboard_directory():
@@ -31,6 +74,390 @@ def find_dashboard_directory():
     return None
 
 
+def _digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_same_file(src: str, dest: str) -> bool:
+    """Файл в dashboard уже совпадает с исходным (по размеру и mtime, затем по содержимому)"""
+    if not os.path.exists(dest):
+        return False
+    src_stat, dest_stat = os.stat(src), os.stat(dest)
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+    if src_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    return _digest(src) == _digest(dest)
+
+
+def is_complete_json(path: str) -> bool:
+    """JSON дописан до конца (скрипт не в процессе записи)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            json.load(f)
+        return True
+    except (json.JSONDecodeError, UnicodeDecodeError, OSError):
+        return False
+
+
+def _atomic_replace(dest: str, write, stat_src: Optional[str] = None):
+    """
+    Запись через временный файл в той же папке + os.replace:
+    dev-сервер dashboard никогда не увидит наполовину записанный файл
+    """
+    dest_dir = os.path.dirname(os.path.abspath(dest))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(dest) + '.', suffix='.tmp', dir=dest_dir)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            write(tmp)
+        if stat_src:
+            shutil.copystat(stat_src, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o644)  # mkstemp создает файл с правами 0600
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def atomic_copy(src: str, dest: str):
+    """Атомарное копирование файла с сохранением mtime"""
+    def write(tmp):
+        with open(src, 'rb') as f:
+            shutil.copyfileobj(f, tmp)
+
+    _atomic_replace(dest, write, stat_src=src)
+
+
+def atomic_write_bytes(data: bytes, dest: str) -> bool:
+    """Атомарная запись, только если содержимое изменилось. True — файл перезаписан"""
+    if os.path.exists(dest):
+        with open(dest, 'rb') as f:
+            if f.read() == data:
+                return False
+    _atomic_replace(dest, lambda tmp: tmp.write(data))
+    return True
+
+
+def sync_files(filenames: Iterable[str], dashboard_dir: str) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Копирование только изменившихся файлов.
+    Возвращает (скопированы, без изменений, отсутствуют)
+    """
+    copied, unchanged, missing = [], [], []
+    for filename in filenames:
+        if not os.path.exists(filename):
+            missing.append(filename)
+            continue
+        dest = os.path.join(dashboard_dir, filename)
+        if is_same_file(filename, dest):
+            unchanged.append(filename)
+            continue
+        atomic_copy(filename, dest)
+        copied.append(filename)
+    return copied, unchanged, missing
+
+
+# === Агрегаты для dashboard ===
+
+def _load_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _sentiment(row: Dict) -> str:
+    """Тональность строки results.json (формат Groq или старый формат с overall_sentiment)"""
+    value = (row.get('result') or {}).get('тональность') or _SENTIMENT_EN.get(row.get('overall_sentiment'))
+    return value if value in SENTIMENTS else 'нейтральный'
+
+
+def _criteria(row: Dict) -> List[Tuple[str, float]]:
+    """Пары (критерий, оценка) из строки results.json"""
+    result = row.get('result') or {}
+    if isinstance(result.get('критерии'), list):
+        pairs = [(c.get('критерий'), c.get('оценка')) for c in result['критерии'] if isinstance(c, dict)]
+    else:
+        pairs = list((row.get('criteria_scores') or {}).items())
+    return [(name, float(score)) for name, score in pairs
+            if name and isinstance(score, (int, float)) and not isinstance(score, bool)]
+
+
+class _CriteriaStats:
+    """Сумма, число оценок и распределение по баллам 1–5 для каждого критерия"""
+
+    def __init__(self):
+        self.sums: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.hist: Dict[str, List[int]] = {}
+
+    def add(self, name: str, score: float):
+        if name not in self.sums:
+            self.sums[name], self.counts[name], self.hist[name] = 0.0, 0, [0] * 5
+        self.sums[name] += score
+        self.counts[name] += 1
+        self.hist[name][min(5, max(1, int(score + 0.5))) - 1] += 1
+
+    def rows(self) -> List[Dict]:
+        return [{
+            'критерий': name,
+            'средняя': round(self.sums[name] / self.counts[name], 2),
+            'n': self.counts[name],
+            'распределение': self.hist[name],
+        } for name in self.sums]
+
+
+def _segment_shares(audience) -> Dict[str, Dict[str, List[Dict]]]:
+    """Доли сегментов: товар -> модель -> [{name, share}], доли нормированы к 100%"""
+    # Старый формат create_sample_data — один объект с segments
+    if isinstance(audience, dict):
+        audience = [{'product': audience.get('product', {}),
+                     'models': {'sample': {'parsed': {'audience_segments': audience.get('segments', [])}}}}]
+
+    shares: Dict[str, Dict[str, List[Dict]]] = {}
+    for item in audience or []:
+        product = item.get('product') or {}
+        product_id = product.get('product_id') or product.get('id') or 'unknown'
+        for model, output in (item.get('models') or {}).items():
+            segments = ((output or {}).get('parsed') or {}).get('audience_segments') or []
+            raw = [(seg.get('name', ''), seg.get('share_pct_est', seg.get('percentage')) or 0) for seg in segments]
+            total = sum(value for _, value in raw if isinstance(value, (int, float)))
+            shares.setdefault(product_id, {})[model] = [{
+                'name': name,
+                'share_pct_est': value,
+                'share': round(100 * value / total, 1) if total else 0,
+            } for name, value in raw]
+    return shares
+
+
+def _is_valid(row) -> bool:
+    """
+    Строка results.json годится для агрегатов: ответ модели проходит CRITERIA_SCHEMA
+    (как в review_search.index_results). Строки старого формата create_sample_data
+    (criteria_scores без result) схемой не проверяются
+    """
+    if not isinstance(row, dict) or row.get('validation_errors'):
+        return False
+    if 'result' in row:
+        return not validate_criteria(row.get('result'))
+    return True
+
+
+def build_dashboard_summary(results: List[Dict], products: List[Dict], audience) -> Dict:
+    """
+    Все агрегаты dashboard за один проход по results.json:
+    тональность и средние/распределения по критериям — всего и по каждому товару,
+    плюс доли сегментов из анализа аудитории.
+    reviews — число разных отзывов, rows — строк (отзыв x модель), из которых посчитаны агрегаты
+    """
+    names = {p.get('id'): p.get('name') for p in products or [] if isinstance(p, dict)}
+    total_sentiment = dict.fromkeys(SENTIMENTS, 0)
+    total_criteria = _CriteriaStats()
+    per_product: Dict[str, Dict] = {}
+    invalid = 0
+
+    for row in results or []:
+        # Ответы, не прошедшие схему, в агрегаты не попадают
+        if not _is_valid(row):
+            invalid += 1
+            continue
+        product_id = row.get('product_id') or 'unknown'
+        entry = per_product.get(product_id)
+        if entry is None:
+            entry = per_product[product_id] = {
+                'review_ids': set(), 'rows': 0, 'sentiment': dict.fromkeys(SENTIMENTS, 0), 'criteria': _CriteriaStats()}
+        sentiment = _sentiment(row)
+        entry['review_ids'].add(row.get('review_id') or row.get('id'))
+        entry['rows'] += 1
+        entry['sentiment'][sentiment] += 1
+        total_sentiment[sentiment] += 1
+        for name, score in _criteria(row):
+            entry['criteria'].add(name, score)
+            total_criteria.add(name, score)
+
+    return {
+        'reviews': sum(len(e['review_ids']) for e in per_product.values()),
+        'rows': sum(e['rows'] for e in per_product.values()),
+        'invalid': invalid,
+        'sentiment': total_sentiment,
+        'criteria': total_criteria.rows(),
+        'products': {
+            product_id: {
+                'name': names.get(product_id) or product_id,
+                'reviews': len(entry['review_ids']),
+                'rows': entry['rows'],
+                'sentiment': entry['sentiment'],
+                'criteria': entry['criteria'].rows(),
+            } for product_id, entry in per_product.items()
+        },
+        'segments': _segment_shares(audience),
+    }
+
+
+def _review_criteria(row: Dict) -> List[Tuple[str, float, str]]:
+    """Тройки (критерий, оценка, обоснование) строки results.json"""
+    criteria = (row.get('result') or {}).get('критерии')
+    if isinstance(criteria, list):
+        return [(c.get('критерий'), c.get('оценка'), c.get('обоснование') or '') for c in criteria if isinstance(c, dict)]
+    return [(name, score, '') for name, score in (row.get('criteria_scores') or {}).items()]
+
+
+def _columnar_page(rows: List[Dict], texts: Dict[str, str], criteria: Dict[str, int],
+                   models: Dict[str, int]) -> Dict:
+    """
+    Страница отзывов по колонкам: имена полей не повторяются в каждой строке,
+    тональность, модель и критерии — номера в словарях из reviews/index.json.
+    Строка страницы — строка results.json (отзыв x модель): у отзыва, оцененного
+    несколькими моделями, несколько строк с разным model.
+    scores[i][j] / justifications[i][j] — оценка и обоснование i-й строки
+    по j-му критерию словаря (null — критерий не оценивался)
+    """
+    page = {'review_id': [], 'model': [], 'sentiment': [], 'text': [], 'scores': [], 'justifications': []}
+    for row in rows:
+        review_id = row.get('review_id') or row.get('id')
+        scores: List[Optional[float]] = [None] * len(criteria)
+        justifications: List[Optional[str]] = [None] * len(criteria)
+        for name, score, justification in _review_criteria(row):
+            if name in criteria:
+                scores[criteria[name]] = score
+                justifications[criteria[name]] = justification
+        page['review_id'].append(review_id)
+        page['model'].append(models[row.get('model') or ''])
+        page['sentiment'].append(SENTIMENTS.index(_sentiment(row)))
+        page['text'].append(row.get('review_text') or texts.get(review_id, ''))
+        page['scores'].append(scores)
+        page['justifications'].append(justifications)
+    return page
+
+
+def _page_name(number: int) -> str:
+    return f'page-{number:04d}.json'
+
+
+def _product_dir(product_id: str) -> str:
+    """Имя каталога товара: product_id, закодированный как encodeURIComponent (плюс точки — без '..')"""
+    return quote(product_id, safe='-_!*\'()').replace('.', '%2E') or '%2E'
+
+
+def _compact(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _compress(data: bytes, suffix: str) -> Optional[bytes]:
+    if suffix == '.gz':
+        # mtime=0 — одинаковые данные дают одинаковый архив
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if suffix == '.br' and brotli is not None:
+        return brotli.compress(data, quality=11)
+    return None
+
+
+def write_artifact(data: bytes, dest: str) -> bool:
+    """
+    Атомарная запись сгенерированного файла вместе со сжатыми копиями
+    (.gz и, если установлен brotli, .br). True — файл перезаписан
+    """
+    changed = atomic_write_bytes(data, dest)
+    for suffix in SIDECARS:
+        if changed or not os.path.exists(dest + suffix):
+            compressed = _compress(data, suffix)
+            if compressed is not None:
+                atomic_write_bytes(compressed, dest + suffix)
+    return changed
+
+
+def write_review_pages(dashboard_dir: str, page_size: int = PAGE_SIZE) -> Tuple[int, int]:
+    """
+    Разбиение results.json на страницы фиксированного размера по товарам.
+    Dashboard читает маленький index.json и затем только просматриваемую страницу.
+    Перезаписываются только изменившиеся страницы, лишние старые удаляются.
+    Возвращает (обновлено файлов, всего страниц)
+    """
+    results = _load_json('results.json', [])
+    texts = {r.get('id'): r.get('review') or r.get('text') or ''
+             for r in _load_json('reviews.json', []) if isinstance(r, dict)}
+    names = {p.get('id'): p.get('name') for p in _load_json('product.json', []) if isinstance(p, dict)}
+
+    by_product: Dict[str, List[Dict]] = {}
+    criteria: Dict[str, int] = {}
+    models: Dict[str, int] = {}
+    for row in results or []:
+        by_product.setdefault(row.get('product_id') or 'unknown', []).append(row)
+        models.setdefault(row.get('model') or '', len(models))
+        for name, _, _ in _review_criteria(row):
+            if name and name not in criteria:
+                criteria[name] = len(criteria)
+
+    root = os.path.join(dashboard_dir, REVIEWS_DIR)
+    index = {'page_size': page_size, 'sentiments': SENTIMENTS, 'models': list(models),
+             'criteria': list(criteria), 'products': {}}
+    updated = total_pages = 0
+    for product_id, rows in by_product.items():
+        product_dir = os.path.join(root, _product_dir(product_id))
+        os.makedirs(product_dir, exist_ok=True)
+        pages = (len(rows) + page_size - 1) // page_size
+        for number in range(1, pages + 1):
+            page = _columnar_page(rows[(number - 1) * page_size:number * page_size], texts, criteria, models)
+            updated += write_artifact(_compact(page), os.path.join(product_dir, _page_name(number)))
+        # Страницы (и их .gz/.br), оставшиеся от прошлой, более длинной выгрузки
+        for filename in os.listdir(product_dir):
+            if filename.startswith('page-') and filename[5:9].isdigit() and int(filename[5:9]) > pages:
+                os.unlink(os.path.join(product_dir, filename))
+        index['products'][product_id] = {
+            'name': names.get(product_id) or product_id,
+            'reviews': len({row.get('review_id') or row.get('id') for row in rows}),
+            'rows': len(rows),
+            'pages': pages,
+            'dir': _product_dir(product_id),
+        }
+        total_pages += pages
+
+    os.makedirs(root, exist_ok=True)
+    # Каталоги товаров, которых нет в новой выгрузке
+    current = {entry['dir'] for entry in index['products'].values()}
+    for name in os.listdir(root):
+        if name not in current and os.path.isdir(os.path.join(root, name)):
+            shutil.rmtree(os.path.join(root, name))
+            updated += 1
+    updated += write_artifact(_compact(index), os.path.join(root, 'index.json'))
+    return updated, total_pages
+
+
+def write_dashboard_summary(dashboard_dir: str) -> bool:
+    """
+    Пересчет dashboard_summary.json. Компактный JSON без отступов; файл
+    перезаписывается, только если агрегаты изменились. True — файл обновлен
+    """
+    summary = build_dashboard_summary(
+        _load_json('results.json', []),
+        _load_json('product.json', []),
+        _load_json('audience_analysis_results.json', []),
+    )
+    return write_artifact(_compact(summary), os.path.join(dashboard_dir, SUMMARY_FILE))
+
+
+def refresh_generated(dashboard_dir: str, changed: Optional[Set[str]] = None) -> List[str]:
+    """
+    Пересчет агрегатов и страниц отзывов, если изменились их исходники
+    (changed=None — пересчитать все). Возвращает описания обновленных файлов
+    """
+    updated = []
+    if changed is None or changed & SUMMARY_SOURCES:
+        if write_dashboard_summary(dashboard_dir):
+            updated.append(SUMMARY_FILE)
+    if changed is None or changed & PAGES_SOURCES:
+        pages_updated, total_pages = write_review_pages(dashboard_dir)
+        if pages_updated:
+            updated.append(f"{REVIEWS_DIR}/ ({pages_updated} файлов, всего страниц: {total_pages})")
+    return updated
+
+
 def copy_files_to_dashboard():
     """Копирование JSON файлов в dashboard"""
     
@@ -38,14 +465,6 @@ def copy_files_to_dashboard():
     print("  📦 КОПИРОВАНИЕ ФАЙЛОВ В DASHBOARD")
     print("="*60)
     
-    # Файлы для копирования
-    files_to_copy = [
-        'audience_analysis_results.json',
-        'product.json',
-        'reviews.json',
-        'results.json'  # Добавлен results.json
-    ]
-    
     # Поиск dashboard
     dashboard_dir = find_dashboard_directory()
     
@@ -60,24 +479,26 @@ def copy_files_to_dashboard():
     print(f"\n✅ Dashboard найден: {dashboard_dir}")
     
     # Копирование файлов
-    copied = []
-    missing = []
-    
-    for filename in files_to_copy:
-        if os.path.exists(filename):
-            dest = os.path.join(dashboard_dir, filename)
-            shutil.copy2(filename, dest)
-            print(f"✅ {filename} → {dest}")
-            copied.append(filename)
-        else:
-            print(f"⚠️  {filename} не найден")
-            missing.append(filename)
+    copied, unchanged, missing = sync_files(DASHBOARD_FILES, dashboard_dir)
+    for filename in copied:
+        print(f"✅ {filename} → {os.path.join(dashboard_dir, filename)}")
+    for filename in unchanged:
+        print(f"➖ {filename} без изменений")
+    for filename in missing:
+        print(f"⚠️  {filename} не найден")
+    
+    # Агрегаты и страницы отзывов
+    generated = refresh_generated(dashboard_dir)
+    for name in generated:
+        print(f"✅ {name} пересчитан")
+    if not generated:
+        print(f"➖ {SUMMARY_FILE} и {REVIEWS_DIR}/ без изменений")
     
     # Итог
     print(f"\n" + "="*60)
     print(f"  📊 СТАТУС")
     print("="*60)
-    print(f"✅ Скопировано: {len(copied)} файлов")
+    print(f"✅ Скопировано: {len(copied)} файлов, без изменений: {len(unchanged)}")
     if missing:
         print(f"⚠️  Отсутствуют: {', '.join(missing)}")
     
@@ -88,7 +509,157 @@ def copy_files_to_dashboard():
         print(f"  npm run dev")
         print(f"\nИли обновите страницу если уже запущен!")
     
-    return len(copied) > 0
+    return len(copied) + len(unchanged) > 0
+
+
+# === Режим наблюдения ===
+
+# Константы из <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """inotify через ctypes (Linux). Следит за папкой и отдает имена измененных файлов"""
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            os.close(self._fd)
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+
+    def changes(self, timeout: Optional[float]) -> Set[str]:
+        """Имена файлов с событиями за время ожидания (пусто — таймаут)"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        names = set()
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buf):
+            _, _, _, length = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            name = buf[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            if name:
+                names.add(name)
+        return names
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Запасной вариант без inotify (macOS, Windows): сравнение размера и mtime файлов"""
+
+    def __init__(self, directory: str, filenames: Iterable[str], interval: float = 0.5):
+        self.directory = directory
+        self.filenames = list(filenames)
+        self.interval = interval
+        self._stamps = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        stamps = {}
+        for name in self.filenames:
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+                stamps[name] = (st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                stamps[name] = None
+        return stamps
+
+    def changes(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else max(0.0, min(self.interval, deadline - time.monotonic())))
+            current = self._snapshot()
+            changed = {name for name in self.filenames if current[name] != self._stamps[name]}
+            self._stamps = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory: str, filenames: List[str], force_polling: bool = False):
+    if not force_polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️  inotify недоступен ({e}), используем опрос файлов")
+    return PollingWatcher(directory, filenames)
+
+
+def watch(debounce: float = 1.0, force_polling: bool = False):
+    """
+    Долгоживущий режим: при изменении файлов результатов копирует в dashboard
+    только их. Серия событий (скрипт пишет файл частями) схлопывается: копирование
+    начинается после debounce секунд тишины и только для дописанных JSON.
+    """
+    dashboard_dir = find_dashboard_directory()
+    if not dashboard_dir:
+        print("\n❌ Папка dashboard не найдена!")
+        return
+
+    source_dir = '.'
+    watched = set(WATCHED_FILES)
+    watcher = make_watcher(source_dir, WATCHED_FILES, force_polling)
+    kind = 'inotify' if isinstance(watcher, InotifyWatcher) else 'опрос'
+    print(f"\n👀 Наблюдение за {', '.join(WATCHED_FILES)} ({kind}) → {dashboard_dir}")
+    print("   Ctrl+C — выход")
+
+    # Первичная синхронизация
+    copied, _, _ = sync_files(DASHBOARD_FILES, dashboard_dir)
+    for filename in copied:
+        print(f"✅ {filename}")
+    for name in refresh_generated(dashboard_dir):
+        print(f"✅ {name}")
+
+    pending: Set[str] = set()
+    # Срок копирования: debounce после последнего события по отслеживаемым файлам.
+    # События по другим файлам (.tmp, посторонние JSON) его не сдвигают, но и не
+    # считаются тишиной — ждем, пока срок не пройдет
+    deadline: Optional[float] = None
+    try:
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            changed = watcher.changes(timeout) & watched
+            if changed:
+                pending |= changed
+                deadline = time.monotonic() + debounce
+                continue
+            if not pending or time.monotonic() < deadline:
+                continue
+
+            ready = [name for name in sorted(pending) if not os.path.exists(name) or is_complete_json(name)]
+            copied, _, missing = sync_files([n for n in ready if n in DASHBOARD_FILES], dashboard_dir)
+            stamp = time.strftime('%H:%M:%S')
+            for filename in copied:
+                print(f"[{stamp}] ✅ {filename} обновлен")
+            for filename in missing:
+                print(f"[{stamp}] ⚠️  {filename} удален, в dashboard оставлена прошлая версия")
+            for name in refresh_generated(dashboard_dir, {n for n in ready if os.path.exists(n)}):
+                print(f"[{stamp}] ✅ {name} пересчитан")
+            # Недописанные JSON подождут следующего события или еще debounce секунд
+            pending -= set(ready)
+            deadline = time.monotonic() + debounce if pending else None
+    except KeyboardInterrupt:
+        print("\n👋 Наблюдение остановлено")
+    finally:
+        watcher.close()
 
 
 def create_sample_data():
@@ -198,10 +769,19 @@ def create_sample_data():
 
 def main():
     """Главная функция"""
+    parser = argparse.ArgumentParser(description="Копирование результатов в dashboard")
+    parser.add_argument("--watch", action="store_true", help="следить за файлами и обновлять dashboard при изменениях")
+    parser.add_argument("--debounce", type=float, default=1.0, help="пауза тишины перед копированием, сек")
+    parser.add_argument("--poll", action="store_true", help="опрашивать файлы вместо inotify")
+    args = parser.parse_args()
     
     # Создаем примеры если нужно
     create_sample_data()
     
+    if args.watch:
+        watch(args.debounce, args.poll)
+        return
+    
     # Копируем файлы
     success = copy_files_to_dashboard()
     
@@ -212,4 +792,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()